@@ -0,0 +1,34 @@
+#!/bin/bash
+
+# Script de build pour la Lambda chat FastAPI (Lambda Web Adapter)
+# Embarque les modules partagés de backend-python/shared
+
+set -e
+
+LWA_DIR="$(cd "$(dirname "$0")" && pwd)"
+ROOT_DIR="$(dirname "${LWA_DIR}")"
+DIST_DIR="${ROOT_DIR}/dist"
+BUILD_TEMP="${LWA_DIR}/temp_build"
+
+echo "🚀 Build de la Lambda chat (LWA)..."
+
+mkdir -p "${DIST_DIR}"
+rm -f "${DIST_DIR}/chat-handler.zip"
+rm -rf "${BUILD_TEMP}"
+mkdir -p "${BUILD_TEMP}/packages"
+
+# Code de l'application + modules partagés
+cp "${LWA_DIR}/chat/main.py" "${LWA_DIR}/chat/run.sh" "${BUILD_TEMP}/"
+cp -r "${ROOT_DIR}/backend-python/shared" "${BUILD_TEMP}/"
+chmod +x "${BUILD_TEMP}/run.sh"
+
+# Dépendances (run.sh ajoute packages/ au PYTHONPATH)
+pip install -r "${LWA_DIR}/chat/requirements.txt" -t "${BUILD_TEMP}/packages"
+
+cd "${BUILD_TEMP}"
+zip -r "${DIST_DIR}/chat-handler.zip" . -x "*.pyc" "*/__pycache__/*"
+cd "${LWA_DIR}"
+
+rm -rf "${BUILD_TEMP}"
+
+echo "✅ Build terminé: ${DIST_DIR}/chat-handler.zip"
@@ -2,34 +2,121 @@
 Lambda handler FastAPI avec Lambda Web Adapter pour streaming Bedrock
 Compatible avec Python 3.13 + vrai streaming progressif
 """
-import boto3
+import asyncio
 import json
 import os
+import sys
 import time
 import base64
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+import threading
 from typing import Optional
+from urllib.parse import unquote
 from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException, Header
+from fastapi import FastAPI, HTTPException, Header, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import uvicorn
-import io
-from docx import Document
-from openpyxl import load_workbook
-from pptx import Presentation
-from PyPDF2 import PdfReader
 
-# Clients AWS
-bedrock_client = boto3.client('bedrock-runtime', region_name='eu-west-3')
-dynamodb = boto3.resource('dynamodb', region_name='eu-west-3')
+# Les clients AWS (registre partagé aws_clients), les extracteurs (package extraction) et uvicorn sont importés
+# au premier usage : /health et les requêtes sans fichier n'en paient pas le coût
+
+# Modules partagés avec backend-python (copiés dans le package par build.sh)
+SHARED_DIR = os.path.join(os.path.dirname(__file__), 'shared')
+if not os.path.isdir(SHARED_DIR):
+    SHARED_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'backend-python', 'shared')
+sys.path.append(SHARED_DIR)
+
+from bedrock_request import MODEL_ID, build_request_body, new_usage, update_usage
+from conversation_store import (
+    HISTORY_LIMIT, LIST_DEFAULT_LIMIT, ConversationStore, is_valid_conversation_id, next_sequence
+)
+from context_builder import (
+    build_context_messages, build_excerpts_message, build_files_message, build_summary_message, count_message_tokens
+)
+from conversation_summary import SUMMARY_ENABLED, messages_to_fold, update_summary
+from aws_clients import get_bedrock_client, get_client_metrics, get_dynamodb_resource, track_stream
+from document_store import build_document_store, document_id, format_documents_context
+from jwt_verifier import InvalidToken, prefetch_jwks, user_id_from_token
+from retrieval import select_context
+from serialization import dumps, loads, ndjson_line
+from extraction_cache import cache_key, get_extraction_cache
+from extraction import EXTRACTOR_VERSION, cache_variant, count_pages, detect_format, extract, should_parallelize
+from spool import SpooledFile, UploadTooLarge, mapped_file, spool_stream
+from stage_timer import StageTimer
+from stream_coalescer import ChunkCoalescer
+from write_behind import INDEX_QUEUE, SLOW_QUEUE, flush_write_behind_queues, get_write_behind_queue
+from utils import sanitize_filename
+from uploads import (
+    MAX_UPLOAD_BYTES, UPLOAD_BUCKET, UploadNotReady, create_presigned_upload, get_upload_s3_client,
+    load_ready_upload, read_status, uploads_enabled
+)
 
 # Configuration
-MODEL_ID = 'eu.anthropic.claude-sonnet-4-5-20250929-v1:0'
 DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'claude-serverless-prod-chat-history')
 
+# Lecture des streams Bedrock hors de la boucle d'événements :
+# un thread par stream, relié au writer HTTP par une file bornée (backpressure)
+BEDROCK_STREAM_WORKERS = int(os.environ.get('BEDROCK_STREAM_WORKERS', '32'))
+STREAM_QUEUE_MAXSIZE = int(os.environ.get('STREAM_QUEUE_MAXSIZE', '64'))
+bedrock_stream_executor = ThreadPoolExecutor(
+    max_workers=BEDROCK_STREAM_WORKERS,
+    thread_name_prefix='bedrock-stream'
+)
+
+# Fin de stream dans la file
+STREAM_DONE = object()
+
+# Extraction des fichiers joints en parallèle (PDF/DOCX/XLSX : CPU, GIL)
+EXTRACTION_WORKERS = int(os.environ.get('EXTRACTION_WORKERS', str(os.cpu_count() or 1)))
+_extraction_executor = None
+_extraction_executor_lock = threading.Lock()
+
+
+def get_extraction_executor():
+    """
+    Pool de processus pour l'extraction, créé au premier usage.
+    Repli sur un pool de threads si le multiprocessing n'est pas disponible
+    (Lambda n'a pas de /dev/shm : les sémaphores POSIX échouent).
+    """
+    global _extraction_executor
+    with _extraction_executor_lock:
+        if _extraction_executor is None:
+            try:
+                _extraction_executor = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+            except (OSError, NotImplementedError) as e:
+                print(f"Process pool unavailable ({e}), using threads for extraction")
+                _extraction_executor = ThreadPoolExecutor(
+                    max_workers=EXTRACTION_WORKERS,
+                    thread_name_prefix='extraction'
+                )
+        return _extraction_executor
+
+
+def reset_extraction_executor():
+    """Abandonner un pool cassé (worker tué) : il sera recréé au prochain usage"""
+    global _extraction_executor
+    with _extraction_executor_lock:
+        if _extraction_executor is not None:
+            _extraction_executor.shutdown(wait=False, cancel_futures=True)
+            _extraction_executor = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clés publiques du User Pool téléchargées avant la première requête
+    await asyncio.to_thread(prefetch_jwks)
+    yield
+    # Arrêt (SIGTERM) : terminer les écritures différées restantes (résumés, index) avant de quitter
+    await asyncio.to_thread(flush_write_behind_queues)
+    bedrock_stream_executor.shutdown(wait=False, cancel_futures=True)
+    reset_extraction_executor()
+
+
 # FastAPI app
-app = FastAPI(title="Claude Chat API with Streaming")
+app = FastAPI(title="Claude Chat API with Streaming", lifespan=lifespan)
 
 
 class FileData(BaseModel):
@@ -38,136 +125,472 @@ class FileData(BaseModel):
     fileContent: str  # base64
 
 
+class PresignRequest(BaseModel):
+    fileName: str
+    fileType: str
+
+
 class ChatRequest(BaseModel):
     message: str
     conversationId: Optional[str] = None
     files: Optional[list[FileData]] = None
+    # Documents déjà stockés dans la conversation (tous par défaut)
+    documentIds: Optional[list[str]] = None
+    # Fichiers envoyés via URL présignée (extraction terminée)
+    uploadIds: Optional[list[str]] = None
     # Rétro-compatibilité
     fileContents: Optional[list[str]] = None
 
 
-def extract_user_id(authorization: Optional[str]) -> Optional[str]:
-    """Extraire le user ID depuis le JWT"""
+async def extract_user_id(authorization: Optional[str]) -> Optional[str]:
+    """Extraire le user ID d'un JWT vérifié (signature, expiration, émetteur, audience)"""
     if not authorization or not authorization.startswith('Bearer '):
         return None
     
     try:
-        token = authorization.split(' ')[1]
-        parts = token.split('.')
-        if len(parts) != 3:
-            return None
-        
-        # Décoder le payload JWT
-        payload = parts[1]
-        padding = 4 - (len(payload) % 4)
-        if padding != 4:
-            payload += '=' * padding
-        
-        decoded = base64.urlsafe_b64decode(payload)
-        claims = json.loads(decoded)
-        return claims.get('sub')
+        # Hors de la boucle d'événements : un kid inconnu peut recharger le JWKS (réseau).
+        # Jetons déjà vérifiés mémorisés jusqu'à leur expiration
+        return await asyncio.to_thread(user_id_from_token, authorization.split(' ')[1])
+    except InvalidToken as e:
+        print(f"Rejected token: {e}")
+        return None
     except Exception as e:
         print(f"Error extracting user ID: {e}")
         return None
 
 
-def extract_text_from_file(file_content_b64: str, file_type: str, file_name: str) -> str:
-    """Extraire le texte d'un fichier selon son type"""
-    try:
-        # Décoder le base64
-        file_bytes = base64.b64decode(file_content_b64)
-        file_io = io.BytesIO(file_bytes)
-        
-        print(f"Extracting {file_name} ({file_type}), size: {len(file_bytes)} bytes")
-        
-        # PDF
-        if file_type == 'application/pdf' or file_name.lower().endswith('.pdf'):
-            reader = PdfReader(file_io)
-            text = '\n'.join([page.extract_text() for page in reader.pages])
-            print(f"PDF extracted: {len(text)} chars")
-            return text
-        
-        # DOCX
-        elif file_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' or file_name.lower().endswith('.docx'):
-            doc = Document(file_io)
-            text = '\n'.join([para.text for para in doc.paragraphs])
-            print(f"DOCX extracted: {len(text)} chars, {len(doc.paragraphs)} paragraphs")
-            return text
-        
-        # XLSX
-        elif file_type == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' or file_name.lower().endswith('.xlsx'):
-            wb = load_workbook(file_io, data_only=True)
-            text_parts = []
-            for sheet_name in wb.sheetnames:
-                sheet = wb[sheet_name]
-                text_parts.append(f"\n=== Feuille: {sheet_name} ===\n")
-                for row in sheet.iter_rows(values_only=True):
-                    row_text = '\t'.join([str(cell) if cell is not None else '' for cell in row])
-                    if row_text.strip():
-                        text_parts.append(row_text)
-            return '\n'.join(text_parts)
-        
-        # PPTX
-        elif file_type == 'application/vnd.openxmlformats-officedocument.presentationml.presentation' or file_name.lower().endswith('.pptx'):
-            prs = Presentation(file_io)
-            text_parts = []
-            for i, slide in enumerate(prs.slides, 1):
-                text_parts.append(f"\n=== Slide {i} ===\n")
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text_parts.append(shape.text)
-            return '\n'.join(text_parts)
-        
-        # TXT, CSV, JSON, etc.
-        elif file_type.startswith('text/') or file_name.lower().endswith(('.txt', '.csv', '.json', '.md')):
-            return file_bytes.decode('utf-8', errors='ignore')
+def require_conversation_id(conversation_id: str):
+    """400 si l'ID de conversation sortirait de l'espace de clés de la conversation ('#', etc.)"""
+    if not is_valid_conversation_id(conversation_id):
+        raise HTTPException(status_code=400, detail="conversationId invalide")
+
+
+def extract_text_from_bytes(file_bytes, file_type: str, file_name: str, **options) -> str:
+    """Extraire le texte d'un fichier décodé ou mappé (lève une exception en cas d'échec)"""
+    print(f"Extracting {file_name} ({file_type}), size: {len(file_bytes)} bytes")
+    result = extract(file_bytes, file_type, file_name, **options)
+    print(f"Extracted {file_name}: {result.summary()}")
+    if result.error:
+        raise ValueError(result.error)
+    return result.text_with_note()
+
+
+def extract_text_from_path(path: str, file_type: str, file_name: str, **options) -> str:
+    """Extraire le texte d'un fichier reçu sur disque, lu via mmap (exécuté dans le pool : seul le chemin y est envoyé)"""
+    with mapped_file(path) as data:
+        return extract_text_from_bytes(data, file_type, file_name, **options)
+
+
+def prepare_file(file_content_b64: str, file_type: str, file_name: str) -> tuple:
+    """
+    Décoder un fichier et chercher son texte dans le cache d'extraction.
+    Retourne (contenu décodé, clé de cache, texte en cache ou None, ID de document).
+    """
+    file_bytes = base64.b64decode(file_content_b64)
+    key = cache_key(file_bytes, EXTRACTOR_VERSION, variant=cache_variant(file_bytes, file_type, file_name))
+    return file_bytes, key, get_extraction_cache().get(key), document_id(file_bytes)
+
+
+async def prepare_files(files: list) -> list:
+    """Décodage, hash et lecture du cache hors de la boucle d'événements"""
+    return await asyncio.gather(
+        *[asyncio.to_thread(prepare_file, *file) for file in files],
+        return_exceptions=True
+    )
+
+
+async def extract_file_bytes(loop: asyncio.AbstractEventLoop, file_bytes: bytes, file_type: str, file_name: str) -> str:
+    """
+    Extraire un fichier dans le pool d'extraction. Un gros PDF y est réparti
+    par plages de pages (PDF_PARALLEL_MIN_PAGES) au lieu d'occuper un seul worker.
+    """
+    executor = get_extraction_executor()
+    fmt = await asyncio.to_thread(detect_format, file_bytes, file_type, file_name)
+    if fmt is not None and fmt.name == 'pdf':
+        pages = await asyncio.to_thread(count_pages, file_bytes)
+        if should_parallelize(pages, executor):
+            # Le thread ne fait qu'attendre les plages et réassembler le texte
+            result = await asyncio.to_thread(
+                extract, file_bytes, file_type, file_name, parallel=True, executor=executor
+            )
+            print(f"Extracted {file_name} in parallel: {result.summary()}")
+            if result.error:
+                raise ValueError(result.error)
+            return result.text_with_note()
+    return await loop.run_in_executor(executor, extract_text_from_bytes, file_bytes, file_type, file_name)
+
+
+def prepare_spooled_file(spooled: SpooledFile, file_type: str, file_name: str) -> tuple:
+    """
+    Cache d'extraction d'un fichier reçu sur disque (hash calculé à la
+    réception, seul l'en-tête est lu pour détecter le format).
+    Retourne (ID de document, clé de cache, texte en cache ou None).
+    """
+    with spooled.mapped() as data:
+        variant = cache_variant(data, file_type, file_name)
+    key = cache_key(None, EXTRACTOR_VERSION, variant=variant, digest=spooled.sha256)
+    return document_id(digest=spooled.sha256), key, get_extraction_cache().get(key)
+
+
+def is_parallel_pdf(path: str, file_type: str, file_name: str, executor) -> bool:
+    """PDF assez gros pour être réparti par plages de pages dans le pool"""
+    with mapped_file(path) as data:
+        fmt = detect_format(data, file_type, file_name)
+        return fmt is not None and fmt.name == 'pdf' and should_parallelize(count_pages(data), executor)
+
+
+async def extract_spooled_file(loop: asyncio.AbstractEventLoop, path: str, file_type: str, file_name: str) -> str:
+    """
+    Extraire un fichier reçu sur disque dans le pool d'extraction : le worker
+    reçoit le chemin et mappe le fichier, le contenu n'est pas sérialisé.
+    """
+    executor = get_extraction_executor()
+    if await asyncio.to_thread(is_parallel_pdf, path, file_type, file_name, executor):
+        return await asyncio.to_thread(
+            extract_text_from_path, path, file_type, file_name, parallel=True, executor=executor
+        )
+    return await loop.run_in_executor(executor, extract_text_from_path, path, file_type, file_name)
+
+
+async def extract_prepared_files(files: list, prepared: list) -> list:
+    """
+    Extraire le texte de fichiers préparés (prepare_files) en parallèle.
+    Retourne des tuples (texte, succès) dans l'ordre d'origine ; l'échec
+    d'un fichier n'affecte pas les autres. Un fichier déjà vu (même contenu)
+    est servi par le cache d'extraction sans être re-parsé.
+    """
+    loop = asyncio.get_running_loop()
+    
+    async def extract_one(file, prep):
+        if isinstance(prep, BaseException):
+            raise prep
+        file_bytes, key, cached_text, _ = prep
+        if cached_text is not None:
+            return cached_text
         
-        else:
-            return f"[Fichier {file_name}: type non supporté pour extraction de texte]"
+        _, file_type, file_name = file
+        text = await extract_file_bytes(loop, file_bytes, file_type, file_name)
+        await asyncio.to_thread(get_extraction_cache().put, key, text)
+        return text
     
+    results = await asyncio.gather(
+        *[extract_one(file, prep) for file, prep in zip(files, prepared)],
+        return_exceptions=True
+    )
+    
+    texts = []
+    for (_, _, file_name), result in zip(files, results):
+        if isinstance(result, BaseException):
+            print(f"Error extracting text from file {file_name}: {result}")
+            if isinstance(result, BrokenProcessPool):
+                reset_extraction_executor()
+            texts.append((f"[Erreur lors de la lecture du fichier {file_name}: {str(result)}]", False))
+        else:
+            texts.append((result, True))
+    return texts
+
+
+async def extract_files_text(files: list) -> list:
+    """
+    Extraire le texte de plusieurs fichiers en parallèle.
+    files : liste de tuples (contenu base64, type MIME, nom).
+    """
+    results = await extract_prepared_files(files, await prepare_files(files))
+    return [text for text, _ in results]
+
+
+def get_document_store():
+    """Documents des conversations (table d'historique)"""
+    return build_document_store(get_dynamodb_resource().Table(DYNAMODB_TABLE))
+
+
+def load_conversation_documents(user_id: str, conversation_id: str) -> list:
+    """Charger les documents déjà stockés pour la conversation"""
+    try:
+        return get_document_store().load_documents(user_id, conversation_id)
     except Exception as e:
-        print(f"Error extracting text from file: {e}")
-        return f"[Erreur lors de la lecture du fichier {file_name}: {str(e)}]"
+        print(f"Error loading documents: {e}")
+        return []
 
 
-def get_conversation_history(user_id: str, conversation_id: str) -> list:
-    """Récupérer l'historique de conversation"""
+def store_conversation_document(user_id: str, conversation_id: str, doc: dict):
+    """Stocker un document extrait (une seule fois par contenu)"""
     try:
-        table = dynamodb.Table(DYNAMODB_TABLE)
-        response = table.get_item(
-            Key={
-                'user_id': user_id,
-                'conversation_id': conversation_id
-            }
+        get_document_store().put_document(
+            user_id, conversation_id, doc['id'], doc['name'], doc['type'], doc['text']
         )
-        return response.get('Item', {}).get('messages', [])
+    except Exception as e:
+        print(f"Error storing document {doc['name']}: {e}")
+
+
+async def sync_conversation_documents(
+    user_id: str,
+    conversation_id: str,
+    files: list,
+    document_ids: Optional[list] = None,
+    uploaded_documents: Optional[list] = None
+) -> tuple:
+    """
+    Stocker les fichiers du tour et charger les documents de la conversation.
+    Un fichier déjà stocké (même contenu) n'est ni re-parsé ni réécrit ;
+    document_ids limite le contexte aux documents référencés (+ ceux du tour).
+    uploaded_documents : documents déjà extraits par le pipeline S3.
+    Retourne (documents avec texte, métadonnées des fichiers du tour).
+    """
+    documents, prepared = await asyncio.gather(
+        asyncio.to_thread(load_conversation_documents, user_id, conversation_id),
+        prepare_files(files)
+    )
+    known = {doc['id']: doc for doc in documents}
+    
+    # Extraire uniquement les fichiers inconnus de la conversation
+    to_extract = [
+        i for i, prep in enumerate(prepared)
+        if isinstance(prep, BaseException) or prep[3] not in known
+    ]
+    extracted = await extract_prepared_files(
+        [files[i] for i in to_extract],
+        [prepared[i] for i in to_extract]
+    )
+    
+    turn_documents = []
+    new_documents = []
+    results = dict(zip(to_extract, extracted))
+    for i, (_, file_type, file_name) in enumerate(files):
+        if i not in results:
+            turn_documents.append(known[prepared[i][3]])
+            continue
+        text, ok = results[i]
+        doc = {
+            'id': prepared[i][3] if ok else None,
+            'name': file_name,
+            'type': file_type,
+            'text': text
+        }
+        turn_documents.append(doc)
+        if ok and doc['id'] not in known:
+            known[doc['id']] = doc
+            documents.append(doc)
+            new_documents.append(doc)
+    
+    for doc in uploaded_documents or []:
+        turn_documents.append(doc)
+        if doc['id'] not in known:
+            known[doc['id']] = doc
+            documents.append(doc)
+            new_documents.append(doc)
+    
+    await asyncio.gather(*[
+        asyncio.to_thread(store_conversation_document, user_id, conversation_id, doc)
+        for doc in new_documents
+    ])
+    
+    # Les fichiers en erreur ne sont pas stockés : contexte de ce tour uniquement
+    documents.extend(doc for doc in turn_documents if doc['id'] is None)
+    
+    if document_ids:
+        wanted = set(document_ids) | {doc['id'] for doc in turn_documents}
+        documents = [doc for doc in documents if doc['id'] in wanted]
+    
+    files_metadata = [
+        {'name': doc['name'], 'type': doc['type'], 'documentId': doc['id']}
+        for doc in turn_documents
+    ]
+    return documents, files_metadata
+
+
+async def add_spooled_document(user_id: str, conversation_id: str, spooled: SpooledFile,
+                               file_type: str, file_name: str) -> dict:
+    """
+    Stocker un fichier reçu sur disque comme document de la conversation.
+    Un document déjà stocké (même contenu) n'est ni re-parsé ni réécrit.
+    """
+    (doc_id, key, cached_text), known = await asyncio.gather(
+        asyncio.to_thread(prepare_spooled_file, spooled, file_type, file_name),
+        asyncio.to_thread(get_document_store().list_documents, user_id, conversation_id)
+    )
+    for doc in known:
+        if doc['id'] == doc_id:
+            return doc
+    
+    text = cached_text
+    if text is None:
+        text = await extract_spooled_file(asyncio.get_running_loop(), spooled.path, file_type, file_name)
+        await asyncio.to_thread(get_extraction_cache().put, key, text)
+    return await asyncio.to_thread(
+        get_document_store().put_document, user_id, conversation_id, doc_id, file_name, file_type, text
+    )
+
+
+def queue_document_indexes(user_id: str, conversation_id: str, indexes: dict):
+    """Persister en différé les index de recherche construits pendant le tour"""
+    store = get_document_store()
+    for doc_id, payload in indexes.items():
+        get_write_behind_queue(INDEX_QUEUE).submit(
+            f"index:{user_id}:{conversation_id}:{doc_id}",
+            store.put_index, user_id, conversation_id, doc_id, payload,
+            context={'user_id': user_id, 'conversation_id': conversation_id, 'doc_id': doc_id}
+        )
+
+
+def get_conversation_store() -> ConversationStore:
+    """Messages des conversations (un item par message)"""
+    return ConversationStore(get_dynamodb_resource().Table(DYNAMODB_TABLE))
+
+
+def get_conversation_history(user_id: str, conversation_id: str, limit: Optional[int] = None) -> list:
+    """Récupérer l'historique de conversation (les limit derniers messages si précisé)"""
+    try:
+        return get_conversation_store().load_messages(user_id, conversation_id, limit=limit)
     except Exception as e:
         print(f"Error getting conversation: {e}")
         return []
 
 
-def save_conversation(user_id: str, conversation_id: str, messages: list):
-    """Sauvegarder la conversation"""
+def get_conversation_context(user_id: str, conversation_id: str, limit: Optional[int] = None) -> tuple:
+    """
+    Historique pour construire le contexte et résumé glissant : (messages, résumé ou None).
+    Avec CONTEXT_SUMMARY_ENABLED, seuls les messages postérieurs au résumé sont relus.
+    """
     try:
-        table = dynamodb.Table(DYNAMODB_TABLE)
-        
-        # Le TTL suffit pour limiter le nombre de conversations (90 jours)
-        # Pas de limite artificielle sur le nombre de messages
-        # (DynamoDB limite à 400KB par item, mais ça permet ~1000+ messages)
+        if SUMMARY_ENABLED:
+            return get_conversation_store().load_context(user_id, conversation_id, limit=limit)
+        return get_conversation_store().load_messages(user_id, conversation_id, limit=limit), None
+    except Exception as e:
+        print(f"Error getting conversation: {e}")
+        return [], None
+
+
+def save_conversation(user_id: str, conversation_id: str, messages: list, base_seq: int = 0,
+                      turn_id: Optional[str] = None):
+    """
+    Ajouter les messages d'un tour (l'historique existant n'est pas réécrit).
+    Les erreurs sont propagées : la file write-behind réessaie.
+    """
+    # Le TTL suffit pour limiter le nombre de conversations (90 jours)
+    get_conversation_store().append_messages(user_id, conversation_id, messages, base_seq, turn_id)
+
+
+def turn_key_prefix(user_id: str, conversation_id: str) -> str:
+    """Préfixe des clés write-behind des tours d'une conversation"""
+    return f"turn:{user_id}:{conversation_id}:"
+
+
+async def wait_for_pending_turns(user_id: str, conversation_id: str) -> bool:
+    """
+    Attendre l'écriture des tours encore en file pour cette conversation
+    (False si le délai est dépassé). Sans tour en attente, aucun thread n'est sollicité.
+    """
+    queue = get_write_behind_queue()
+    prefix = turn_key_prefix(user_id, conversation_id)
+    if not queue.pending(prefix):
+        return True
+    return await asyncio.to_thread(queue.flush, prefix=prefix)
+
+
+async def load_conversation_context(user_id: str, conversation_id: str, limit: Optional[int] = None) -> tuple:
+    """Historique et résumé, après l'écriture du tour précédent s'il est encore en file"""
+    if not await wait_for_pending_turns(user_id, conversation_id):
+        print(f"Write-behind: tour précédent de {conversation_id} non écrit dans le délai, historique incomplet")
+    return await asyncio.to_thread(get_conversation_context, user_id, conversation_id, limit)
+
+
+async def persist_conversation_turn(user_id: str, conversation_id: str, messages: list, base_seq: int = 0) -> bool:
+    """
+    Écrire le tour directement (thread, hors de la boucle d'événements). En cas
+    d'échec, la file write-behind réessaie avec le même turn_id (idempotent) :
+    retourne False, la réponse n'attend pas les retries.
+    """
+    turn_id = str(uuid4())
+    try:
+        await asyncio.to_thread(save_conversation, user_id, conversation_id, messages, base_seq, turn_id)
+        return True
+    except Exception as e:
+        print(f"Écriture du tour {turn_id} de {conversation_id} échouée ({e}), reprise par la file write-behind")
+        queue_conversation_turn(user_id, conversation_id, messages, base_seq, turn_id)
+        return False
+
+
+def queue_conversation_turn(user_id: str, conversation_id: str, messages: list, base_seq: int = 0,
+                            turn_id: Optional[str] = None):
+    """Confier l'écriture du tour à la file write-behind (retries, idempotence par tour)"""
+    turn_id = turn_id or str(uuid4())
+    get_write_behind_queue().submit(
+        f"{turn_key_prefix(user_id, conversation_id)}{turn_id}",
+        save_conversation, user_id, conversation_id, messages, base_seq, turn_id,
+        context={'user_id': user_id, 'conversation_id': conversation_id, 'turn_id': turn_id}
+    )
+
+
+def queue_conversation_summary(user_id: str, conversation_id: str, history: list,
+                               summary: Optional[dict], turn_messages: list):
+    """Replier en différé les anciens tours dans le résumé glissant quand l'historique dépasse le seuil"""
+    if not SUMMARY_ENABLED:
+        return
+    folded = messages_to_fold(history, turn_messages)
+    if not folded:
+        return
+    get_write_behind_queue(SLOW_QUEUE).submit(
+        f"summary:{user_id}:{conversation_id}",
+        update_summary, get_conversation_store(), get_bedrock_client(), user_id, conversation_id, summary, folded,
+        context={'user_id': user_id, 'conversation_id': conversation_id, 'summary_seq': folded[-1]['seq']}
+    )
+
+
+def encode_chunk(text: str) -> bytes:
+    """Encoder un chunk de texte en ligne NDJSON"""
+    return ndjson_line({
+        'type': 'chunk',
+        'content': text
+    })
+
+
+def read_bedrock_stream(
+    request_body: dict,
+    usage: dict,
+    loop: asyncio.AbstractEventLoop,
+    queue: asyncio.Queue,
+    stop: threading.Event
+):
+    """
+    Lire le stream Bedrock (boto3 synchrone) dans un thread dédié.
+    Chaque delta de texte est poussé dans la file : le thread se bloque
+    quand la file est pleine, jusqu'à ce que le writer HTTP consomme.
+    """
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+    
+    try:
+        response = get_bedrock_client().invoke_model_with_response_stream(
+            modelId=MODEL_ID,
+            contentType='application/json',
+            body=dumps(request_body)
+        )
         
-        ttl = int(time.time()) + (90 * 24 * 60 * 60)  # 90 jours
+        stream = response.get('body')
+        if stream:
+            # La connexion reste occupée jusqu'à la fin du stream
+            with track_stream('bedrock-runtime'):
+                for event in stream:
+                    if stop.is_set():
+                        # Client déconnecté : inutile de continuer à lire
+                        stream.close()
+                        return
+                    
+                    chunk = event.get('chunk')
+                    if chunk:
+                        chunk_data = loads(chunk.get('bytes'))
+                        
+                        if chunk_data['type'] == 'content_block_delta':
+                            if 'delta' in chunk_data and 'text' in chunk_data['delta']:
+                                put(chunk_data['delta']['text'])
+                        else:
+                            update_usage(usage, chunk_data)
         
-        table.put_item(
-            Item={
-                'user_id': user_id,
-                'conversation_id': conversation_id,
-                'messages': messages,
-                'timestamp': int(time.time() * 1000),
-                'ttl': ttl
-            }
-        )
+        put(STREAM_DONE)
     except Exception as e:
-        print(f"Error saving conversation: {e}")
+        if not stop.is_set():
+            put(e)
 
 
 async def stream_bedrock_response(
@@ -175,81 +598,105 @@ async def stream_bedrock_response(
     conversation_id: str,
     user_id: str,
     conversation_history: list,
-    user_message: dict
+    user_message: dict,
+    timer: Optional[StageTimer] = None,
+    conversation_summary: Optional[dict] = None
 ):
     """Générateur asynchrone pour streamer depuis Bedrock"""
+    timer = timer or StageTimer()
+    bedrock_start = time.perf_counter()
     
-    # Envoyer métadonnées de début
-    yield json.dumps({
-        'type': 'start',
-        'conversationId': conversation_id,
-        'timestamp': int(time.time() * 1000)
-    }) + '\n'
+    # Formater les messages pour Bedrock (points de cache sur système, fichiers et historique)
+    request_body = build_request_body(messages)
     
-    # Formater les messages pour Bedrock
-    formatted_messages = [
-        {'role': msg['role'], 'content': msg['content']}
-        for msg in messages
-    ]
+    full_response = ''
+    usage = new_usage()
     
-    request_body = {
-        'anthropic_version': 'bedrock-2023-05-31',
-        'max_tokens': 4000,
-        'messages': formatted_messages,
-        'system': 'Tu es un assistant IA utile et bienveillant. Tu peux analyser des documents et répondre aux questions à leur sujet. Réponds de manière claire et structurée.'
-    }
+    # Regroupement des deltas (STREAM_COALESCE_BYTES / STREAM_COALESCE_MS)
+    coalescer = ChunkCoalescer()
     
-    full_response = ''
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=STREAM_QUEUE_MAXSIZE)
+    stop = threading.Event()
+    loop.run_in_executor(
+        bedrock_stream_executor,
+        read_bedrock_stream, request_body, usage, loop, queue, stop
+    )
     
     try:
-        # Appel streaming à Bedrock
-        response = bedrock_client.invoke_model_with_response_stream(
-            modelId=MODEL_ID,
-            contentType='application/json',
-            body=json.dumps(request_body)
-        )
+        while True:
+            # Attendre le prochain delta, ou l'échéance du buffer de regroupement
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=coalescer.time_until_due())
+            except asyncio.TimeoutError:
+                ready = coalescer.flush()
+                if ready:
+                    yield encode_chunk(ready)
+                continue
+            
+            if item is STREAM_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            
+            if not full_response:
+                timer.mark('first_token')
+            full_response += item
+            ready = coalescer.add(item)
+            if ready:
+                yield encode_chunk(ready)
         
-        # Traiter le stream
-        stream = response.get('body')
-        if stream:
-            for event in stream:
-                chunk = event.get('chunk')
-                if chunk:
-                    chunk_data = json.loads(chunk.get('bytes').decode())
-                    
-                    if chunk_data['type'] == 'content_block_delta':
-                        if 'delta' in chunk_data and 'text' in chunk_data['delta']:
-                            text_chunk = chunk_data['delta']['text']
-                            full_response += text_chunk
-                            
-                            # Envoyer le chunk au client
-                            yield json.dumps({
-                                'type': 'chunk',
-                                'content': text_chunk
-                            }) + '\n'
+        remaining = coalescer.flush()
+        if remaining:
+            yield encode_chunk(remaining)
         
-        # Envoyer métadonnées de fin
-        yield json.dumps({
-            'type': 'end',
-            'timestamp': int(time.time() * 1000)
-        }) + '\n'
+        print(f"Bedrock usage: {json.dumps(usage)}")
+        timer.record('bedrock', time.perf_counter() - bedrock_start)
         
-        # Sauvegarder la conversation après streaming
+        # Sauvegarder le tour : la réponse est déjà envoyée, seul l'événement de
+        # fin attend l'écriture (Lambda peut geler l'environnement juste après)
         if full_response:
             assistant_message = {
                 'role': 'assistant',
                 'content': full_response,
                 'timestamp': int(time.time() * 1000)
             }
-            updated_messages = conversation_history + [user_message, assistant_message]
-            save_conversation(user_id, conversation_id, updated_messages)
+            count_message_tokens(assistant_message)
+            await timer.measure('persist', persist_conversation_turn(
+                user_id, conversation_id,
+                [user_message, assistant_message], next_sequence(conversation_history, conversation_summary)
+            ))
+            queue_conversation_summary(
+                user_id, conversation_id, conversation_history, conversation_summary,
+                [user_message, assistant_message]
+            )
+        
+        # Envoyer métadonnées de fin (avec l'usage et la durée des étapes)
+        timings = timer.as_dict()
+        print(f"Chat timings: {json.dumps(timings)}")
+        print(f"AWS pools: {json.dumps(get_client_metrics())}")
+        yield ndjson_line({
+            'type': 'end',
+            'timestamp': int(time.time() * 1000),
+            'usage': usage,
+            'timings': timings
+        })
         
     except Exception as e:
         print(f"Error in Bedrock streaming: {e}")
-        yield json.dumps({
+        remaining = coalescer.flush()
+        if remaining:
+            yield encode_chunk(remaining)
+        yield ndjson_line({
             'type': 'error',
             'content': f'Error calling Claude: {str(e)}'
-        }) + '\n'
+        })
+    
+    finally:
+        # Débloquer et arrêter le lecteur (fin normale ou client déconnecté)
+        stop.set()
+        while not queue.empty():
+            queue.get_nowait()
 
 
 @app.post("/chat")
@@ -260,69 +707,43 @@ async def chat_endpoint(
     """Endpoint de chat avec streaming"""
     
     # Vérifier l'authentification
-    user_id = extract_user_id(authorization)
+    user_id = await extract_user_id(authorization)
     if not user_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
+    if request.conversationId is not None:
+        require_conversation_id(request.conversationId)
+    
+    if request.uploadIds and not uploads_enabled():
+        raise HTTPException(status_code=400, detail="Upload direct non configuré (UPLOAD_BUCKET)")
     
     # Générer ou utiliser l'ID de conversation
     conversation_id = request.conversationId or str(uuid4())
     
-    # Récupérer l'historique
-    conversation_history = get_conversation_history(user_id, conversation_id)
-    
-    # Construire le contexte
-    context_messages = conversation_history.copy()
-    
     # Traiter les fichiers
-    files_metadata = []
-    files_text = []
-    
     # Support du nouveau format avec métadonnées
     if request.files:
-        for file in request.files:
-            text = extract_text_from_file(file.fileContent, file.fileType, file.fileName)
-            files_text.append(f"<fichier nom='{file.fileName}'>\n{text}\n</fichier>")
-            files_metadata.append({
-                'name': file.fileName,
-                'type': file.fileType
-            })
+        files_to_extract = [
+            (file.fileContent, file.fileType, file.fileName)
+            for file in request.files
+        ]
     # Rétro-compatibilité avec l'ancien format
     elif request.fileContents:
-        for i, content in enumerate(request.fileContents):
-            file_name = f"document_{i+1}.txt"
-            text = extract_text_from_file(content, 'text/plain', file_name)
-            files_text.append(f"<fichier nom='{file_name}'>\n{text}\n</fichier>")
-            files_metadata.append({
-                'name': file_name,
-                'type': 'text/plain'
-            })
-    
-    # Ajouter les fichiers au contexte si présents
-    if files_text:
-        context_messages.append({
-            'role': 'user',
-            'content': f"Voici les fichiers fournis en contexte:\n\n{chr(10).join(files_text)}",
-            'timestamp': int(time.time() * 1000) - 1
-        })
+        files_to_extract = [
+            (content, 'text/plain', f"document_{i+1}.txt")
+            for i, content in enumerate(request.fileContents)
+        ]
+    else:
+        files_to_extract = []
     
-    # Ajouter le message utilisateur
-    timestamp = int(time.time() * 1000)
-    user_message = {
-        'role': 'user',
-        'content': request.message,
-        'timestamp': timestamp,
-        'files': files_metadata if files_metadata else None
-    }
-    context_messages.append(user_message)
-    
-    # Retourner le streaming response
+    # Retourner le streaming response (pré-traitement dans le stream, après l'événement start)
     return StreamingResponse(
-        stream_bedrock_response(
-            context_messages,
-            conversation_id,
+        chat_stream(
             user_id,
-            conversation_history,
-            user_message
+            conversation_id,
+            request.message,
+            files_to_extract,
+            request.documentIds,
+            request.uploadIds
         ),
         media_type='application/x-ndjson',
         headers={
@@ -332,53 +753,242 @@ async def chat_endpoint(
     )
 
 
+async def load_turn_documents(
+    user_id: str,
+    conversation_id: str,
+    files: list,
+    document_ids: Optional[list] = None,
+    upload_ids: Optional[list] = None
+) -> tuple:
+    """
+    Étape documents : uploads S3 référencés (statut ready exigé), puis
+    fichiers du tour extraits en parallèle et stockés une fois, documents
+    des tours précédents relus depuis le stockage
+    """
+    uploaded_documents = await asyncio.gather(*[
+        asyncio.to_thread(load_ready_upload, get_upload_s3_client(), UPLOAD_BUCKET, user_id, upload_id)
+        for upload_id in upload_ids or []
+    ])
+    return await sync_conversation_documents(
+        user_id, conversation_id, files, document_ids, uploaded_documents
+    )
+
+
+async def chat_stream(
+    user_id: str,
+    conversation_id: str,
+    message: str,
+    files: list,
+    document_ids: Optional[list] = None,
+    upload_ids: Optional[list] = None
+):
+    """
+    Pipeline d'une requête de chat : start immédiat, historique et documents
+    en parallèle, puis streaming Bedrock. La durée de chaque étape est
+    renvoyée dans l'événement de fin.
+    """
+    timer = StageTimer()
+    timestamp = int(time.time() * 1000)
+    
+    yield ndjson_line({
+        'type': 'start',
+        'conversationId': conversation_id,
+        'timestamp': timestamp
+    })
+    
+    # Historique (DynamoDB hors de la boucle d'événements) et documents en parallèle
+    try:
+        (conversation_history, summary), (documents, files_metadata) = await asyncio.gather(
+            timer.measure('history', load_conversation_context(user_id, conversation_id, HISTORY_LIMIT)),
+            timer.measure('documents', load_turn_documents(
+                user_id, conversation_id, files, document_ids, upload_ids
+            ))
+        )
+    except UploadNotReady as e:
+        # Le client attend le statut ready avant de référencer un upload
+        yield ndjson_line({
+            'type': 'error',
+            'content': str(e),
+            'uploadId': e.upload_id,
+            'status': e.status
+        })
+        return
+    except Exception as e:
+        print(f"Error preparing chat request: {e}")
+        yield ndjson_line({
+            'type': 'error',
+            'content': f'Error preparing request: {str(e)}'
+        })
+        return
+    
+    # Documents référençables aux tours suivants
+    yield ndjson_line({
+        'type': 'context',
+        'documents': [
+            {'id': doc['id'], 'name': doc['name'], 'type': doc['type']}
+            for doc in documents
+            if doc['id']
+        ]
+    })
+    
+    with timer.stage('context'):
+        # Gros documents : passages pertinents pour ce message (index construit hors de la boucle au premier tour)
+        retrieval = await asyncio.to_thread(select_context, documents, message)
+        if retrieval.stats:
+            print(f"Retrieval: {json.dumps(retrieval.stats)}")
+        queue_document_indexes(user_id, conversation_id, retrieval.new_indexes)
+        
+        # Documents entiers en tête (préfixe en cache), passages retenus joints au nouveau message
+        full_documents, excerpt_documents = retrieval.full_documents(), retrieval.excerpt_documents()
+        files_message = None
+        if full_documents:
+            files_message = build_files_message(format_documents_context(full_documents), timestamp - 1)
+        excerpts_message = None
+        if excerpt_documents:
+            excerpts_message = build_excerpts_message(format_documents_context(excerpt_documents), timestamp)
+        
+        # Ajouter le message utilisateur
+        user_message = {
+            'role': 'user',
+            'content': message,
+            'timestamp': timestamp,
+            'files': files_metadata if files_metadata else None
+        }
+        
+        # Résumé glissant des anciens tours (historique chargé à partir du suivant)
+        summary_message = build_summary_message(summary['text'], timestamp - 1) if summary else None
+        
+        # Construire le contexte dans le budget de tokens (anciens tours abandonnés en premier)
+        context_messages = build_context_messages(conversation_history, user_message, files_message,
+                                                  summary_message=summary_message,
+                                                  excerpts_message=excerpts_message)
+    
+    async for chunk in stream_bedrock_response(
+        context_messages,
+        conversation_id,
+        user_id,
+        conversation_history,
+        user_message,
+        timer,
+        summary
+    ):
+        yield chunk
+
+
+@app.post("/uploads/presign")
+async def presign_upload_endpoint(
+    request: PresignRequest,
+    authorization: Optional[str] = Header(None)
+):
+    """URL présignée pour envoyer un fichier directement à S3"""
+    
+    user_id = await extract_user_id(authorization)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if not uploads_enabled():
+        raise HTTPException(status_code=503, detail="Upload direct non configuré (UPLOAD_BUCKET)")
+    
+    file_name = sanitize_filename(request.fileName)
+    return await asyncio.to_thread(
+        create_presigned_upload, get_upload_s3_client(), UPLOAD_BUCKET, user_id, file_name, request.fileType
+    )
+
+
+@app.get("/uploads/{upload_id}")
+async def get_upload_status_endpoint(
+    upload_id: str,
+    authorization: Optional[str] = Header(None)
+):
+    """Statut de l'extraction d'un upload (pending, ready, error)"""
+    
+    user_id = await extract_user_id(authorization)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if not uploads_enabled():
+        raise HTTPException(status_code=503, detail="Upload direct non configuré (UPLOAD_BUCKET)")
+    
+    status = await asyncio.to_thread(read_status, get_upload_s3_client(), UPLOAD_BUCKET, user_id, upload_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return status
+
+
+@app.post("/conversations/{conversation_id}/documents")
+async def upload_document_endpoint(
+    conversation_id: str,
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    x_file_name: Optional[str] = Header(None),
+    content_type: Optional[str] = Header(None)
+):
+    """
+    Ajouter un document à une conversation. Le corps est le fichier brut
+    (pas de JSON ni de base64), son nom dans l'en-tête X-File-Name : il est
+    écrit sur disque au fil de la réception puis extrait via mmap. Le
+    document est ensuite référencé par documentIds dans /chat.
+    """
+    
+    user_id = await extract_user_id(authorization)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    require_conversation_id(conversation_id)
+    
+    # Refus avant lecture du corps si la taille annoncée dépasse la limite
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Fichier trop volumineux: plus de {MAX_UPLOAD_BYTES} octets")
+    
+    # En-tête ASCII : nom encodé par le client (encodeURIComponent)
+    file_name = sanitize_filename(unquote(x_file_name or 'document'))
+    file_type = (content_type or 'application/octet-stream').split(';')[0].strip()
+    
+    try:
+        spooled = await spool_stream(request.stream(), MAX_UPLOAD_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    try:
+        with spooled:
+            return await add_spooled_document(user_id, conversation_id, spooled, file_type, file_name)
+    except ValueError as e:
+        # Format non supporté, fichier illisible ou sans texte
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        print(f"Error storing uploaded document {file_name}: {e}")
+        if isinstance(e, BrokenProcessPool):
+            reset_extraction_executor()
+        raise HTTPException(status_code=500, detail=f"Error storing document: {str(e)}")
+
+
 @app.get("/conversations")
 async def list_conversations_endpoint(
-    authorization: Optional[str] = Header(None)
+    authorization: Optional[str] = Header(None),
+    limit: int = LIST_DEFAULT_LIMIT,
+    cursor: Optional[str] = None
 ):
-    """Lister toutes les conversations d'un utilisateur"""
+    """Lister les conversations d'un utilisateur (plus récentes en premier, paginé)"""
     
     # Vérifier l'authentification
-    user_id = extract_user_id(authorization)
+    user_id = await extract_user_id(authorization)
     if not user_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
     try:
-        table = dynamodb.Table(DYNAMODB_TABLE)
-        
-        # Query DynamoDB pour récupérer toutes les conversations de l'utilisateur
-        response = table.query(
-            KeyConditionExpression='user_id = :user_id',
-            ExpressionAttributeValues={
-                ':user_id': user_id
-            }
+        # Résumés tenus à jour dans les en-têtes, lus via l'index timestamp-index
+        conversations, next_cursor = await asyncio.to_thread(
+            get_conversation_store().list_conversations, user_id, limit, cursor
         )
-        
-        # Extraire les conversations et les trier par timestamp (plus récent en premier)
-        conversations = []
-        for item in response.get('Items', []):
-            # Récupérer le premier et dernier message pour l'aperçu
-            messages = item.get('messages', [])
-            if messages:
-                first_message = messages[0].get('content', '')[:100]  # Premier message tronqué
-                conversations.append({
-                    'conversationId': item['conversation_id'],
-                    'timestamp': item.get('timestamp', 0),
-                    'messageCount': len(messages),
-                    'preview': first_message
-                })
-        
-        # Trier par timestamp décroissant (plus récent en premier)
-        conversations.sort(key=lambda x: x['timestamp'], reverse=True)
-        
-        return {
-            'conversations': conversations,
-            'count': len(conversations)
-        }
-    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error listing conversations: {e}")
         raise HTTPException(status_code=500, detail=f"Error listing conversations: {str(e)}")
+    
+    return {
+        'conversations': conversations,
+        'count': len(conversations),
+        'nextCursor': next_cursor
+    }
 
 
 @app.get("/conversations/{conversation_id}")
@@ -389,12 +999,14 @@ async def get_conversation_endpoint(
     """Récupérer l'historique d'une conversation"""
     
     # Vérifier l'authentification
-    user_id = extract_user_id(authorization)
+    user_id = await extract_user_id(authorization)
     if not user_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
+    require_conversation_id(conversation_id)
     
-    # Récupérer l'historique
-    messages = get_conversation_history(user_id, conversation_id)
+    # Récupérer l'historique (tour en cours d'écriture compris)
+    await wait_for_pending_turns(user_id, conversation_id)
+    messages = await asyncio.to_thread(get_conversation_history, user_id, conversation_id)
     
     return {
         'conversationId': conversation_id,
@@ -410,17 +1022,15 @@ async def delete_conversation_endpoint(
     """Supprimer une conversation"""
     
     # Vérifier l'authentification
-    user_id = extract_user_id(authorization)
+    user_id = await extract_user_id(authorization)
     if not user_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
+    require_conversation_id(conversation_id)
     
     try:
-        table = dynamodb.Table(DYNAMODB_TABLE)
-        table.delete_item(
-            Key={
-                'user_id': user_id,
-                'conversation_id': conversation_id
-            }
+        await asyncio.gather(
+            asyncio.to_thread(get_conversation_store().delete_conversation, user_id, conversation_id),
+            asyncio.to_thread(get_document_store().delete_documents, user_id, conversation_id)
         )
         return {'success': True, 'conversationId': conversation_id}
     except Exception as e:
@@ -430,10 +1040,11 @@ async def delete_conversation_endpoint(
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (non authentifié : pas de métriques internes, voir le log AWS pools)"""
     return {"status": "ok", "version": "1.0.0-lwa"}
 
 
 if __name__ == "__main__":
     # Pour tests locaux
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "8080")))
@@ -0,0 +1,122 @@
+"""
+Benchmark du démarrage à froid (import des modules d'entrée)
+
+Importe chaque module d'entrée dans un interpréteur neuf avec
+-X importtime, puis affiche la durée d'init et les modules les plus
+coûteux. Compare le résultat au budget de cold_start_budget.json :
+durée maximale et modules interdits au démarrage (extracteurs,
+boto3, uvicorn... doivent être importés au premier usage).
+
+Code de sortie 1 en cas de régression (utilisable en CI).
+
+Usage : python benchmarks/bench_cold_start.py [--python /chemin/python] [--runs 5]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+DEFAULT_BUDGET = os.path.join(BENCH_DIR, 'cold_start_budget.json')
+
+# Cible -> (répertoire de travail, module importé, PYTHONPATH)
+# Le package Lambda embarque shared/ à côté du handler : on l'ajoute au chemin
+TARGETS = {
+    'lwa': (os.path.join(REPO_DIR, 'backend-python-lwa', 'chat'), 'main', ''),
+    'lambda': (BACKEND_DIR, 'chat.lambda_function', os.path.join(BACKEND_DIR, 'shared')),
+}
+
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$')
+
+
+def parse_importtime(stderr: str):
+    """Liste de (module, self µs, cumulé µs, profondeur)"""
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name.strip(), int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return modules
+
+
+def measure(python: str, target: str):
+    """Un import à froid de la cible : (durée ms, modules importés)"""
+    cwd, module, python_path = TARGETS[target]
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', PYTHONPATH=python_path,
+               AWS_REGION=os.environ.get('AWS_REGION', 'eu-west-3'))
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"Import de {module} impossible:\n" + '\n'.join(errors[-10:]))
+
+    modules = parse_importtime(result.stderr)
+    target_module = next((m for m in modules if m[0] == module and m[3] == 0), None)
+    init_ms = target_module[2] / 1000 if target_module else sum(m[1] for m in modules) / 1000
+    return init_ms, modules
+
+
+def check_budget(target: str, init_ms: float, modules, budget: dict):
+    """Liste des dépassements du budget"""
+    target_budget = budget.get(target, {})
+    failures = []
+    max_ms = target_budget.get('max_init_ms')
+    if max_ms is not None and init_ms > max_ms:
+        failures.append(f"init {init_ms:.1f} ms > budget {max_ms} ms")
+
+    imported = {name for name, _, _, _ in modules}
+    for forbidden in budget.get('forbidden_modules', []) + target_budget.get('forbidden_modules', []):
+        if forbidden in imported:
+            failures.append(f"module interdit importé au démarrage : {forbidden}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--python', default=sys.executable,
+                        help="Interpréteur disposant des dépendances de l'image")
+    parser.add_argument('--target', choices=sorted(TARGETS), action='append')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget', default=DEFAULT_BUDGET)
+    args = parser.parse_args()
+
+    with open(args.budget, encoding='utf-8') as f:
+        budget = json.load(f)
+
+    regressions = 0
+    for target in args.target or sorted(TARGETS):
+        runs = [measure(args.python, target) for _ in range(args.runs)]
+        timings = [init_ms for init_ms, _ in runs]
+        # Médiane : le premier lancement paie le cache disque
+        init_ms = statistics.median(timings)
+        modules = runs[-1][1]
+
+        print(f"== {target} : init médiane {init_ms:.1f} ms "
+              f"(min {min(timings):.1f}, max {max(timings):.1f}, {len(modules)} modules)")
+        header = f"{'module':<50}{'self ms':>10}{'cumulé ms':>12}"
+        print(header)
+        print('-' * len(header))
+        for name, self_us, cumulative_us, _ in sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]:
+            print(f"{name:<50}{self_us / 1000:>10.1f}{cumulative_us / 1000:>12.1f}")
+
+        failures = check_budget(target, init_ms, modules, budget)
+        for failure in failures:
+            print(f"RÉGRESSION ({target}) : {failure}")
+        regressions += len(failures)
+        print()
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
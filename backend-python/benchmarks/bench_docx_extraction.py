@@ -0,0 +1,135 @@
+"""
+Benchmark de l'extraction DOCX : modèle objet python-docx vs lecture en flux
+
+Génère des documents Word de 100 à 1000 pages (paragraphes, un tableau par
+page, en-tête et pied de page), puis mesure pour chacun le temps et le pic
+de mémoire résidente de :
+- python-docx : ancien chemin (paragraphes du corps, sans les tableaux) ;
+- flux : extracteur en flux, document entier (corps, tableaux, en-têtes) ;
+- flux+budget : extracteur en flux avec la limite par défaut du format.
+
+Chaque mesure tourne dans un processus séparé (le pic RSS inclut les
+allocations C de lxml, invisibles pour tracemalloc). python-docx n'est plus
+une dépendance d'exécution : il est requis ici pour générer le corpus et
+servir de référence.
+
+Usage : python benchmarks/bench_docx_extraction.py [--pages 100 300 1000]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared'))
+
+from bench_pdf_extraction import WORDS
+
+METHODS = ('python-docx', 'flux', 'flux+budget')
+
+
+def make_docx(pages: int, paragraphs: int = 8, seed: int = 0) -> bytes:
+    """Document d'environ `pages` pages : paragraphes et un tableau 4x4 par page"""
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+
+    rng = random.Random(seed)
+    document = Document()
+    document.sections[0].header.paragraphs[0].text = "Rapport interne"
+    document.sections[0].footer.paragraphs[0].text = "Confidentiel"
+    for page in range(pages):
+        document.add_heading(f"Page {page + 1}", level=2)
+        for _ in range(paragraphs):
+            document.add_paragraph(' '.join(rng.choice(WORDS) for _ in range(40)))
+        table = document.add_table(rows=4, cols=4)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = rng.choice(WORDS)
+        document.paragraphs[-1].runs[-1].add_break(WD_BREAK.PAGE)
+    output = io.BytesIO()
+    document.save(output)
+    return output.getvalue()
+
+
+def extract_python_docx(data: bytes) -> str:
+    """Ancien chemin : paragraphes du corps via le modèle objet"""
+    from docx import Document
+    document = Document(io.BytesIO(data))
+    return '\n'.join(paragraph.text for paragraph in document.paragraphs if paragraph.text.strip())
+
+
+def peak_rss_kb() -> int:
+    """Pic RSS du processus (VmHWM : ru_maxrss hérite du pic du parent à l'exec sous Linux)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_worker(method: str, path: str):
+    """Processus de mesure : une extraction, temps et pic RSS au-delà du niveau initial"""
+    from extraction import format_limits, get_format
+    from extraction.docx_stream import extract_docx
+    import docx  # noqa: F401  (chargé hors mesure)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    baseline = peak_rss_kb()
+    start = time.perf_counter()
+    if method == 'python-docx':
+        text = extract_python_docx(data)
+    elif method == 'flux':
+        text = extract_docx(data, max_chars=0).text
+    else:
+        text = extract_docx(data, max_chars=format_limits(get_format('docx')).max_chars).text
+    elapsed = time.perf_counter() - start
+    peak_kb = peak_rss_kb() - baseline
+    print(json.dumps({'seconds': elapsed, 'peak_mb': peak_kb / 1024, 'chars': len(text),
+                      'lines': text.splitlines()}))
+
+
+def measure(method: str, path: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', method, path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[100, 300, 1000])
+    parser.add_argument('--worker', nargs=2, metavar=('METHOD', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    header = f"{'pages':>6}{'Ko':>7}" + ''.join(f"{method + ' s':>16}{'Mo':>7}" for method in METHODS)
+    print(header)
+    print('-' * len(header))
+    with tempfile.TemporaryDirectory() as directory:
+        for pages in args.pages:
+            data = make_docx(pages, seed=pages)
+            path = os.path.join(directory, f"{pages}.docx")
+            with open(path, 'wb') as f:
+                f.write(data)
+            results = {method: measure(method, path) for method in METHODS}
+            # Tout paragraphe de l'ancien chemin se retrouve dans la sortie en flux
+            assert set(results['python-docx']['lines']) <= set(results['flux']['lines'])
+            print(f"{pages:>6}{len(data) // 1024:>7}" + ''.join(
+                f"{results[method]['seconds']:>16.2f}{results[method]['peak_mb']:>7.1f}" for method in METHODS
+            ))
+
+
+if __name__ == '__main__':
+    main()
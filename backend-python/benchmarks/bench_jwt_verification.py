@@ -0,0 +1,172 @@
+"""
+Benchmark de la vérification des JWT (jwt_verifier)
+
+Une clé RSA locale remplace le User Pool : JWKS statique, jetons signés
+par le benchmark. Mesure le coût par requête :
+- décodage sans vérification (ancien extract_user_id) ;
+- première vérification d'un jeton (parsing + signature RS256) ;
+- vérification d'un jeton déjà vu (mémorisé jusqu'à son expiration).
+Vérifie aussi que les jetons altérés, expirés ou destinés à un autre
+client sont refusés, et qu'un kid inconnu recharge le JWKS (rotation des
+clés) au plus une fois par intervalle.
+
+Usage : python benchmarks/bench_jwt_verification.py [--tokens 200] [--repeat 20000] [--bits 2048]
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared'))
+
+from jwt_verifier import SHA256_DIGEST_INFO, InvalidToken, JwksCache, JwtVerifier
+
+ISSUER = 'https://cognito-idp.eu-west-3.amazonaws.com/eu-west-3_bench'
+CLIENT_ID = 'bench-client'
+E = 65537
+
+
+def is_probable_prime(n: int, rng: random.Random, rounds: int = 32) -> bool:
+    if n < 4:
+        return n in (2, 3)
+    for p in (3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        if n % p == 0:
+            return n == p
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    for _ in range(rounds):
+        x = pow(rng.randrange(2, n - 1), d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def generate_key(bits: int, seed: int = 0):
+    """Clé RSA de test (n, d) : ne sert qu'à signer les jetons du benchmark"""
+    rng = random.Random(seed)
+    while True:
+        primes = []
+        while len(primes) < 2:
+            candidate = rng.getrandbits(bits // 2) | (3 << (bits // 2 - 2)) | 1
+            if (candidate - 1) % E and is_probable_prime(candidate, rng):
+                primes.append(candidate)
+        p, q = primes
+        n = p * q
+        if p != q and n.bit_length() == bits:
+            return n, pow(E, -1, (p - 1) * (q - 1))
+
+
+def b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def sign_token(claims: dict, n: int, d: int, kid: str = 'k1') -> str:
+    signing_input = f"{b64(json.dumps({'alg': 'RS256', 'kid': kid}).encode())}.{b64(json.dumps(claims).encode())}"
+    size = (n.bit_length() + 7) // 8
+    digest_info = SHA256_DIGEST_INFO + hashlib.sha256(signing_input.encode('ascii')).digest()
+    encoded = b'\x00\x01' + b'\xff' * (size - len(digest_info) - 3) + b'\x00' + digest_info
+    signature = pow(int.from_bytes(encoded, 'big'), d, n).to_bytes(size, 'big')
+    return f"{signing_input}.{b64(signature)}"
+
+
+def decode_unverified(token: str) -> str:
+    """Ancien extract_user_id : payload décodé sans vérification"""
+    payload = token.split('.')[1]
+    return json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))['sub']
+
+
+def claims_for(i: int, **overrides) -> dict:
+    now = int(time.time())
+    claims = {'sub': f"user-{i}", 'iss': ISSUER, 'aud': CLIENT_ID, 'token_use': 'id',
+              'iat': now, 'exp': now + 3600, 'email': f"user-{i}@example.com"}
+    claims.update(overrides)
+    return claims
+
+
+def per_call_us(fn, items, repeat: int) -> float:
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(items[i % len(items)])
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20000)
+    parser.add_argument('--bits', type=int, default=2048)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    n, d = generate_key(args.bits)
+    print(f"clé RSA {args.bits} bits générée en {time.perf_counter() - start:.1f} s")
+    jwks = {'keys': [{'kty': 'RSA', 'kid': 'k1', 'use': 'sig', 'alg': 'RS256',
+                      'n': b64(n.to_bytes((n.bit_length() + 7) // 8, 'big')), 'e': b64(E.to_bytes(3, 'big'))}]}
+    tokens = [sign_token(claims_for(i), n, d) for i in range(args.tokens)]
+
+    clock = [0.0]
+
+    def new_verifier():
+        jwks_cache = JwksCache(lambda: jwks, clock=lambda: clock[0])
+        return JwtVerifier(ISSUER, CLIENT_ID, jwks_cache, cache_size=args.tokens)
+
+    # Jetons refusés
+    verifier = new_verifier()
+    tampered = tokens[0].rsplit('.', 1)[0] + '.' + b64(bytes(args.bits // 8))
+    forged_claims = tokens[0].split('.')
+    forged_claims[1] = b64(json.dumps(claims_for(0, sub='admin')).encode())
+    rejected = {
+        'signature altérée': tampered,
+        'payload modifié': '.'.join(forged_claims),
+        'expiré': sign_token(claims_for(0, exp=int(time.time()) - 3600), n, d),
+        'autre client': sign_token(claims_for(0, aud='other'), n, d),
+        'autre émetteur': sign_token(claims_for(0, iss='https://example.com'), n, d),
+        'jeton de rafraîchissement': sign_token(claims_for(0, token_use='refresh'), n, d),
+        'kid inconnu': sign_token(claims_for(0), n, d, kid='k2'),
+        'malformé': 'abc.def',
+    }
+    for label, token in rejected.items():
+        try:
+            verifier.verify(token)
+        except InvalidToken:
+            continue
+        raise AssertionError(f"jeton accepté: {label}")
+    access = sign_token(claims_for(0, token_use='access', aud=None, client_id=CLIENT_ID), n, d)
+    assert verifier.verify(access)['sub'] == 'user-0'
+    assert verifier.jwks.stats['fetches'] == 1, verifier.jwks.stats
+
+    # Rotation : nouvelle clé publiée, rechargement une fois l'intervalle écoulé
+    jwks['keys'].append(dict(jwks['keys'][0], kid='k2'))
+    clock[0] += verifier.jwks.min_refresh_seconds
+    assert verifier.verify(rejected['kid inconnu'])['sub'] == 'user-0'
+    assert verifier.jwks.stats['fetches'] == 2, verifier.jwks.stats
+    jwks['keys'].pop()
+    print(f"{len(rejected)} jetons invalides refusés, JWKS chargé {verifier.jwks.stats['fetches']} fois (rotation)")
+
+    unverified_us = per_call_us(decode_unverified, tokens, args.repeat)
+    verifier = new_verifier()
+    first_us = per_call_us(verifier.verify, tokens, len(tokens))
+    cached_us = per_call_us(verifier.verify, tokens, args.repeat)
+    assert verifier.stats['misses'] == len(tokens), verifier.stats
+
+    print(f"{'cas':<34}{'µs / requête':>14}")
+    print('-' * 48)
+    print(f"{'décodage sans vérification':<34}{unverified_us:>14.1f}")
+    print(f"{'vérification (premier passage)':<34}{first_us:>14.1f}")
+    print(f"{'vérification (jeton mémorisé)':<34}{cached_us:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark du codec de stockage des messages (message_codec)
+
+Mesure, sur des conversations représentatives (réponses en français,
+code, document collé), le taux de compression, le coût d'encodage /
+décodage et les unités de capacité DynamoDB consommées.
+
+Usage : python benchmarks/bench_message_codec.py [--iterations 200]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared'))
+
+from message_codec import decode_text, encode_text
+
+PHRASES = [
+    "Voici une analyse détaillée de la question que vous avez posée.",
+    "Il est important de prendre en compte le contexte réglementaire français.",
+    "Les données fournies montrent une progression régulière du chiffre d'affaires.",
+    "En résumé, la solution la plus adaptée dépend de vos contraintes de budget.",
+    "Je vous recommande de vérifier ces éléments auprès de votre service juridique.",
+    "La fonction Lambda lit l'historique dans DynamoDB avant d'appeler Bedrock.",
+    "Cette approche réduit la latence perçue par l'utilisateur final.",
+    "N'hésitez pas à me demander des précisions sur l'un de ces points.",
+]
+
+CODE_SNIPPET = '''
+def get_conversation_history(user_id: str, conversation_id: str) -> list:
+    """Récupérer l'historique de conversation"""
+    table = dynamodb.Table(DYNAMODB_TABLE)
+    response = table.get_item(Key={'user_id': user_id, 'conversation_id': conversation_id})
+    return response.get('Item', {}).get('messages', [])
+'''
+
+
+# Vocabulaire des phrases + mots courants : des phrases recomposées
+# aléatoirement évitent un taux de compression irréaliste (texte répété)
+VOCABULARY = sorted({word.strip('.,') for phrase in PHRASES for word in phrase.split()} | {
+    'projet', 'client', 'contrat', 'équipe', 'délai', 'risque', 'coût', 'mois', 'année',
+    'résultat', 'objectif', 'processus', 'exemple', 'méthode', 'utilisateur', 'serveur',
+    'fichier', 'tableau', 'rapport', 'version', 'paramètre', 'valeur', 'erreur', 'requête',
+    'ainsi', 'donc', 'cependant', 'également', 'notamment', 'toutefois', 'plusieurs', 'chaque',
+    'entre', 'avant', 'après', 'pendant', 'depuis', 'selon', 'sans', 'sous', 'vers', 'chez',
+})
+
+
+def french_text(rng: random.Random, sentences: int) -> str:
+    parts = []
+    for _ in range(sentences):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))]
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words)), str(rng.randint(1, 99999)))
+        parts.append(' '.join(words).capitalize() + '.')
+    return ' '.join(parts)
+
+
+def sample_messages(rng: random.Random):
+    """Échantillons (nom, texte) représentatifs"""
+    return [
+        ('question courte', "Peux-tu résumer ce document ?"),
+        ('réponse moyenne', french_text(rng, 25)),
+        ('réponse longue', '\n\n'.join(french_text(rng, 12) for _ in range(15))),
+        ('réponse avec code', french_text(rng, 10) + CODE_SNIPPET * 4 + french_text(rng, 10)),
+        ('document collé', '\n'.join(
+            f"Article {i} - " + french_text(rng, 6) for i in range(300)
+        )),
+    ]
+
+
+def capacity_units(size: int, unit: int) -> int:
+    return max(1, math.ceil(size / unit))
+
+
+def bench(text: str, iterations: int):
+    raw_size = len(text.encode('utf-8'))
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        value, codec = encode_text(text)
+    encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decoded = decode_text(value, codec)
+    decode_us = (time.perf_counter() - start) / iterations * 1e6
+    assert decoded == text
+
+    stored_size = len(value) if codec else raw_size
+    return raw_size, stored_size, codec, encode_us, decode_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    header = f"{'échantillon':<20}{'brut':>10}{'stocké':>10}{'ratio':>8}{'WCU':>8}{'RCU':>8}{'enc µs':>10}{'dec µs':>10}"
+    print(header)
+    print('-' * len(header))
+
+    total_raw = total_stored = 0
+    for name, text in sample_messages(rng):
+        raw_size, stored_size, codec, encode_us, decode_us = bench(text, args.iterations)
+        total_raw += raw_size
+        total_stored += stored_size
+        # WCU par Ko écrit, RCU (lecture fortement cohérente) par 4 Ko lus
+        wcu = f"{capacity_units(raw_size, 1024)}>{capacity_units(stored_size, 1024)}"
+        rcu = f"{capacity_units(raw_size, 4096)}>{capacity_units(stored_size, 4096)}"
+        print(f"{name:<20}{raw_size:>10}{stored_size:>10}{stored_size / raw_size:>8.2f}"
+              f"{wcu:>8}{rcu:>8}{encode_us:>10.1f}{decode_us:>10.1f}"
+              f"{'' if codec else '  (brut)'}")
+
+    print('-' * len(header))
+    print(f"{'total':<20}{total_raw:>10}{total_stored:>10}{total_stored / total_raw:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark de l'extraction PDF : série vs plages de pages en parallèle
+
+Génère un corpus de PDF texte (10 à 500 pages par défaut), puis mesure
+pour chacun l'extraction série et l'extraction parallèle (pool de
+processus sur le fichier mappé), sans budget, et vérifie que le texte
+réassemblé est identique.
+
+Usage : python benchmarks/bench_pdf_extraction.py [--pages 10 50 100 250 500] [--workers 4]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared'))
+
+WORDS = [
+    'analyse', 'contrat', 'rapport', 'client', 'budget', 'projet', 'délai', 'risque', 'équipe',
+    'résultat', 'données', 'objectif', 'processus', 'méthode', 'serveur', 'fichier', 'tableau',
+    'version', 'paramètre', 'valeur', 'requête', 'ainsi', 'donc', 'cependant', 'notamment',
+]
+
+
+def make_pdf(pages: int, lines: int = 45, seed: int = 0) -> bytes:
+    """PDF minimal (police Helvetica, une page de texte par objet de contenu)"""
+    rng = random.Random(seed)
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    page_ids = []
+    next_id = 4
+    for page in range(pages):
+        operations = ["BT", "/F1 10 Tf", "40 800 Td", "12 TL", f"(Page {page + 1}) Tj T*"]
+        for _ in range(lines):
+            line = ' '.join(rng.choice(WORDS) for _ in range(12))
+            operations.append(f"({line}) Tj T*")
+        operations.append("ET")
+        content = '\n'.join(operations).encode('cp1252')
+        objects[next_id] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+        objects[next_id + 1] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R >> >> >>" % next_id
+        )
+        page_ids.append(next_id + 1)
+        next_id += 2
+    kids = b' '.join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(output)
+        output += b"%d 0 obj\n%s\nendobj\n" % (object_id, objects[object_id])
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % next_id
+    for object_id in range(1, next_id):
+        output += b"%010d 00000 n \n" % offsets[object_id]
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_id, xref)
+    return bytes(output)
+
+
+def timed(fn, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 50, 100, 250, 500])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-pages', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    # Lus à l'import du module PDF
+    os.environ['PDF_PARALLEL_WORKERS'] = str(args.workers)
+    if args.chunk_pages:
+        os.environ['PDF_PARALLEL_CHUNK_PAGES'] = str(args.chunk_pages)
+    from extraction import pdf as pdf_text
+
+    executor = pdf_text.get_pdf_executor()
+    # Démarrage des workers hors mesure
+    list(executor.map(abs, range(args.workers)))
+
+    print(f"{args.workers} processus, plages de {pdf_text.PDF_PARALLEL_CHUNK_PAGES} pages, "
+          f"seuil automatique {pdf_text.PDF_PARALLEL_MIN_PAGES} pages ({os.cpu_count()} CPU)")
+    header = f"{'pages':>6}{'Ko':>8}{'série s':>10}{'parallèle s':>13}{'gain':>8}{'auto':>11}"
+    print(header)
+    print('-' * len(header))
+
+    try:
+        for pages in args.pages:
+            data = make_pdf(pages, seed=pages)
+            serial, serial_s = timed(lambda: pdf_text.extract_pdf_text(data, max_chars=0, parallel=False), args.repeat)
+            parallel, parallel_s = timed(lambda: pdf_text.extract_pdf_text(data, max_chars=0, parallel=True), args.repeat)
+            assert parallel.text == serial.text and parallel.pages_included == pages
+            mode = 'parallèle' if pdf_text.should_parallelize(pages) else 'série'
+            print(f"{pages:>6}{len(data) // 1024:>8}{serial_s:>10.2f}{parallel_s:>13.2f}"
+                  f"{serial_s / parallel_s:>7.1f}x{mode:>11}")
+    finally:
+        pdf_text.reset_pdf_executor()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark de la recherche BM25 : contexte envoyé à chaque tour, texte
+entier vs passages retenus
+
+Génère un manuel synthétique (un chapitre par page, chacun décrivant un
+module au nom unique), puis mesure la construction de l'index, sa taille
+persistée, son rechargement, la sélection des passages par question, la
+taille du message de contexte et le taux de questions dont le chapitre
+attendu figure dans les passages retenus. Le manuel passe par l'extraction
+(limite des documents stockés) : les chapitres coupés ne sont pas trouvés.
+
+Usage : python benchmarks/bench_retrieval.py [--pages 50 300 1000] [--questions 50]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared'))
+
+from bench_pdf_extraction import WORDS
+
+
+def make_manual(pages: int, seed: int = 0):
+    """Texte d'un manuel et nom du module décrit par chaque chapitre (~2500 caractères par page)"""
+    rng = random.Random(seed)
+    modules = []
+    sections = []
+    for page in range(pages):
+        module = ''.join(rng.choice('bcdfglmnprstv') + rng.choice('aeiou') for _ in range(4))
+        lines = [' '.join(rng.choice(WORDS) for _ in range(14)) for _ in range(24)]
+        lines.insert(rng.randrange(len(lines)), f"Le module {module} se règle depuis l'écran de configuration.")
+        sections.append(f"Chapitre {page + 1} : module {module}\n" + '\n'.join(lines))
+        modules.append(module)
+    return '\n\n'.join(sections), modules
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[50, 300, 1000])
+    parser.add_argument('--questions', type=int, default=50)
+    args = parser.parse_args()
+
+    import retrieval
+    from extraction import extract
+    from context_builder import FILES_CONTEXT_PREFIX, estimate_tokens
+    from document_store import format_documents_context
+    from message_codec import encode_text
+
+    print(f"passages de {retrieval.CHUNK_CHARS} caractères (chevauchement {retrieval.CHUNK_OVERLAP}), "
+          f"top {retrieval.TOP_K}")
+    header = (f"{'pages':>6}{'tokens entier':>15}{'tokens BM25':>13}{'réduction':>11}{'index ms':>10}"
+              f"{'Ko index':>10}{'rechargé ms':>13}{'requête ms':>12}{'trouvés':>9}")
+    print(header)
+    print('-' * len(header))
+    for pages in args.pages:
+        manual, modules = make_manual(pages, seed=pages)
+        extracted = extract(manual.encode('utf-8'), 'text/plain', 'manuel.txt')
+        text = extracted.text
+        if extracted.truncated:
+            print(f"manuel de {pages} pages tronqué à l'extraction : {len(text)} / {len(manual)} caractères")
+        doc = {'id': f"manuel-{pages}", 'name': 'manuel.pdf', 'type': 'application/pdf', 'text': text}
+        full_tokens = estimate_tokens(FILES_CONTEXT_PREFIX + format_documents_context([doc]))
+
+        index, build_ms = timed(lambda: retrieval.build_index(text))
+        payload = index.dumps()
+        stored_kb = len(encode_text(payload)[0]) / 1024
+        _, load_ms = timed(lambda: retrieval.DocumentIndex.loads(payload))
+
+        # Index persisté, cache mémoire chaud : coût d'un tour
+        doc['index'] = payload
+        rng = random.Random(pages)
+        asked = [rng.randrange(pages) for _ in range(args.questions)]
+        found = 0
+        query_ms = 0.0
+        context_tokens = 0
+        for chapter in asked:
+            result, elapsed = timed(
+                lambda: retrieval.select_context([doc], f"Comment régler le module {modules[chapter]} ?")
+            )
+            query_ms += elapsed
+            context_text = format_documents_context(result.documents)
+            context_tokens += estimate_tokens(FILES_CONTEXT_PREFIX + context_text)
+            found += modules[chapter] in context_text
+
+        print(f"{pages:>6}{full_tokens:>15}{context_tokens // len(asked):>13}"
+              f"{full_tokens / max(context_tokens / len(asked), 1):>10.0f}x{build_ms:>10.0f}{stored_kb:>10.0f}"
+              f"{load_ms:>13.1f}{query_ms / len(asked):>12.2f}{found:>5}/{len(asked)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark de la sérialisation JSON des chemins chauds (module serialization)
+
+Compare, sur des charges réalistes, l'ancien code (json.dumps puis
+.encode, .decode puis json.loads) et le module serialization :
+- événement chunk NDJSON (texte français, taille d'un delta regroupé) ;
+- événement Bedrock content_block_delta reçu en bytes ;
+- événement de fin (usage + durées des étapes) ;
+- body de réponse d'une conversation de 60 messages (Decimal DynamoDB, default=str) ;
+- relecture de ce body.
+Si orjson est installé, le repli sur la bibliothèque standard est mesuré
+aussi (processus séparé, SERIALIZATION_BACKEND=json).
+
+Usage : python benchmarks/bench_serialization.py [--repeat 20000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared'))
+
+from bench_pdf_extraction import WORDS
+
+DELTA_TEXT = "Voici les éléments à vérifier : la clé « exp », l'émetteur et l'audience du jeton. "
+
+
+def payloads():
+    messages = [
+        {
+            'role': 'user' if i % 2 == 0 else 'assistant',
+            'content': ' '.join(WORDS[(i * 7 + j) % len(WORDS)] for j in range(60 if i % 2 == 0 else 220)) + ' — à noter.',
+            'timestamp': Decimal(1760000000000 + i * 1000),
+            'seq': Decimal(i),
+            'tokens': Decimal(90 + i),
+        }
+        for i in range(60)
+    ]
+    conversation = {'conversationId': 'c3f0f9b5-3c25-46df-aee0-37ef3b72825a', 'messages': messages}
+    return {
+        'chunk': {'type': 'chunk', 'content': DELTA_TEXT * 6},
+        'bedrock': json.dumps({'type': 'content_block_delta', 'index': 0,
+                               'delta': {'type': 'text_delta', 'text': DELTA_TEXT}}).encode('utf-8'),
+        'end': {
+            'type': 'end', 'timestamp': 1760000000000,
+            'usage': {'input_tokens': 18234, 'output_tokens': 912, 'cache_creation_input_tokens': 0,
+                      'cache_read_input_tokens': 16120},
+            'timings': {'documents': 12.4, 'history': 18.1, 'context': 0.6, 'first_token': 612.3,
+                        'bedrock': 9120.4, 'total': 9158.2},
+        },
+        'conversation': conversation,
+        'conversation_body': json.dumps(conversation, ensure_ascii=False, default=str).encode('utf-8'),
+    }
+
+
+def per_call_us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def measure(repeat: int) -> dict:
+    from serialization import BACKEND, dumps, dumps_str, loads, ndjson_line
+
+    data = payloads()
+    chunk, bedrock, end = data['chunk'], data['bedrock'], data['end']
+    conversation, body = data['conversation'], data['conversation_body']
+
+    # Même contenu décodé, quel que soit le codec
+    assert json.loads(ndjson_line(chunk)) == chunk
+    assert loads(bedrock) == json.loads(bedrock.decode())
+    assert json.loads(dumps_str(conversation, default=str)) == json.loads(body)
+
+    cases = {
+        'chunk NDJSON': (
+            lambda: (json.dumps(chunk) + '\n').encode('utf-8'),
+            lambda: ndjson_line(chunk),
+        ),
+        'événement Bedrock': (
+            lambda: json.loads(bedrock.decode()),
+            lambda: loads(bedrock),
+        ),
+        'événement de fin': (
+            lambda: ('\n' + json.dumps(end)).encode('utf-8'),
+            lambda: b'\n' + dumps(end),
+        ),
+        'conversation (60 messages)': (
+            lambda: json.dumps(conversation, ensure_ascii=False, default=str),
+            lambda: dumps_str(conversation, default=str),
+        ),
+        'relecture conversation': (
+            lambda: json.loads(body.decode('utf-8')),
+            lambda: loads(body),
+        ),
+    }
+    results = {}
+    for label, (before, after) in cases.items():
+        scale = 20 if label.startswith(('conversation', 'relecture')) else 1
+        results[label] = (per_call_us(before, repeat // scale), per_call_us(after, repeat // scale))
+    return {'backend': BACKEND, 'results': results,
+            'chunk_bytes': (len((json.dumps(chunk) + '\n').encode('utf-8')), len(ndjson_line(chunk)))}
+
+
+def report(measured: dict):
+    print(f"codec : {measured['backend']}")
+    print(f"{'cas':<30}{'avant µs':>10}{'après µs':>10}{'gain':>8}")
+    print('-' * 58)
+    for label, (before, after) in measured['results'].items():
+        print(f"{label:<30}{before:>10.2f}{after:>10.2f}{before / after:>7.1f}x")
+    before, after = measured['chunk_bytes']
+    print(f"taille d'un chunk : {before} -> {after} octets (UTF-8 sans échappement \\uXXXX)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20000)
+    parser.add_argument('--json-output', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    measured = measure(args.repeat)
+    if args.json_output:
+        print(json.dumps(measured))
+        return
+    report(measured)
+
+    if measured['backend'] != 'json':
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--repeat', str(args.repeat), '--json-output'],
+            env=dict(os.environ, SERIALIZATION_BACKEND='json'), check=True, capture_output=True, text=True,
+        ).stdout
+        print()
+        report(json.loads(output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark mémoire de la réception d'un fichier par la version LWA :
+JSON + base64 (/chat, champ files) vs corps brut écrit sur disque
+(/conversations/{id}/documents)
+
+Pour chaque taille, un PDF est généré puis reçu par morceaux de 64 Ko
+comme le ferait le serveur, dans un processus séparé par mesure :
+- base64 : corps JSON assemblé, modèle ChatRequest, décodage, extraction ;
+- spool : corps écrit dans un fichier temporaire, hash et extraction via mmap.
+Le pic RSS est mesuré au-delà du niveau atteint après les imports. Le
+chemin base64 est mesuré sans l'envoi du contenu au pool de processus
+(copie supplémentaire en production).
+
+Usage : python benchmarks/bench_upload_memory.py [--mb 5 20 40]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCHMARKS_DIR), 'shared'))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(BENCHMARKS_DIR)), 'backend-python-lwa', 'chat'))
+
+from bench_docx_extraction import peak_rss_kb
+from bench_pdf_extraction import make_pdf
+
+METHODS = ('base64', 'spool')
+CHUNK_BYTES = 64 * 1024
+PDF_BYTES_PER_PAGE = 4900
+
+
+def read_chunks(path: str):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def receive(path: str):
+    """Corps de requête reçu par morceaux (request.stream())"""
+    for chunk in read_chunks(path):
+        yield chunk
+
+
+def run_worker(method: str, path: str):
+    import main
+    from spool import spool_stream
+
+    baseline = peak_rss_kb()
+    start = time.perf_counter()
+    if method == 'base64':
+        # Corps assemblé puis parsé (request.json()), comme pour ChatRequest
+        body = b''.join(read_chunks(path))
+        request = main.ChatRequest.model_validate(json.loads(body))
+        file = request.files[0]
+        file_bytes, key, _, doc_id = main.prepare_file(file.fileContent, file.fileType, file.fileName)
+        text = main.extract_text_from_bytes(file_bytes, file.fileType, file.fileName)
+    else:
+        with asyncio.run(spool_stream(receive(path))) as spooled:
+            doc_id, key, _ = main.prepare_spooled_file(spooled, 'application/pdf', 'document.pdf')
+            text = main.extract_text_from_path(spooled.path, 'application/pdf', 'document.pdf')
+    elapsed = time.perf_counter() - start
+    peak_kb = peak_rss_kb() - baseline
+    print(json.dumps({'seconds': elapsed, 'peak_mb': peak_kb / 1024, 'doc_id': doc_id, 'chars': len(text)}))
+
+
+def measure(method: str, path: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', method, path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    # Dernière ligne : les extracteurs écrivent aussi sur la sortie standard
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mb', type=int, nargs='+', default=[5, 20, 40])
+    parser.add_argument('--worker', nargs=2, metavar=('METHOD', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    header = f"{'Mo':>5}{'pages':>7}" + ''.join(f"{method + ' s':>11}{'pic Mo':>9}" for method in METHODS) + f"{'gain':>8}"
+    print(header)
+    print('-' * len(header))
+    with tempfile.TemporaryDirectory() as directory:
+        for size_mb in args.mb:
+            pages = max(1, size_mb * 1024 * 1024 // PDF_BYTES_PER_PAGE)
+            data = make_pdf(pages, seed=size_mb)
+            paths = {
+                'spool': os.path.join(directory, f"{size_mb}.pdf"),
+                'base64': os.path.join(directory, f"{size_mb}.json"),
+            }
+            with open(paths['spool'], 'wb') as f:
+                f.write(data)
+            with open(paths['base64'], 'w') as f:
+                json.dump({'message': 'Résume ce document', 'files': [{
+                    'fileName': 'document.pdf',
+                    'fileType': 'application/pdf',
+                    'fileContent': base64.b64encode(data).decode('ascii'),
+                }]}, f)
+            del data
+
+            results = {method: measure(method, paths[method]) for method in METHODS}
+            assert results['base64']['doc_id'] == results['spool']['doc_id']
+            assert results['base64']['chars'] == results['spool']['chars']
+            gain = results['base64']['peak_mb'] / max(results['spool']['peak_mb'], 0.1)
+            print(f"{size_mb:>5}{pages:>7}" + ''.join(
+                f"{results[method]['seconds']:>11.2f}{results[method]['peak_mb']:>9.1f}" for method in METHODS
+            ) + f"{gain:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,17 +3,33 @@ Lambda function pour le chat avec Claude via Bedrock avec streaming
 """
 import json
 import os
+import queue
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 
 # Ajouter le répertoire shared au path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'shared'))
 
-from aws_clients import get_bedrock_client, get_dynamodb_table
+from aws_clients import get_bedrock_client, get_client_metrics, get_dynamodb_table, track_stream
+from bedrock_request import MODEL_ID, build_request_body, new_usage, update_usage
+from conversation_store import HISTORY_LIMIT, ConversationStore, is_valid_conversation_id, next_sequence
+from context_builder import (
+    build_context_messages, build_excerpts_message, build_files_message, build_summary_message, count_message_tokens
+)
+from conversation_summary import SUMMARY_ENABLED, messages_to_fold, update_summary
+from document_store import build_document_store, document_id, format_documents_context
+from retrieval import select_context
+from serialization import dumps, dumps_str, loads, ndjson_line
+from stage_timer import StageTimer
+from stream_coalescer import ChunkCoalescer
+from write_behind import INDEX_QUEUE, SLOW_QUEUE, get_write_behind_queue
+from uploads import UPLOAD_BUCKET, UploadNotReady, get_upload_s3_client, load_ready_upload
 from utils import (
-    create_response, extract_user_id, generate_ttl, generate_id,
-    validate_json_body, format_conversation_messages, log_error
+    create_response, extract_user_id, generate_id,
+    validate_json_body, log_error
 )
 
 def streaming_handler(event: Dict[str, Any], context: Any):
@@ -23,7 +39,7 @@ def streaming_handler(event: Dict[str, Any], context: Any):
     try:
         # Log de debug pour voir la structure de l'event
         print(f"DEBUG: Event keys: {list(event.keys())}")
-        print(f"DEBUG: Event: {json.dumps(event, default=str)[:500]}")
+        print(f"DEBUG: Event: {dumps_str(event, default=str)[:500]}")
         
         # Validation de la méthode HTTP (Lambda Function URL format 2.0)
         request_context = event.get('requestContext', {})
@@ -35,20 +51,24 @@ def streaming_handler(event: Dict[str, Any], context: Any):
         print(f"DEBUG: HTTP Method: {http_method}")
         
         if http_method == 'OPTIONS':
-            yield json.dumps({'message': 'OK'}).encode('utf-8')
+            yield dumps({'message': 'OK'})
         elif http_method != 'POST':
-            yield json.dumps({'type': 'error', 'content': f'Method not allowed: {http_method}'}).encode('utf-8')
+            yield dumps({'type': 'error', 'content': f'Method not allowed: {http_method}'})
         else:
             # Extraction de l'utilisateur
             user_id = extract_user_id(event)
             print(f"DEBUG: User ID: {user_id}")
             if not user_id:
-                yield json.dumps({'type': 'error', 'content': 'Unauthorized'}).encode('utf-8')
+                yield dumps({'type': 'error', 'content': 'Unauthorized'})
             else:
                 # Validation du body
                 body, error = validate_json_body(event, ['message'])
+                if not error and body.get('conversationId') is not None \
+                        and not is_valid_conversation_id(body['conversationId']):
+                    # Un '#' ferait sortir l'ID de l'espace de clés de la conversation
+                    error = 'conversationId invalide'
                 if error:
-                    yield json.dumps({'type': 'error', 'content': error}).encode('utf-8')
+                    yield dumps({'type': 'error', 'content': error})
                 else:
                     # Traiter la requête avec streaming
                     for chunk in process_chat_request_stream_generator(user_id, body):
@@ -56,15 +76,17 @@ def streaming_handler(event: Dict[str, Any], context: Any):
 
     except Exception as e:
         log_error('chat_handler', e)
-        yield json.dumps({
+        yield dumps({
             'type': 'error',
             'content': f'Internal server error: {str(e)}'
-        }).encode('utf-8')
+        })
 
 def lambda_handler(event: Dict[str, Any], context: Any):
     """
-    Handler principal pour les requêtes de chat.
+    Handler principal pour les requêtes de chat (mode bufferisé).
     Accumule tous les chunks et les retourne en une seule réponse NDJSON.
+    Le mode streaming passe par chat/streaming_runtime.py ; ce handler
+    reste le repli (CHAT_RESPONSE_MODE=buffered ou runtime standard).
     """
     try:
         # Vérifier si c'est une requête OPTIONS pour CORS
@@ -82,6 +104,12 @@ def lambda_handler(event: Dict[str, Any], context: Any):
         for chunk in streaming_handler(event, context):
             chunks.append(chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk)
         
+        # Tours écrits avant le gel de l'environnement. Le résumé glissant et
+        # les index (files SLOW_QUEUE, INDEX_QUEUE) ne sont pas attendus : la
+        # réponse bufferisée ne part qu'au retour du handler. Ils reprennent au
+        # dégel suivant, ou sont régénérés au tour suivant s'ils sont perdus
+        get_write_behind_queue().flush()
+        
         # Retourner la réponse complète
         # Note: Les headers CORS sont gérés par la Lambda Function URL, pas besoin de les ajouter ici
         return {
@@ -106,103 +134,217 @@ def lambda_handler(event: Dict[str, Any], context: Any):
             })
         }
 
+# Étapes indépendantes du pré-traitement (historique, documents) exécutées en parallèle
+preprocess_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='chat-preprocess')
+
 def process_chat_request_stream_generator(user_id: str, body: Dict[str, Any]):
     """
     Générateur pour traiter une requête de chat avec streaming
     """
+    timer = StageTimer()
     message = body['message']
     conversation_id = body.get('conversationId', generate_id())
     file_contents = body.get('fileContents', [])
+    document_ids = body.get('documentIds')
+    upload_ids = body.get('uploadIds', [])
     
     timestamp = int(time.time() * 1000)
     
-    # Récupérer l'historique de conversation
-    conversation_history = get_conversation_history(user_id, conversation_id)
-    
-    # Construire le contexte des messages
-    context_messages = conversation_history.copy()
-    
-    # Ajouter le contenu des fichiers si fourni
-    if file_contents:
-        files_context = "\n\n".join([
-            f"<file_{i+1}>\n{content}\n</file_{i+1}>"
-            for i, content in enumerate(file_contents)
-        ])
-        
-        context_messages.append({
-            'role': 'user',
-            'content': f"Voici les fichiers fournis en contexte:\n\n{files_context}",
-            'timestamp': timestamp - 1
-        })
-    
-    # Ajouter le message utilisateur
-    user_message = {
-        'role': 'user',
-        'content': message,
-        'timestamp': timestamp
-    }
-    context_messages.append(user_message)
-    
-    # Envoyer les métadonnées de début
+    # Envoyer les métadonnées de début avant les étapes lentes
     start_data = {
         'type': 'start',
         'conversationId': conversation_id,
         'timestamp': timestamp
     }
-    yield (json.dumps(start_data) + '\n').encode('utf-8')
+    yield ndjson_line(start_data)
     
-    # Appel à Bedrock Claude avec streaming
-    assistant_response = ""
-    for chunk in call_bedrock_claude_stream_generator(context_messages):
-        assistant_response += chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
-        yield chunk
+    # Historique et documents en parallèle (indépendants)
+    history_future = preprocess_executor.submit(
+        timer.timed('history', get_conversation_context), user_id, conversation_id
+    )
+    documents_future = preprocess_executor.submit(
+        timer.timed('documents', load_turn_documents),
+        user_id, conversation_id, file_contents, document_ids, upload_ids
+    )
     
-    # Envoyer les métadonnées de fin
-    end_data = {
-        'type': 'end',
-        'timestamp': int(time.time() * 1000)
-    }
-    yield ('\n' + json.dumps(end_data)).encode('utf-8')
+    try:
+        documents = documents_future.result()
+    except UploadNotReady as e:
+        # Fichiers envoyés via URL présignée : seuls les uploads extraits sont acceptés
+        yield dumps({
+            'type': 'error',
+            'content': str(e),
+            'uploadId': e.upload_id,
+            'status': e.status
+        })
+        return
+    conversation_history, summary = history_future.result()
+    
+    # Documents référençables aux tours suivants
+    yield ndjson_line({
+        'type': 'context',
+        'documents': [
+            {'id': doc['id'], 'name': doc['name'], 'type': doc['type']}
+            for doc in documents
+        ]
+    })
+    
+    with timer.stage('context'):
+        # Gros documents : passages pertinents pour ce message
+        retrieval = select_context(documents, message)
+        if retrieval.stats:
+            print(f"Retrieval: {json.dumps(retrieval.stats)}")
+        queue_document_indexes(user_id, conversation_id, retrieval.new_indexes)
+        
+        # Documents entiers en tête (préfixe en cache), passages retenus joints au nouveau message
+        full_documents, excerpt_documents = retrieval.full_documents(), retrieval.excerpt_documents()
+        files_message = None
+        if full_documents:
+            files_message = build_files_message(format_documents_context(full_documents), timestamp - 1)
+        excerpts_message = None
+        if excerpt_documents:
+            excerpts_message = build_excerpts_message(format_documents_context(excerpt_documents), timestamp)
+        
+        # Ajouter le message utilisateur
+        user_message = {
+            'role': 'user',
+            'content': message,
+            'timestamp': timestamp
+        }
+        
+        # Résumé glissant des anciens tours (historique chargé à partir du suivant)
+        summary_message = None
+        if summary:
+            summary_message = build_summary_message(summary['text'], timestamp - 1)
+        
+        # Construire le contexte des messages dans le budget de tokens
+        context_messages = build_context_messages(conversation_history, user_message, files_message,
+                                                  summary_message=summary_message,
+                                                  excerpts_message=excerpts_message)
+    
+    # Appel à Bedrock Claude avec streaming
+    stream_stats = {}
+    with timer.stage('bedrock'):
+        for chunk in call_bedrock_claude_stream_generator(context_messages, stream_stats, timer):
+            yield chunk
     
     assistant_message = {
         'role': 'assistant',
-        'content': assistant_response,
+        'content': stream_stats.get('response', ''),
         'timestamp': int(time.time() * 1000)
     }
+    count_message_tokens(assistant_message)
+    
+    # Sauvegarder le tour en différé : la réponse se termine sans attendre DynamoDB
+    # (file vidée par le runtime après la fermeture du stream)
+    if assistant_message['content']:
+        queue_conversation_turn(user_id, conversation_id, [user_message, assistant_message],
+                                next_sequence(conversation_history, summary))
+        queue_conversation_summary(user_id, conversation_id, conversation_history, summary,
+                                   [user_message, assistant_message])
     
-    # Sauvegarder la conversation
-    updated_messages = conversation_history + [user_message, assistant_message]
-    save_conversation(user_id, conversation_id, updated_messages)
+    # Envoyer les métadonnées de fin (avec l'usage, dont les tokens lus/écrits en cache)
+    timings = timer.as_dict()
+    print(f"Chat timings: {json.dumps(timings)}")
+    print(f"AWS pools: {json.dumps(get_client_metrics())}")
+    end_data = {
+        'type': 'end',
+        'timestamp': int(time.time() * 1000),
+        'usage': stream_stats.get('usage', new_usage()),
+        'timings': timings
+    }
+    yield b'\n' + dumps(end_data)
+
+def load_turn_documents(user_id: str, conversation_id: str, file_contents: List[str],
+                        document_ids: List[str] = None, upload_ids: List[str] = None) -> List[Dict[str, Any]]:
+    """
+    Étape documents : uploads S3 référencés, puis documents de la conversation.
+    Lève UploadNotReady si une extraction n'est pas terminée.
+    """
+    uploaded_documents = load_uploaded_documents(user_id, upload_ids)
+    return get_conversation_documents(user_id, conversation_id, file_contents, document_ids,
+                                      uploaded_documents)
 
-def get_conversation_history(user_id: str, conversation_id: str) -> List[Dict[str, Any]]:
+def load_uploaded_documents(user_id: str, upload_ids: List[str]) -> List[Dict[str, Any]]:
     """
-    Récupérer l'historique d'une conversation
+    Texte extrait des uploads S3 référencés par le client.
+    Lève UploadNotReady si une extraction n'est pas terminée.
     """
+    if not upload_ids:
+        return []
+    s3 = get_upload_s3_client()
+    return [load_ready_upload(s3, UPLOAD_BUCKET, user_id, upload_id) for upload_id in upload_ids]
+
+def get_conversation_documents(user_id: str, conversation_id: str, file_contents: List[str],
+                               document_ids: List[str] = None,
+                               uploaded_documents: List[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Stocker les fichiers du tour et charger les documents de la conversation.
+    Un fichier déjà stocké (même contenu) n'est pas réécrit ; document_ids
+    limite le contexte aux documents référencés (+ ceux du tour).
+    """
+    turn_documents = [
+        {
+            'id': document_id(content.encode('utf-8')),
+            'name': f"document_{i+1}.txt",
+            'type': 'text/plain',
+            'text': content
+        }
+        for i, content in enumerate(file_contents)
+    ] + list(uploaded_documents or [])
+    
+    table_name = os.environ.get('DYNAMODB_TABLE')
+    if not table_name:
+        return turn_documents
+    
     try:
-        table_name = os.environ.get('DYNAMODB_TABLE')
-        if not table_name:
-            return []
+        store = build_document_store(get_dynamodb_table(table_name))
+        documents = store.load_documents(user_id, conversation_id)
+        known_ids = {doc['id'] for doc in documents}
         
-        table = get_dynamodb_table(table_name)
+        for doc in turn_documents:
+            if doc['id'] in known_ids:
+                continue
+            store.put_document(user_id, conversation_id, doc['id'], doc['name'], doc['type'], doc['text'])
+            documents.append(doc)
+            known_ids.add(doc['id'])
         
-        response = table.get_item(
-            Key={
-                'user_id': user_id,
-                'conversation_id': conversation_id
-            }
-        )
+        if document_ids:
+            wanted = set(document_ids) | {doc['id'] for doc in turn_documents}
+            documents = [doc for doc in documents if doc['id'] in wanted]
         
-        if 'Item' in response:
-            return response['Item'].get('messages', [])
+        return documents
         
-        return []
+    except Exception as e:
+        log_error('get_conversation_documents', e, {
+            'user_id': user_id,
+            'conversation_id': conversation_id
+        })
+        return turn_documents
+
+def get_conversation_context(user_id: str, conversation_id: str):
+    """
+    Récupérer l'historique d'une conversation et son résumé glissant :
+    (messages, résumé ou None). Avec CONTEXT_SUMMARY_ENABLED, seuls les
+    messages postérieurs au résumé sont relus.
+    """
+    try:
+        table_name = os.environ.get('DYNAMODB_TABLE')
+        if not table_name:
+            return [], None
+        
+        # Derniers messages uniquement : le budget de tokens s'applique ensuite
+        store = ConversationStore(get_dynamodb_table(table_name))
+        if SUMMARY_ENABLED:
+            return store.load_context(user_id, conversation_id, limit=HISTORY_LIMIT)
+        return store.load_messages(user_id, conversation_id, limit=HISTORY_LIMIT), None
         
     except Exception as e:
-        log_error('get_conversation_history', e, {
+        log_error('get_conversation_context', e, {
             'user_id': user_id, 
             'conversation_id': conversation_id
         })
-        return []
+        return [], None
 
 def call_bedrock_claude(messages: List[Dict[str, Any]]) -> str:
     """
@@ -211,26 +353,18 @@ def call_bedrock_claude(messages: List[Dict[str, Any]]) -> str:
     try:
         bedrock_client = get_bedrock_client()
         
-        # Formater les messages pour Bedrock
-        formatted_messages = format_conversation_messages(messages)
-        
-        # Préparer la requête Bedrock
-        request_body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 4000,
-            "messages": formatted_messages,
-            "system": "Tu es un assistant IA utile et bienveillant. Tu peux analyser des documents et répondre aux questions à leur sujet. Réponds de manière claire et structurée."
-        }
+        # Préparer la requête Bedrock (avec points de cache de prompt)
+        request_body = build_request_body(messages)
         
         # Appel à Bedrock Claude 4.5 Sonnet via profil d'inférence
         response = bedrock_client.invoke_model(
-            modelId='eu.anthropic.claude-sonnet-4-5-20250929-v1:0',
+            modelId=MODEL_ID,
             contentType='application/json',
-            body=json.dumps(request_body)
+            body=dumps(request_body)
         )
         
         # Traiter la réponse
-        response_body = json.loads(response['body'].read())
+        response_body = loads(response['body'].read())
         
         if 'content' in response_body and len(response_body['content']) > 0:
             return response_body['content'][0]['text']
@@ -241,89 +375,200 @@ def call_bedrock_claude(messages: List[Dict[str, Any]]) -> str:
         log_error('call_bedrock_claude', e)
         return f"Erreur lors de l'appel à Claude: {str(e)}"
 
-def call_bedrock_claude_stream_generator(messages: List[Dict[str, Any]]):
+# Lecture du stream Bedrock dans un thread, reliée au générateur par une file
+# bornée : le buffer de regroupement est libéré à échéance même pendant une
+# pause du modèle (sans attendre le delta suivant)
+bedrock_stream_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='bedrock-stream')
+STREAM_QUEUE_MAXSIZE = int(os.environ.get('STREAM_QUEUE_MAXSIZE', '64'))
+# Fin de stream dans la file
+STREAM_DONE = object()
+
+def read_bedrock_stream(stream, usage: Dict[str, Any], deltas: queue.Queue, stop: threading.Event):
+    """
+    Lire le stream Bedrock (thread dédié) : chaque delta de texte est poussé
+    dans la file, puis STREAM_DONE ou l'exception levée
+    """
+    def put(item):
+        # File pleine : attendre le générateur, sauf s'il a été abandonné
+        while not stop.is_set():
+            try:
+                deltas.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+    
+    try:
+        # La connexion reste occupée jusqu'à la fin du stream
+        with track_stream('bedrock-runtime'):
+            for event in stream:
+                if stop.is_set():
+                    # Générateur fermé (client déconnecté) : inutile de continuer à lire
+                    stream.close()
+                    return
+                
+                chunk = event.get('chunk')
+                if chunk:
+                    chunk_data = loads(chunk.get('bytes'))
+                    
+                    # Bedrock renvoie différents types d'événements
+                    if chunk_data['type'] == 'content_block_delta':
+                        if 'delta' in chunk_data and 'text' in chunk_data['delta']:
+                            put(chunk_data['delta']['text'])
+                    else:
+                        update_usage(usage, chunk_data)
+        put(STREAM_DONE)
+    except Exception as e:
+        put(e)
+
+def call_bedrock_claude_stream_generator(messages: List[Dict[str, Any]], stream_stats: Dict[str, Any] = None,
+                                         timer: StageTimer = None):
     """
-    Générateur pour appeler Claude via Bedrock avec streaming
+    Générateur pour appeler Claude via Bedrock avec streaming.
+    Si fourni, stream_stats reçoit la réponse complète ('response')
+    et l'usage des tokens ('usage', dont lectures/écritures du cache de prompt) ;
+    timer reçoit l'instant du premier token ('first_token').
     """
+    if stream_stats is None:
+        stream_stats = {}
+    usage = stream_stats.setdefault('usage', new_usage())
+    response_parts = []
+    
+    # Regroupement des deltas (STREAM_COALESCE_BYTES / STREAM_COALESCE_MS)
+    coalescer = ChunkCoalescer()
+    
     try:
         bedrock_client = get_bedrock_client()
         
-        # Formater les messages pour Bedrock
-        formatted_messages = format_conversation_messages(messages)
-        
-        # Préparer la requête Bedrock
-        request_body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 4000,
-            "messages": formatted_messages,
-            "system": "Tu es un assistant IA utile et bienveillant. Tu peux analyser des documents et répondre aux questions à leur sujet. Réponds de manière claire et structurée."
-        }
+        # Préparer la requête Bedrock (avec points de cache de prompt)
+        request_body = build_request_body(messages)
         
         # Appel à Bedrock Claude 4.5 Sonnet avec streaming
         bedrock_response = bedrock_client.invoke_model_with_response_stream(
-            modelId='eu.anthropic.claude-sonnet-4-5-20250929-v1:0',
+            modelId=MODEL_ID,
             contentType='application/json',
-            body=json.dumps(request_body)
+            body=dumps(request_body)
         )
         
-        # Traiter le stream de réponse
+        # Traiter le stream de réponse (lu dans un thread, voir read_bedrock_stream)
         stream = bedrock_response.get('body')
         
         if stream:
-            for event in stream:
-                chunk = event.get('chunk')
-                if chunk:
-                    chunk_data = json.loads(chunk.get('bytes').decode())
+            deltas = queue.Queue(maxsize=STREAM_QUEUE_MAXSIZE)
+            stop = threading.Event()
+            bedrock_stream_executor.submit(read_bedrock_stream, stream, usage, deltas, stop)
+            try:
+                while True:
+                    # Attendre le prochain delta, ou l'échéance du buffer de regroupement
+                    try:
+                        item = deltas.get(timeout=coalescer.time_until_due())
+                    except queue.Empty:
+                        ready = coalescer.flush()
+                        if ready:
+                            yield encode_chunk(ready)
+                        continue
                     
-                    # Bedrock renvoie différents types d'événements
-                    if chunk_data['type'] == 'content_block_delta':
-                        if 'delta' in chunk_data and 'text' in chunk_data['delta']:
-                            text_chunk = chunk_data['delta']['text']
-                            
-                            # Envoyer le chunk au client
-                            chunk_message = {
-                                'type': 'chunk',
-                                'content': text_chunk
-                            }
-                            yield (json.dumps(chunk_message) + '\n').encode('utf-8')
+                    if item is STREAM_DONE:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    
+                    if timer and not response_parts:
+                        timer.mark('first_token')
+                    response_parts.append(item)
+                    
+                    # Envoyer le chunk au client dès qu'un seuil est atteint
+                    ready = coalescer.add(item)
+                    if ready:
+                        yield encode_chunk(ready)
+            finally:
+                stop.set()
+        
+        remaining = coalescer.flush()
+        if remaining:
+            yield encode_chunk(remaining)
+        
+        print(f"Bedrock usage: {json.dumps(usage)}")
             
     except Exception as e:
         log_error('call_bedrock_claude_stream_generator', e)
         error_message = f"Erreur lors de l'appel à Claude: {str(e)}"
         
+        # Ne pas perdre le texte déjà reçu
+        remaining = coalescer.flush()
+        if remaining:
+            yield encode_chunk(remaining)
+        
         # Envoyer l'erreur au client
         error_chunk = {
             'type': 'error',
             'content': error_message
         }
-        yield (json.dumps(error_chunk) + '\n').encode('utf-8')
+        yield ndjson_line(error_chunk)
+    finally:
+        stream_stats['response'] = ''.join(response_parts)
 
-def save_conversation(user_id: str, conversation_id: str, messages: List[Dict[str, Any]]):
+def encode_chunk(text: str) -> bytes:
     """
-    Sauvegarder une conversation en DynamoDB
+    Encoder un chunk de texte en ligne NDJSON
     """
-    try:
-        table_name = os.environ.get('DYNAMODB_TABLE')
-        if not table_name:
-            return
-        
-        table = get_dynamodb_table(table_name)
-        
-        # Garder seulement les 20 derniers messages
-        recent_messages = messages[-20:] if len(messages) > 20 else messages
-        
-        table.put_item(
-            Item={
-                'user_id': user_id,
-                'conversation_id': conversation_id,
-                'messages': recent_messages,
-                'timestamp': int(time.time() * 1000),
-                'ttl': generate_ttl(90)  # 3 mois
-            }
+    return ndjson_line({'type': 'chunk', 'content': text})
+
+def queue_conversation_turn(user_id: str, conversation_id: str, messages: List[Dict[str, Any]],
+                            base_seq: int = 0):
+    """
+    Confier l'écriture du tour à la file write-behind (retries, idempotence par tour)
+    """
+    turn_id = generate_id()
+    get_write_behind_queue().submit(
+        f"turn:{user_id}:{conversation_id}:{turn_id}",
+        save_conversation, user_id, conversation_id, messages, base_seq, turn_id,
+        context={'user_id': user_id, 'conversation_id': conversation_id, 'turn_id': turn_id}
+    )
+
+def queue_conversation_summary(user_id: str, conversation_id: str, history: List[Dict[str, Any]],
+                               summary: Dict[str, Any], turn_messages: List[Dict[str, Any]]):
+    """
+    Replier en différé les anciens tours dans le résumé glissant
+    quand l'historique non résumé dépasse le seuil
+    """
+    table_name = os.environ.get('DYNAMODB_TABLE')
+    if not SUMMARY_ENABLED or not table_name:
+        return
+    folded = messages_to_fold(history, turn_messages)
+    if not folded:
+        return
+    store = ConversationStore(get_dynamodb_table(table_name))
+    get_write_behind_queue(SLOW_QUEUE).submit(
+        f"summary:{user_id}:{conversation_id}",
+        update_summary, store, get_bedrock_client(), user_id, conversation_id, summary, folded,
+        context={'user_id': user_id, 'conversation_id': conversation_id, 'summary_seq': folded[-1]['seq']}
+    )
+
+def queue_document_indexes(user_id: str, conversation_id: str, indexes: Dict[str, str]):
+    """
+    Persister en différé les index de recherche construits pendant le tour
+    """
+    table_name = os.environ.get('DYNAMODB_TABLE')
+    if not table_name or not indexes:
+        return
+    store = build_document_store(get_dynamodb_table(table_name))
+    for doc_id, payload in indexes.items():
+        get_write_behind_queue(INDEX_QUEUE).submit(
+            f"index:{user_id}:{conversation_id}:{doc_id}",
+            store.put_index, user_id, conversation_id, doc_id, payload,
+            context={'user_id': user_id, 'conversation_id': conversation_id, 'doc_id': doc_id}
         )
-        
-    except Exception as e:
-        log_error('save_conversation', e, {
-            'user_id': user_id,
-            'conversation_id': conversation_id
-        })
+
+def save_conversation(user_id: str, conversation_id: str, messages: List[Dict[str, Any]],
+                      base_seq: int = 0, turn_id: str = None):
+    """
+    Ajouter les messages d'un tour à la conversation en DynamoDB
+    (un item par message, l'historique existant n'est pas réécrit).
+    Les erreurs sont propagées : la file write-behind réessaie.
+    """
+    table_name = os.environ.get('DYNAMODB_TABLE')
+    if not table_name:
+        return
+    
+    store = ConversationStore(get_dynamodb_table(table_name))
+    store.append_messages(user_id, conversation_id, messages, base_seq, turn_id)
@@ -0,0 +1,12 @@
+#!/bin/bash
+
+# Wrapper AWS_LAMBDA_EXEC_WRAPPER pour la fonction chat (runtime Python managé)
+# Remplace la boucle du runtime par chat/streaming_runtime.py (response streaming)
+# CHAT_RESPONSE_MODE=buffered : repli sur le runtime standard et lambda_handler
+
+if [ "${CHAT_RESPONSE_MODE:-streaming}" = "buffered" ]; then
+    exec "$@"
+fi
+
+cd "${LAMBDA_TASK_ROOT}"
+exec python3 -m chat.streaming_runtime
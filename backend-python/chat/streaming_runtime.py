@@ -0,0 +1,179 @@
+"""
+Boucle de runtime Lambda avec response streaming pour la fonction chat
+
+Le runtime Python managé ne sait pas streamer une réponse : ce module remplace
+sa boucle (via AWS_LAMBDA_EXEC_WRAPPER=chat/stream_bootstrap.sh) et envoie
+chaque chunk NDJSON à la Runtime API dès qu'il est produit
+(Lambda-Runtime-Function-Response-Mode: streaming, Function URL en RESPONSE_STREAM).
+
+CHAT_RESPONSE_MODE=buffered revient au handler bufferisé (lambda_handler).
+"""
+import base64
+import http.client
+import os
+import sys
+import time
+import traceback
+from typing import Any, Dict, Iterable
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared'))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat.lambda_function import streaming_handler, lambda_handler
+from serialization import dumps, loads
+from write_behind import flush_write_behind_queues
+
+RUNTIME_API_VERSION = '2018-06-01'
+RESPONSE_MODE = os.environ.get('CHAT_RESPONSE_MODE', 'streaming').lower()
+
+# Format attendu par les Function URLs : prélude JSON, 8 octets nuls, puis le body
+HTTP_INTEGRATION_CONTENT_TYPE = 'application/vnd.awslambda.http-integration-response'
+PRELUDE_DELIMITER = b'\x00' * 8
+
+STREAM_HEADERS = {
+    'Content-Type': 'application/x-ndjson',
+    'Cache-Control': 'no-cache'
+}
+
+
+class LambdaContext:
+    """Contexte minimal équivalent à celui fourni par le runtime managé"""
+
+    def __init__(self, headers: Dict[str, str]):
+        self.aws_request_id = headers.get('Lambda-Runtime-Aws-Request-Id')
+        self.invoked_function_arn = headers.get('Lambda-Runtime-Invoked-Function-Arn')
+        self.function_name = os.environ.get('AWS_LAMBDA_FUNCTION_NAME')
+        self.function_version = os.environ.get('AWS_LAMBDA_FUNCTION_VERSION')
+        self.memory_limit_in_mb = os.environ.get('AWS_LAMBDA_FUNCTION_MEMORY_SIZE')
+        self.log_group_name = os.environ.get('AWS_LAMBDA_LOG_GROUP_NAME')
+        self.log_stream_name = os.environ.get('AWS_LAMBDA_LOG_STREAM_NAME')
+        self._deadline_ms = int(headers.get('Lambda-Runtime-Deadline-Ms', '0'))
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(self._deadline_ms - int(time.time() * 1000), 0)
+
+
+class RuntimeClient:
+    """Client de la Lambda Runtime API (connexion HTTP persistante)"""
+
+    def __init__(self, runtime_api: str):
+        self.runtime_api = runtime_api
+        self._conn = http.client.HTTPConnection(runtime_api)
+
+    def _path(self, suffix: str) -> str:
+        return f"/{RUNTIME_API_VERSION}/runtime/{suffix}"
+
+    def _request(self, method: str, suffix: str, body: bytes = None, headers: Dict[str, str] = None):
+        self._conn.request(method, self._path(suffix), body=body, headers=headers or {})
+        response = self._conn.getresponse()
+        return response, response.read()
+
+    def next_invocation(self):
+        """Attendre la prochaine invocation (bloquant)"""
+        response, body = self._request('GET', 'invocation/next')
+        os.environ['_X_AMZN_TRACE_ID'] = response.getheader('Lambda-Runtime-Trace-Id', '')
+        return dict(response.getheaders()), loads(body)
+
+    def post_response(self, request_id: str, payload: bytes):
+        """Réponse bufferisée classique"""
+        self._request('POST', f"invocation/{request_id}/response", payload,
+                      {'Content-Type': 'application/json'})
+
+    def post_error(self, suffix: str, error: Exception):
+        payload = dumps({
+            'errorMessage': str(error),
+            'errorType': type(error).__name__,
+            'stackTrace': traceback.format_exception(type(error), error, error.__traceback__)
+        })
+        self._request('POST', suffix, payload, {
+            'Content-Type': 'application/json',
+            'Lambda-Runtime-Function-Error-Type': f"Runtime.{type(error).__name__}"
+        })
+
+    def stream_response(self, request_id: str, status_code: int, headers: Dict[str, str],
+                        chunks: Iterable[bytes]):
+        """
+        Réponse en streaming : chaque chunk est envoyé immédiatement
+        (Transfer-Encoding: chunked). Une erreur en cours de stream est
+        remontée via les trailers Lambda-Runtime-Function-Error-*.
+        """
+        conn = self._conn
+        conn.putrequest('POST', self._path(f"invocation/{request_id}/response"))
+        conn.putheader('Lambda-Runtime-Function-Response-Mode', 'streaming')
+        conn.putheader('Content-Type', HTTP_INTEGRATION_CONTENT_TYPE)
+        conn.putheader('Transfer-Encoding', 'chunked')
+        conn.putheader('Trailer', 'Lambda-Runtime-Function-Error-Type, Lambda-Runtime-Function-Error-Body')
+        conn.endheaders()
+
+        prelude = dumps({'statusCode': status_code, 'headers': headers})
+        self._send_chunk(prelude + PRELUDE_DELIMITER)
+
+        trailers = b''
+        try:
+            for chunk in chunks:
+                if chunk:
+                    self._send_chunk(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+        except Exception as e:
+            print(f"Erreur pendant le streaming: {e}")
+            error_body = base64.b64encode(dumps({
+                'errorMessage': str(e),
+                'errorType': type(e).__name__
+            }))
+            trailers = (
+                f"Lambda-Runtime-Function-Error-Type: Runtime.{type(e).__name__}\r\n".encode('utf-8')
+                + b"Lambda-Runtime-Function-Error-Body: " + error_body + b"\r\n"
+            )
+
+        conn.send(b"0\r\n" + trailers + b"\r\n")
+        response = conn.getresponse()
+        response.read()
+
+    def _send_chunk(self, data: bytes):
+        self._conn.send(b"%x\r\n%s\r\n" % (len(data), data))
+
+
+def handle_invocation(client: RuntimeClient, request_id: str, event: Dict[str, Any], context: LambdaContext):
+    """Traiter une invocation en streaming (ou bufferisé en repli)"""
+    if RESPONSE_MODE == 'buffered':
+        result = lambda_handler(event, context)
+        client.post_response(request_id, dumps(result))
+        return
+
+    request_context = event.get('requestContext', {})
+    http_method = event.get('httpMethod') or request_context.get('http', {}).get('method')
+    if http_method == 'OPTIONS':
+        client.stream_response(request_id, 200, {'Content-Type': 'application/json'},
+                               [dumps({'message': 'OK'})])
+        return
+
+    client.stream_response(request_id, 200, STREAM_HEADERS, streaming_handler(event, context))
+
+
+def run():
+    """Boucle principale du runtime"""
+    client = RuntimeClient(os.environ['AWS_LAMBDA_RUNTIME_API'])
+    print(f"Runtime chat démarré (mode: {RESPONSE_MODE})")
+
+    while True:
+        headers, event = client.next_invocation()
+        request_id = headers.get('Lambda-Runtime-Aws-Request-Id')
+        try:
+            handle_invocation(client, request_id, event, LambdaContext(headers))
+        except Exception as e:
+            print(f"Erreur invocation {request_id}: {e}")
+            client.post_error(f"invocation/{request_id}/error", e)
+
+        # Stream déjà fermé côté client : les écritures différées (tour de
+        # conversation) doivent finir avant invocation/next, qui gèle l'environnement
+        if not flush_write_behind_queues():
+            print(f"Write-behind: écritures encore en attente après l'invocation {request_id}")
+
+
+if __name__ == '__main__':
+    try:
+        run()
+    except Exception as e:
+        runtime_api = os.environ.get('AWS_LAMBDA_RUNTIME_API')
+        if runtime_api:
+            RuntimeClient(runtime_api).post_error('init/error', e)
+        raise
@@ -5,21 +5,39 @@ import json
 import os
 import sys
 import base64
-import io
+import urllib.parse
 from typing import Optional
 
 # Ajouter le répertoire shared au path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'shared'))
 
-from utils import create_response, extract_user_id, validate_json_body, log_error
+from utils import create_response, extract_user_id, validate_json_body, log_error, sanitize_filename
+from extraction_cache import cache_key, get_extraction_cache
+from document_store import document_id
+from extraction import EXTRACTOR_VERSION, cache_variant, extract
+from uploads import (
+    UPLOAD_BUCKET, STATUS_READY, STATUS_ERROR,
+    create_presigned_upload, get_upload_s3_client, parse_source_key,
+    read_source, read_status, uploads_enabled, write_extracted_text, write_status
+)
 
 def lambda_handler(event, context):
     """
-    Handler principal pour le traitement de fichiers en mémoire
+    Handler principal pour le traitement de fichiers :
+    - POST /files              contenu base64 inline (petits fichiers)
+    - POST /files/presign      URL présignée pour un upload direct vers S3
+    - GET  /files/uploads/{id} statut de l'extraction d'un upload
+    - événement S3             extraction d'un fichier déposé via URL présignée
     """
+    # Déclenchement par S3 (pas de requête HTTP)
+    if event.get('Records') and event['Records'][0].get('eventSource') == 'aws:s3':
+        return process_s3_event(event)
+
     try:
-        # Validation de la méthode HTTP
-        if event.get('httpMethod') != 'POST':
+        http_method = event.get('httpMethod')
+        path = event.get('path', '')
+
+        if http_method not in ('GET', 'POST'):
             return create_response(405, {'error': 'Method not allowed'})
 
         # Extraction de l'utilisateur
@@ -27,6 +45,24 @@ def lambda_handler(event, context):
         if not user_id:
             return create_response(401, {'error': 'Unauthorized'})
 
+        if http_method == 'GET':
+            upload_id = ((event.get('pathParameters') or {}).get('uploadId')
+                         or (event.get('queryStringParameters') or {}).get('uploadId'))
+            if not upload_id:
+                return create_response(400, {'error': 'uploadId manquant'})
+            return get_upload_status(user_id, upload_id)
+
+        if path.endswith('/presign'):
+            if not uploads_enabled():
+                return create_response(503, {'error': 'Upload direct non configuré (UPLOAD_BUCKET)'})
+            body, error = validate_json_body(event, ['fileName', 'fileType'])
+            if error:
+                return create_response(400, {'error': error})
+            return create_response(200, create_presigned_upload(
+                get_upload_s3_client(), UPLOAD_BUCKET, user_id,
+                sanitize_filename(body['fileName']), body['fileType']
+            ))
+
         # Validation du body
         body, error = validate_json_body(event, ['fileName', 'fileType', 'fileContent'])
         if error:
@@ -43,6 +79,72 @@ def lambda_handler(event, context):
             'message': str(e)
         })
 
+def get_upload_status(user_id: str, upload_id: str):
+    """
+    Statut d'un upload (pending, ready, error), interrogé par le client
+    avant de référencer l'upload dans le chat
+    """
+    status = read_status(get_upload_s3_client(), UPLOAD_BUCKET, user_id, upload_id)
+    if not status:
+        return create_response(404, {'error': 'Upload introuvable'})
+    return create_response(200, status)
+
+def process_s3_event(event):
+    """
+    Extraire le texte des fichiers déposés via URL présignée.
+    Le texte est écrit à côté de l'objet (extracted.txt), puis le statut passe à ready.
+    """
+    results = []
+    for record in event['Records']:
+        bucket = record['s3']['bucket']['name']
+        # Les clés des événements S3 sont encodées (espaces en '+')
+        key = urllib.parse.unquote_plus(record['s3']['object']['key'])
+        try:
+            results.append(process_uploaded_object(bucket, key))
+        except Exception as e:
+            log_error('file_processor', e, {'bucket': bucket, 'key': key})
+            results.append({'key': key, 'status': STATUS_ERROR})
+    return {'results': results}
+
+def process_uploaded_object(bucket: str, key: str) -> dict:
+    """Extraction d'un fichier source d'upload"""
+    parsed = parse_source_key(key)
+    if not parsed:
+        # Objet écrit par ce pipeline (statut, texte extrait) : ignoré
+        return {'key': key, 'skipped': True}
+
+    s3 = get_upload_s3_client()
+    user_id, upload_id = parsed['user_id'], parsed['upload_id']
+    status = read_status(s3, bucket, user_id, upload_id) or {}
+    source = read_source(s3, bucket, key)
+    file_buffer = source['content']
+    file_name = status.get('fileName', parsed['file_name'])
+    file_type = status.get('fileType') or source['content_type']
+
+    extracted_text, processing_error = extract_with_cache(file_buffer, file_type, file_name)
+
+    if processing_error:
+        write_status(s3, bucket, user_id, upload_id, {
+            'status': STATUS_ERROR,
+            'fileName': file_name,
+            'fileType': file_type,
+            'fileSize': len(file_buffer),
+            'error': processing_error
+        })
+        return {'key': key, 'status': STATUS_ERROR}
+
+    # Texte d'abord : un statut ready garantit que extracted.txt est lisible
+    write_extracted_text(s3, bucket, user_id, upload_id, extracted_text)
+    write_status(s3, bucket, user_id, upload_id, {
+        'status': STATUS_READY,
+        'fileName': file_name,
+        'fileType': file_type,
+        'fileSize': len(file_buffer),
+        'documentId': document_id(file_buffer),
+        'textLength': len(extracted_text)
+    })
+    return {'key': key, 'status': STATUS_READY}
+
 def process_file_content(user_id: str, body: dict):
     """
     Traiter le contenu d'un fichier en mémoire et extraire le texte
@@ -58,7 +160,7 @@ def process_file_content(user_id: str, body: dict):
         raise ValueError(f"Erreur décodage base64: {e}")
     
     # Extraction du contenu textuel directement en mémoire
-    extracted_text, processing_error = extract_text_from_file(file_buffer, file_type, file_name)
+    extracted_text, processing_error = extract_with_cache(file_buffer, file_type, file_name)
     
     if processing_error:
         return {
@@ -76,97 +178,23 @@ def process_file_content(user_id: str, body: dict):
         'textLength': len(extracted_text)
     }
 
-def extract_text_from_file(file_buffer: bytes, mime_type: str, file_name: str) -> tuple[str, Optional[str]]:
-    """
-    Extraire le texte d'un fichier selon son type
-    """
-    try:
-        # Déterminer l'extension
-        extension = file_name.split('.')[-1].lower() if '.' in file_name else ''
-        
-        # PDF
-        if mime_type == 'application/pdf' or extension == 'pdf':
-            return extract_pdf_text(file_buffer)
-        
-        # DOCX
-        if mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' or extension == 'docx':
-            return extract_docx_text(file_buffer)
-        
-        # Fichiers texte
-        if (mime_type.startswith('text/') or 
-            extension in ['txt', 'json', 'md', 'js', 'ts', 'py', 'java', 'cpp', 'c', 'html', 'css', 'xml']):
-            return extract_text_file(file_buffer)
-        
-        # Type non supporté
-        return "", f"Type de fichier non supporté: {mime_type} (.{extension})"
-        
-    except Exception as e:
-        return "", f"Erreur lors de l'extraction du texte: {str(e)}"
-
-def extract_pdf_text(file_buffer: bytes) -> tuple[str, Optional[str]]:
-    """
-    Extraire le texte d'un fichier PDF
-    """
-    try:
-        import PyPDF2
-        
-        pdf_file = io.BytesIO(file_buffer)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        
-        text_content = []
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text_content.append(page.extract_text())
-        
-        extracted_text = '\n'.join(text_content)
-        
-        if not extracted_text.strip():
-            return "", "Aucun texte trouvé dans le PDF"
-        
-        return extracted_text, None
-        
-    except Exception as e:
-        return "", f"Erreur extraction PDF: {str(e)}"
-
-def extract_docx_text(file_buffer: bytes) -> tuple[str, Optional[str]]:
+def extract_with_cache(file_buffer: bytes, file_type: str, file_name: str) -> tuple[str, Optional[str]]:
     """
-    Extraire le texte d'un fichier DOCX
+    Extraire le texte, en cache par hash du contenu
+    (un fichier renvoyé à chaque tour n'est parsé qu'une fois)
     """
-    try:
-        import docx
-        
-        docx_file = io.BytesIO(file_buffer)
-        doc = docx.Document(docx_file)
-        
-        text_content = []
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                text_content.append(paragraph.text)
-        
-        extracted_text = '\n'.join(text_content)
-        
-        if not extracted_text.strip():
-            return "", "Aucun texte trouvé dans le document Word"
-        
-        return extracted_text, None
-        
-    except Exception as e:
-        return "", f"Erreur extraction DOCX: {str(e)}"
+    key = cache_key(file_buffer, EXTRACTOR_VERSION, variant=cache_variant(file_buffer, file_type, file_name))
+    return get_extraction_cache().get_or_extract(
+        key,
+        lambda: extract_text_from_file(file_buffer, file_type, file_name)
+    )
 
-def extract_text_file(file_buffer: bytes) -> tuple[str, Optional[str]]:
+def extract_text_from_file(file_buffer: bytes, mime_type: str, file_name: str) -> tuple[str, Optional[str]]:
     """
-    Extraire le contenu d'un fichier texte
+    Extraire le texte d'un fichier (format détecté par le moteur d'extraction partagé)
     """
-    try:
-        # Essayer différents encodages
-        for encoding in ['utf-8', 'latin-1', 'cp1252']:
-            try:
-                text_content = file_buffer.decode(encoding)
-                return text_content, None
-            except UnicodeDecodeError:
-                continue
-        
-        return "", "Impossible de décoder le fichier texte"
-        
-    except Exception as e:
-        return "", f"Erreur extraction fichier texte: {str(e)}"
\ No newline at end of file
+    result = extract(file_buffer, mime_type, file_name)
+    print(f"Extraction {file_name}: {result.summary()}")
+    if result.error:
+        return "", result.error
+    return result.text_with_note(), None
\ No newline at end of file
@@ -1,40 +1,269 @@
 """
 Clients AWS réutilisables pour les fonctions Lambda
+
+Registre partagé par les deux backends : chaque client est créé au premier
+usage (boto3 importé à ce moment-là), une seule fois même en cas d'accès
+concurrents, puis réutilisé par tous les threads (un seul pool de
+connexions par service).
+
+Configuration par service via l'environnement, AWS_CLIENT_{SERVICE}_{PARAM}
+avec repli sur AWS_CLIENT_{PARAM} (SERVICE : BEDROCK_RUNTIME, DYNAMODB, S3,
+COGNITO_IDP) : MAX_POOL, KEEPALIVE, CONNECT_TIMEOUT, READ_TIMEOUT,
+RETRY_MODE, MAX_ATTEMPTS, REGION.
+
+Métriques d'occupation du pool de connexions : requêtes HTTP en cours
+(événements botocore) et streams ouverts (track_stream).
 """
-import boto3
 import os
-from botocore.config import Config
-
-# Configuration avec retry pour la région principale
-config = Config(
-    region_name=os.environ.get('AWS_REGION', 'eu-west-3'),
-    retries={'max_attempts': 3, 'mode': 'adaptive'}
-)
-
-# Configuration Bedrock pour Claude 4.5 Sonnet à Paris
-bedrock_config = Config(
-    region_name='eu-west-3',  # Paris - Claude 4.5 Sonnet
-    retries={'max_attempts': 3, 'mode': 'adaptive'}
-)
-
-# Clients AWS
-bedrock_runtime = boto3.client('bedrock-runtime', config=bedrock_config)
-dynamodb = boto3.resource('dynamodb', config=config)
-s3_client = boto3.client('s3', config=config)
-cognito_client = boto3.client('cognito-idp', config=config)
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+# Valeurs par défaut par service : les streams Bedrock occupent une
+# connexion pendant toute la réponse (jusqu'à BEDROCK_STREAM_WORKERS en LWA)
+SERVICE_DEFAULTS = {
+    'bedrock-runtime': {'max_pool': 50, 'read_timeout': 300, 'region': 'eu-west-3'},
+    'dynamodb': {'max_pool': 50, 'read_timeout': 10},
+    's3': {'max_pool': 25},
+}
+
+DEFAULTS = {
+    'max_pool': 10,
+    'keepalive': True,
+    'connect_timeout': 5,
+    'read_timeout': 60,
+    'retry_mode': 'adaptive',
+    'max_attempts': 3,
+}
+
+
+@dataclass(frozen=True)
+class ClientSettings:
+    """Paramètres de connexion d'un service"""
+    region_name: str
+    max_pool_connections: int
+    tcp_keepalive: bool
+    connect_timeout: float
+    read_timeout: float
+    retry_mode: str
+    max_attempts: int
+
+    def to_config(self):
+        from botocore.config import Config
+        return Config(
+            region_name=self.region_name,
+            max_pool_connections=self.max_pool_connections,
+            tcp_keepalive=self.tcp_keepalive,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            retries={'max_attempts': self.max_attempts, 'mode': self.retry_mode}
+        )
+
+
+def _env(service: str, name: str) -> Optional[str]:
+    prefix = service.upper().replace('-', '_')
+    value = os.environ.get(f"AWS_CLIENT_{prefix}_{name}")
+    if value is None:
+        value = os.environ.get(f"AWS_CLIENT_{name}")
+    return value
+
+
+def client_settings(service: str) -> ClientSettings:
+    """Paramètres du service : environnement, puis défauts du service, puis défauts globaux"""
+    defaults = {**DEFAULTS, 'region': os.environ.get('AWS_REGION', 'eu-west-3'),
+                **SERVICE_DEFAULTS.get(service, {})}
+
+    def setting(name: str, cast: Callable):
+        value = _env(service, name.upper())
+        return defaults[name] if value is None else cast(value)
+
+    return ClientSettings(
+        region_name=setting('region', str),
+        max_pool_connections=setting('max_pool', int),
+        tcp_keepalive=setting('keepalive', lambda v: v.lower() in ('1', 'true', 'yes')),
+        connect_timeout=setting('connect_timeout', float),
+        read_timeout=setting('read_timeout', float),
+        retry_mode=setting('retry_mode', str),
+        max_attempts=setting('max_attempts', int),
+    )
+
+
+class PoolMetrics:
+    """
+    Occupation du pool de connexions d'un service.
+
+    urllib3 (botocore) ne bloque pas quand le pool est plein : il ouvre une
+    connexion supplémentaire, refermée ensuite. Une requête émise pool plein
+    est comptée comme saturée ; sa latence d'envoi (jusqu'aux en-têtes de la
+    réponse) inclut alors l'établissement de la connexion.
+    """
+
+    def __init__(self, pool_size: int, clock=time.perf_counter):
+        self.pool_size = pool_size
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.in_flight = 0
+        self.peak = 0
+        self.requests = 0
+        self.saturated = 0
+        self.streams = 0
+        self.send_seconds = 0.0
+        self.send_max_seconds = 0.0
+        self.saturated_send_seconds = 0.0
+
+    def acquire(self) -> bool:
+        """Une connexion en usage ; retourne True si le pool était déjà plein"""
+        with self._lock:
+            saturated = self.in_flight >= self.pool_size
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            if saturated:
+                self.saturated += 1
+            return saturated
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def before_send(self, **kwargs):
+        # Une requête botocore est synchrone : un envoi à la fois par thread
+        self._local.started = (self._clock(), self.acquire())
+        with self._lock:
+            self.requests += 1
+
+    def response_received(self, **kwargs):
+        started = getattr(self._local, 'started', None)
+        if started is None:
+            return
+        self._local.started = None
+        start, saturated = started
+        elapsed = self._clock() - start
+        self.release()
+        with self._lock:
+            self.send_seconds += elapsed
+            self.send_max_seconds = max(self.send_max_seconds, elapsed)
+            if saturated:
+                self.saturated_send_seconds += elapsed
+
+    @contextmanager
+    def stream(self):
+        """Connexion occupée pendant la lecture d'une réponse en streaming"""
+        self.acquire()
+        with self._lock:
+            self.streams += 1
+        try:
+            yield
+        finally:
+            self.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'in_flight': self.in_flight,
+                'peak': self.peak,
+                'requests': self.requests,
+                'streams': self.streams,
+                'saturated': self.saturated,
+                'send_avg_ms': round(self.send_seconds / self.requests * 1000, 1) if self.requests else 0.0,
+                'send_max_ms': round(self.send_max_seconds * 1000, 1),
+                'saturated_send_ms': round(self.saturated_send_seconds * 1000, 1),
+            }
+
+
+class ClientRegistry:
+    """Clients et ressources boto3 mémorisés par service"""
+
+    def __init__(self, settings_loader: Callable[[str], ClientSettings] = client_settings):
+        self._settings_loader = settings_loader
+        self._clients: Dict[str, Any] = {}
+        self._metrics: Dict[str, PoolMetrics] = {}
+        self._lock = threading.Lock()
+
+    def client(self, service: str):
+        return self._get_or_create(service, lambda boto3, config: boto3.client(service, config=config))
+
+    def resource(self, service: str):
+        return self._get_or_create(
+            service, lambda boto3, config: boto3.resource(service, config=config), key=f"{service}:resource"
+        )
+
+    def metrics(self, service: str) -> PoolMetrics:
+        with self._lock:
+            if service not in self._metrics:
+                settings = self._settings_loader(service)
+                self._metrics[service] = PoolMetrics(settings.max_pool_connections)
+            return self._metrics[service]
+
+    def set(self, key: str, client):
+        """Remplacer un client ('s3') ou une ressource ('dynamodb:resource') : tests, client local"""
+        with self._lock:
+            self._clients[key] = client
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {service: m.snapshot() for service, m in metrics.items()}
+
+    def _get_or_create(self, service: str, factory: Callable, key: Optional[str] = None):
+        key = key or service
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        metrics = self.metrics(service)
+        with self._lock:
+            if key not in self._clients:
+                import boto3
+                settings = self._settings_loader(service)
+                created = factory(boto3, settings.to_config())
+                # Une ressource expose son client bas niveau dans meta.client
+                events = getattr(created.meta, 'client', created).meta.events
+                events.register('before-send', metrics.before_send)
+                events.register('response-received', metrics.response_received)
+                self._clients[key] = created
+            return self._clients[key]
+
+
+_registry = ClientRegistry()
+
+
+def get_client_registry() -> ClientRegistry:
+    return _registry
+
 
 def get_bedrock_client():
     """Retourne le client Bedrock Runtime"""
-    return bedrock_runtime
+    return _registry.client('bedrock-runtime')
+
+
+def get_dynamodb_resource():
+    """Retourne la ressource DynamoDB"""
+    return _registry.resource('dynamodb')
+
 
 def get_dynamodb_table(table_name: str):
     """Retourne une table DynamoDB"""
-    return dynamodb.Table(table_name)
+    return get_dynamodb_resource().Table(table_name)
+
 
 def get_s3_client():
     """Retourne le client S3"""
-    return s3_client
+    return _registry.client('s3')
+
 
 def get_cognito_client():
     """Retourne le client Cognito"""
-    return cognito_client
\ No newline at end of file
+    return _registry.client('cognito-idp')
+
+
+def track_stream(service: str = 'bedrock-runtime'):
+    """Compter une réponse en streaming dans l'occupation du pool du service"""
+    return _registry.metrics(service).stream()
+
+
+def get_client_metrics() -> Dict[str, Dict[str, Any]]:
+    """Occupation des pools de connexions, par service"""
+    return _registry.snapshot()
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Construction des requêtes Bedrock (Claude) et suivi de l'usage des tokens
+"""
+import os
+from typing import Dict, Any, List, Optional
+
+from context_builder import FILES_CONTEXT_KIND, SUMMARY_CONTEXT_KIND
+
+MODEL_ID = os.environ.get('BEDROCK_MODEL_ID', 'eu.anthropic.claude-sonnet-4-5-20250929-v1:0')
+ANTHROPIC_VERSION = 'bedrock-2023-05-31'
+MAX_OUTPUT_TOKENS = int(os.environ.get('BEDROCK_MAX_TOKENS', '4000'))
+
+SYSTEM_PROMPT = (
+    "Tu es un assistant IA utile et bienveillant. Tu peux analyser des documents "
+    "et répondre aux questions à leur sujet. Réponds de manière claire et structurée."
+)
+
+# Cache de prompt : points de cache sur le système, les fichiers, le résumé et l'historique
+PROMPT_CACHING_ENABLED = os.environ.get('PROMPT_CACHING_ENABLED', 'true').lower() == 'true'
+CACHE_CONTROL = {'type': 'ephemeral'}
+
+# Champs d'usage renvoyés par Claude (message_start / message_delta)
+USAGE_FIELDS = (
+    'input_tokens',
+    'output_tokens',
+    'cache_creation_input_tokens',
+    'cache_read_input_tokens',
+)
+
+
+def _text_block(text: str, cache: bool) -> Dict[str, Any]:
+    """Bloc de contenu texte, avec point de cache si demandé"""
+    block = {'type': 'text', 'text': text}
+    if cache:
+        block['cache_control'] = CACHE_CONTROL
+    return block
+
+
+def format_messages_with_cache(messages: List[Dict[str, Any]], prompt_caching: bool) -> List[Dict[str, Any]]:
+    """
+    Formater les messages pour Bedrock en posant les points de cache :
+    - les messages de contexte fichiers et résumé (préfixe stable d'un tour à l'autre)
+    - le dernier message d'historique avant le nouveau message utilisateur
+    """
+    cache_indexes = set()
+    if prompt_caching and len(messages) > 1:
+        for i, msg in enumerate(messages[:-1]):
+            if msg.get('context') in (FILES_CONTEXT_KIND, SUMMARY_CONTEXT_KIND):
+                cache_indexes.add(i)
+        cache_indexes.add(len(messages) - 2)
+
+    formatted = []
+    for i, msg in enumerate(messages):
+        if i in cache_indexes:
+            content = [_text_block(msg['content'], cache=True)]
+        else:
+            content = msg['content']
+        formatted.append({'role': msg['role'], 'content': content})
+    return formatted
+
+
+def build_request_body(
+    messages: List[Dict[str, Any]],
+    system_prompt: str = SYSTEM_PROMPT,
+    max_tokens: int = MAX_OUTPUT_TOKENS,
+    prompt_caching: Optional[bool] = None
+) -> Dict[str, Any]:
+    """Construire le body d'une requête InvokeModel pour Claude"""
+    if prompt_caching is None:
+        prompt_caching = PROMPT_CACHING_ENABLED
+
+    return {
+        'anthropic_version': ANTHROPIC_VERSION,
+        'max_tokens': max_tokens,
+        'system': [_text_block(system_prompt, cache=prompt_caching)],
+        'messages': format_messages_with_cache(messages, prompt_caching)
+    }
+
+
+def new_usage() -> Dict[str, int]:
+    """Compteurs d'usage vides"""
+    return {field: 0 for field in USAGE_FIELDS}
+
+
+def update_usage(usage: Dict[str, int], chunk_data: Dict[str, Any]):
+    """
+    Mettre à jour les compteurs d'usage depuis un événement du stream Bedrock
+    (message_start porte l'entrée et le cache, message_delta la sortie)
+    """
+    event_type = chunk_data.get('type')
+    if event_type == 'message_start':
+        source = chunk_data.get('message', {}).get('usage', {})
+    elif event_type == 'message_delta':
+        source = chunk_data.get('usage', {})
+    else:
+        return
+
+    for field in USAGE_FIELDS:
+        if source.get(field) is not None:
+            usage[field] = int(source[field])
@@ -0,0 +1,198 @@
+"""
+Construction du contexte envoyé à Bedrock sous contrainte de budget de tokens
+"""
+import math
+import os
+from typing import Dict, Any, List, Optional
+
+# Budget d'entrée (historique + fichiers + nouveau message), hors prompt système
+MAX_INPUT_TOKENS = int(os.environ.get('CONTEXT_MAX_INPUT_TOKENS', '120000'))
+
+# Estimation tokens : ~3.5 caractères par token pour du français/code
+CHARS_PER_TOKEN = float(os.environ.get('CONTEXT_CHARS_PER_TOKEN', '3.5'))
+
+# Surcoût fixe par message (rôle, séparateurs)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# En dessous de ce reste, on ne tronque pas un ancien message : on l'abandonne
+MIN_TRUNCATED_TOKENS = 200
+
+TRUNCATION_MARKER = "[... contenu tronqué ...]"
+
+FILES_CONTEXT_PREFIX = "Voici les fichiers fournis en contexte:\n\n"
+
+# Marqueur du message de contexte fichiers (point de cache Bedrock)
+FILES_CONTEXT_KIND = 'files'
+
+SUMMARY_CONTEXT_PREFIX = "Résumé des échanges précédents de cette conversation:\n\n"
+SUMMARY_CONTEXT_KIND = 'summary'
+
+# Passages des gros documents retenus pour la question : joints au nouveau
+# message (après l'historique), ils ne cassent pas le préfixe en cache
+EXCERPTS_CONTEXT_PREFIX = "Extraits des fichiers fournis, pertinents pour cette question:\n\n"
+EXCERPTS_CONTEXT_KIND = 'excerpts'
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimer le nombre de tokens d'un texte"""
+    if not text:
+        return 0
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def count_message_tokens(message: Dict[str, Any]) -> int:
+    """
+    Nombre de tokens d'un message, mis en cache dans message['tokens']
+    pour n'être calculé qu'une fois (le champ est persisté avec l'historique)
+    """
+    cached = message.get('tokens')
+    if cached is not None:
+        # DynamoDB renvoie des Decimal
+        return int(cached)
+
+    tokens = estimate_tokens(message.get('content', '')) + MESSAGE_OVERHEAD_TOKENS
+    message['tokens'] = tokens
+    return tokens
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep: str = 'head') -> str:
+    """
+    Tronquer un texte pour tenir dans max_tokens.
+    keep='head' garde le début (documents), keep='tail' garde la fin (anciens tours)
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    budget_chars = int(max_tokens * CHARS_PER_TOKEN) - len(TRUNCATION_MARKER) - 2
+    if budget_chars <= 0:
+        return TRUNCATION_MARKER
+
+    if keep == 'tail':
+        return f"{TRUNCATION_MARKER}\n{text[-budget_chars:]}"
+    return f"{text[:budget_chars]}\n{TRUNCATION_MARKER}"
+
+
+def _truncated_copy(message: Dict[str, Any], max_tokens: int, keep: str) -> Dict[str, Any]:
+    """Copie tronquée d'un message (l'historique stocké n'est jamais modifié)"""
+    content_tokens = max(max_tokens - MESSAGE_OVERHEAD_TOKENS, 1)
+    content = truncate_to_tokens(message.get('content', ''), content_tokens, keep)
+    truncated = dict(message)
+    truncated['content'] = content
+    truncated['tokens'] = estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+    truncated['truncated'] = True
+    return truncated
+
+
+def build_files_message(files_text: str, timestamp: int) -> Dict[str, Any]:
+    """Construire le message de contexte contenant les fichiers fournis"""
+    return {
+        'role': 'user',
+        'content': f"{FILES_CONTEXT_PREFIX}{files_text}",
+        'timestamp': timestamp,
+        'context': FILES_CONTEXT_KIND
+    }
+
+
+def build_summary_message(summary_text: str, timestamp: int) -> Dict[str, Any]:
+    """Message de contexte contenant le résumé glissant des anciens tours"""
+    return {
+        'role': 'user',
+        'content': f"{SUMMARY_CONTEXT_PREFIX}{summary_text}",
+        'timestamp': timestamp,
+        'context': SUMMARY_CONTEXT_KIND
+    }
+
+
+def build_excerpts_message(excerpts_text: str, timestamp: int) -> Dict[str, Any]:
+    """Passages retenus pour la question (joints au nouveau message par build_context_messages)"""
+    return {
+        'role': 'user',
+        'content': f"{EXCERPTS_CONTEXT_PREFIX}{excerpts_text}",
+        'timestamp': timestamp,
+        'context': EXCERPTS_CONTEXT_KIND
+    }
+
+
+def build_context_messages(
+    history: List[Dict[str, Any]],
+    user_message: Dict[str, Any],
+    files_message: Optional[Dict[str, Any]] = None,
+    max_input_tokens: Optional[int] = None,
+    summary_message: Optional[Dict[str, Any]] = None,
+    excerpts_message: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Construire la liste de messages à envoyer à Bedrock.
+
+    Priorité : nouveau message > extraits > fichiers > résumé > historique récent.
+    Les tours les plus anciens sont abandonnés (ou tronqués) en premier.
+
+    Ordre envoyé : fichiers, résumé, historique, nouveau message. Les
+    fichiers sont placés en tête pour rester un préfixe stable (cache de
+    prompt Bedrock) même quand l'historique s'allonge ; le résumé ne change
+    qu'à chaque compaction. Les extraits, différents à chaque question,
+    précèdent le texte du nouveau message (copie : le message stocké reste
+    la question seule).
+    """
+    budget = max_input_tokens or MAX_INPUT_TOKENS
+
+    # Le nouveau message est toujours envoyé
+    user_tokens = count_message_tokens(user_message)
+    if user_tokens > budget:
+        user_message = _truncated_copy(user_message, budget, keep='tail')
+        user_tokens = user_message['tokens']
+    remaining = budget - user_tokens
+
+    if excerpts_message:
+        excerpts_tokens = count_message_tokens(excerpts_message)
+        if excerpts_tokens > remaining:
+            excerpts_message = (_truncated_copy(excerpts_message, remaining, keep='head')
+                                if remaining >= MIN_TRUNCATED_TOKENS else None)
+        if excerpts_message:
+            remaining -= count_message_tokens(excerpts_message)
+            user_message = dict(
+                user_message,
+                content=f"{excerpts_message['content']}\n\n{user_message['content']}",
+                tokens=user_tokens + count_message_tokens(excerpts_message)
+            )
+
+    # Contexte fichiers : tronqué si nécessaire, l'historique passe alors à la trappe
+    if files_message:
+        files_tokens = count_message_tokens(files_message)
+        if files_tokens > remaining:
+            files_message = _truncated_copy(files_message, remaining, keep='head') if remaining > 0 else None
+            remaining = 0
+        else:
+            remaining -= files_tokens
+
+    # Résumé glissant des tours repliés (history ne contient que les suivants)
+    if summary_message:
+        summary_tokens = count_message_tokens(summary_message)
+        if summary_tokens > remaining:
+            summary_message = (_truncated_copy(summary_message, remaining, keep='head')
+                               if remaining >= MIN_TRUNCATED_TOKENS else None)
+            remaining = 0
+        else:
+            remaining -= summary_tokens
+
+    # Historique : du plus récent au plus ancien tant que le budget le permet
+    kept: List[Dict[str, Any]] = []
+    for message in reversed(history):
+        tokens = count_message_tokens(message)
+        if tokens <= remaining:
+            kept.append(message)
+            remaining -= tokens
+            continue
+        if remaining >= MIN_TRUNCATED_TOKENS:
+            kept.append(_truncated_copy(message, remaining, keep='tail'))
+        break
+    kept.reverse()
+
+    # Bedrock exige que la conversation commence par un message utilisateur
+    while kept and kept[0].get('role') != 'user':
+        kept.pop(0)
+
+    context_messages = [msg for msg in (files_message, summary_message) if msg]
+    context_messages.extend(kept)
+    context_messages.append(user_message)
+    return context_messages
@@ -0,0 +1,405 @@
+"""
+Historique des conversations : un item par message, un en-tête par conversation
+
+Disposition dans la table d'historique (partition user_id) :
+- {conversation_id}                  en-tête (timestamp, message_count, preview, ttl,
+                                     résumé glissant éventuel : rolling_summary, rolling_summary_seq)
+- {conversation_id}#{seq:010d}       un message (role, content, sent_at, tokens, files)
+  content est compressé au-delà d'un seuil (voir message_codec)
+- {conversation_id}#turn#{turn_id}   séquences réservées par un tour (first_seq, ttl)
+
+L'identifiant de conversation ne contient pas de '#' (validé à l'entrée de
+l'API) : un ID « c1#0000000000 » désignerait un message d'une autre conversation.
+
+Un tour n'écrit que deux items (+ la mise à jour de l'en-tête) au lieu de
+réécrire toute la liste. Les messages n'ont pas d'attribut timestamp :
+l'index timestamp-index ne contient que les en-têtes.
+
+La liste des conversations lit l'index timestamp-index (projection limitée
+aux attributs de résumé), par pages, du plus récent au plus ancien.
+
+Ancien format : la liste complète dans l'attribut messages de l'en-tête.
+Elle est relue telle quelle (séquences 0..n-1) ; les nouveaux messages
+sont ajoutés à la suite, sans réécriture de l'existant.
+"""
+import base64
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from message_codec import pack_text, unpack_text
+
+SEQ_WIDTH = 10
+SEQ_MAX = 10 ** SEQ_WIDTH - 1
+
+# UUID générés par le serveur (ou ID simples) : ni '#' ni séparateur de clé
+CONVERSATION_ID_PATTERN = re.compile(r'[A-Za-z0-9-]{1,64}')
+TURN_INFIX = '#turn#'
+
+CONVERSATION_TTL_DAYS = 90
+PREVIEW_CHARS = 100
+
+# Messages relus pour construire le contexte (le budget de tokens s'applique ensuite)
+HISTORY_LIMIT = int(os.environ.get('CONVERSATION_HISTORY_LIMIT', '200'))
+
+# Attributs d'un message conservés en plus de role/content
+OPTIONAL_MESSAGE_FIELDS = ('tokens', 'files')
+
+# Liste des conversations : index et attributs de résumé projetés
+SUMMARY_INDEX = 'timestamp-index'
+SUMMARY_ATTRIBUTES = ('conversation_id', 'timestamp', 'message_count', 'preview')
+LIST_DEFAULT_LIMIT = 50
+LIST_MAX_LIMIT = 100
+
+
+def _key(name: str):
+    # Import différé : boto3 n'est chargé qu'au premier accès à la table
+    from boto3.dynamodb.conditions import Key
+    return Key(name)
+
+
+def is_valid_conversation_id(conversation_id: Any) -> bool:
+    return isinstance(conversation_id, str) and CONVERSATION_ID_PATTERN.fullmatch(conversation_id) is not None
+
+
+def message_key(conversation_id: str, seq: int) -> str:
+    return f"{conversation_id}#{seq:0{SEQ_WIDTH}d}"
+
+
+def turn_key(conversation_id: str, turn_id: str) -> str:
+    # 't' > '9' : hors de l'intervalle des clés de messages
+    return f"{conversation_id}{TURN_INFIX}{turn_id}"
+
+
+def is_conversation_header(sort_key: str) -> bool:
+    """Les items annexes (messages, documents) ont un '#' dans leur clé de tri"""
+    return '#' not in sort_key
+
+
+def next_sequence(messages: List[Dict[str, Any]], summary: Optional[Dict[str, Any]] = None) -> int:
+    """Séquence du prochain message, d'après l'historique chargé (et le résumé glissant)"""
+    if not messages:
+        return summary['seq'] + 1 if summary else 0
+    return int(messages[-1].get('seq', len(messages) - 1)) + 1
+
+
+def _message_item(user_id: str, conversation_id: str, seq: int,
+                  message: Dict[str, Any], ttl: int) -> Dict[str, Any]:
+    item = {
+        'user_id': user_id,
+        'conversation_id': message_key(conversation_id, seq),
+        'role': message['role'],
+        'sent_at': int(message.get('timestamp') or time.time() * 1000),
+        'ttl': ttl
+    }
+    pack_text(item, 'content', message['content'])
+    for field in OPTIONAL_MESSAGE_FIELDS:
+        if message.get(field) is not None:
+            item[field] = message[field]
+    return item
+
+
+def _item_message(item: Dict[str, Any]) -> Dict[str, Any]:
+    message = {
+        'role': item['role'],
+        'content': unpack_text(item, 'content'),
+        'timestamp': int(item.get('sent_at', 0)),
+        'seq': int(item['conversation_id'].rsplit('#', 1)[1])
+    }
+    if 'tokens' in item:
+        message['tokens'] = int(item['tokens'])
+    if item.get('files') is not None:
+        message['files'] = item['files']
+    return message
+
+
+def encode_cursor(last_evaluated_key: Dict[str, Any]) -> str:
+    """Curseur opaque à partir du LastEvaluatedKey de DynamoDB"""
+    data = json.dumps(last_evaluated_key, default=int, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, user_id: str) -> Dict[str, Any]:
+    """ExclusiveStartKey correspondant au curseur (ValueError si invalide)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Curseur invalide: {e}")
+    if not isinstance(key, dict) or key.get('user_id') != user_id or set(key) != {'user_id', 'conversation_id', 'timestamp'}:
+        raise ValueError("Curseur invalide")
+    return key
+
+
+def _summary(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'conversationId': item['conversation_id'],
+        'timestamp': int(item.get('timestamp', 0)),
+        'messageCount': int(item.get('message_count', 0)),
+        'preview': item.get('preview', '')
+    }
+
+
+def _legacy_messages(header: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Messages de l'ancien format (liste dans l'en-tête), numérotés 0..n-1"""
+    if not header:
+        return []
+    return [dict(msg, seq=i) for i, msg in enumerate(header.get('messages', []))]
+
+
+def header_summary(header: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Résumé glissant de l'en-tête : {'text', 'seq'} (dernier message résumé), ou None"""
+    if not header or 'rolling_summary_seq' not in header:
+        return None
+    return {
+        'text': unpack_text(header, 'rolling_summary'),
+        'seq': int(header['rolling_summary_seq'])
+    }
+
+
+class ConversationStore:
+    """Lecture / écriture des messages d'une conversation"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def get_header(self, user_id: str, conversation_id: str) -> Optional[Dict[str, Any]]:
+        response = self.table.get_item(Key={
+            'user_id': user_id,
+            'conversation_id': conversation_id
+        })
+        return response.get('Item')
+
+    def load_messages(self, user_id: str, conversation_id: str,
+                      limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Messages de la conversation dans l'ordre, ou seulement les limit derniers
+        (query en ordre décroissant, paginée jusqu'à limit).
+        """
+        header = self.get_header(user_id, conversation_id)
+        return self._load_messages(header, user_id, conversation_id, limit)
+
+    def load_context(self, user_id: str, conversation_id: str,
+                     limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Historique pour construire le contexte : (messages postérieurs au
+        résumé glissant, résumé ou None). Les messages déjà résumés ne sont
+        pas relus.
+        """
+        header = self.get_header(user_id, conversation_id)
+        summary = header_summary(header)
+        first_seq = summary['seq'] + 1 if summary else 0
+        return self._load_messages(header, user_id, conversation_id, limit, first_seq), summary
+
+    def _load_messages(self, header: Optional[Dict[str, Any]], user_id: str, conversation_id: str,
+                       limit: Optional[int] = None, first_seq: int = 0) -> List[Dict[str, Any]]:
+        if limit is not None and limit <= 0:
+            return []
+        legacy = [msg for msg in _legacy_messages(header) if msg['seq'] >= first_seq]
+
+        kwargs = {
+            'KeyConditionExpression': _key('user_id').eq(user_id) & _key('conversation_id').between(
+                message_key(conversation_id, first_seq), message_key(conversation_id, SEQ_MAX)
+            ),
+            'ScanIndexForward': limit is None
+        }
+        items = []
+        while True:
+            if limit is not None:
+                kwargs['Limit'] = limit - len(items)
+            response = self.table.query(**kwargs)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response or (limit is not None and len(items) >= limit):
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        messages = [_item_message(item) for item in items]
+        if limit is not None:
+            messages.reverse()
+        messages = legacy + messages
+        if limit is not None:
+            messages = messages[-limit:]
+        return messages
+
+    def append_messages(self, user_id: str, conversation_id: str,
+                        messages: List[Dict[str, Any]], base_seq: int = 0,
+                        turn_id: Optional[str] = None) -> int:
+        """
+        Ajouter les messages d'un tour.
+        Les séquences sont réservées sur l'en-tête (compteur atomique) ;
+        base_seq sert uniquement à la première écriture (conversation
+        nouvelle ou encore à l'ancien format). Retourne la séquence qui suit
+        le tour (le nombre de messages pour le dernier tour écrit).
+
+        turn_id rend l'écriture idempotente : les séquences réservées sont
+        enregistrées par tour, rejouer le même tour (retry, y compris après
+        d'autres tours) réécrit les mêmes items au lieu d'en réserver de
+        nouvelles. Un échec entre la réservation et son enregistrement
+        laisse un trou dans les séquences, jamais de doublon.
+        """
+        if not messages:
+            return base_seq
+
+        now = int(time.time() * 1000)
+        # Chaque item a son propre TTL : les messages de plus de 90 jours expirent
+        ttl = int(time.time()) + CONVERSATION_TTL_DAYS * 24 * 60 * 60
+
+        update_expression = (
+            'SET message_count = if_not_exists(message_count, :base) + :n, '
+            '#timestamp = :now, #ttl = :ttl'
+        )
+        values = {':base': base_seq, ':n': len(messages), ':now': now, ':ttl': ttl}
+        if base_seq == 0:
+            # Nouvelle conversation : l'aperçu est le premier message utilisateur
+            # (ancien format : calculé depuis la liste lors du listing)
+            update_expression += ', preview = if_not_exists(preview, :preview)'
+            values[':preview'] = next(
+                (msg['content'] for msg in messages if msg['role'] == 'user'),
+                messages[0]['content']
+            )[:PREVIEW_CHARS]
+
+        first_seq = self._reserved_sequence(user_id, conversation_id, turn_id) if turn_id else None
+        if first_seq is None:
+            response = self.table.update_item(
+                Key={'user_id': user_id, 'conversation_id': conversation_id},
+                UpdateExpression=update_expression,
+                ExpressionAttributeNames={'#timestamp': 'timestamp', '#ttl': 'ttl'},
+                ExpressionAttributeValues=values,
+                ReturnValues='UPDATED_NEW'
+            )
+            first_seq = int(response['Attributes']['message_count']) - len(messages)
+            if turn_id:
+                # Enregistrée avant les messages : un retry réutilise ces séquences
+                self.table.put_item(Item={
+                    'user_id': user_id,
+                    'conversation_id': turn_key(conversation_id, turn_id),
+                    'first_seq': first_seq,
+                    'ttl': ttl
+                })
+
+        with self.table.batch_writer() as batch:
+            for offset, message in enumerate(messages):
+                message['seq'] = first_seq + offset
+                batch.put_item(Item=_message_item(user_id, conversation_id, message['seq'], message, ttl))
+
+        return first_seq + len(messages)
+
+    def _reserved_sequence(self, user_id: str, conversation_id: str, turn_id: str) -> Optional[int]:
+        """Première séquence déjà réservée par ce tour (retry), ou None"""
+        item = self.table.get_item(
+            Key={'user_id': user_id, 'conversation_id': turn_key(conversation_id, turn_id)},
+            ConsistentRead=True
+        ).get('Item')
+        return int(item['first_seq']) if item else None
+
+    def put_summary(self, user_id: str, conversation_id: str, text: str, seq: int,
+                    previous_seq: Optional[int] = None) -> bool:
+        """
+        Enregistrer le résumé glissant (messages jusqu'à seq inclus).
+        Écriture conditionnelle sur le résumé lu avant génération : retourne
+        False si un autre tour l'a modifié entre-temps (résumé abandonné).
+        """
+        packed = pack_text({}, 'rolling_summary', text)
+        update_expression = 'SET rolling_summary = :summary, rolling_summary_seq = :seq'
+        values = {':summary': packed['rolling_summary'], ':seq': seq}
+        if 'rolling_summary_codec' in packed:
+            update_expression += ', rolling_summary_codec = :codec'
+            values[':codec'] = packed['rolling_summary_codec']
+        else:
+            update_expression += ' REMOVE rolling_summary_codec'
+
+        if previous_seq is None:
+            condition = 'attribute_exists(message_count) AND attribute_not_exists(rolling_summary_seq)'
+        else:
+            condition = 'rolling_summary_seq = :previous'
+            values[':previous'] = previous_seq
+
+        try:
+            self.table.update_item(
+                Key={'user_id': user_id, 'conversation_id': conversation_id},
+                UpdateExpression=update_expression,
+                ConditionExpression=condition,
+                ExpressionAttributeValues=values
+            )
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            return False
+        return True
+
+    def list_conversations(self, user_id: str, limit: int = LIST_DEFAULT_LIMIT,
+                           cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Une page de résumés de conversations, de la plus récente à la plus ancienne.
+        Retourne (résumés, curseur de la page suivante ou None).
+        """
+        limit = max(1, min(limit, LIST_MAX_LIMIT))
+        kwargs = {
+            'IndexName': SUMMARY_INDEX,
+            'KeyConditionExpression': _key('user_id').eq(user_id),
+            'ScanIndexForward': False,
+            'Limit': limit,
+            'ProjectionExpression': ', '.join(f"#{name}" for name in SUMMARY_ATTRIBUTES),
+            'ExpressionAttributeNames': {f"#{name}": name for name in SUMMARY_ATTRIBUTES}
+        }
+        if cursor:
+            kwargs['ExclusiveStartKey'] = decode_cursor(cursor, user_id)
+
+        response = self.table.query(**kwargs)
+        summaries = []
+        for item in response.get('Items', []):
+            if not is_conversation_header(item['conversation_id']):
+                continue
+            if 'preview' not in item:
+                item = self._backfill_summary(user_id, item)
+            if int(item.get('message_count', 0)):
+                summaries.append(_summary(item))
+
+        last_key = response.get('LastEvaluatedKey')
+        return summaries, encode_cursor(last_key) if last_key else None
+
+    def _backfill_summary(self, user_id: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Conversation à l'ancien format : calculer le résumé depuis la liste
+        des messages et l'écrire dans l'en-tête (une seule fois)
+        """
+        header = self.get_header(user_id, item['conversation_id']) or {}
+        messages = header.get('messages', [])
+        if not messages:
+            return item
+
+        summary = {
+            'message_count': int(header.get('message_count', len(messages))),
+            'preview': messages[0].get('content', '')[:PREVIEW_CHARS]
+        }
+        self.table.update_item(
+            Key={'user_id': user_id, 'conversation_id': item['conversation_id']},
+            UpdateExpression='SET message_count = if_not_exists(message_count, :count), preview = :preview',
+            ExpressionAttributeValues={':count': summary['message_count'], ':preview': summary['preview']}
+        )
+        return dict(item, **summary)
+
+    def delete_conversation(self, user_id: str, conversation_id: str):
+        """Supprimer l'en-tête, tous les messages et les réservations des tours"""
+        keys = [{'user_id': user_id, 'conversation_id': conversation_id}]
+        for sort_key in (
+            _key('conversation_id').between(message_key(conversation_id, 0), message_key(conversation_id, SEQ_MAX)),
+            _key('conversation_id').begins_with(f"{conversation_id}{TURN_INFIX}")
+        ):
+            kwargs = {
+                'KeyConditionExpression': _key('user_id').eq(user_id) & sort_key,
+                'ProjectionExpression': 'conversation_id'
+            }
+            while True:
+                response = self.table.query(**kwargs)
+                keys.extend(
+                    {'user_id': user_id, 'conversation_id': item['conversation_id']}
+                    for item in response.get('Items', [])
+                )
+                if 'LastEvaluatedKey' not in response:
+                    break
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        with self.table.batch_writer() as batch:
+            for key in keys:
+                batch.delete_item(Key=key)
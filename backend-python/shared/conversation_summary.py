@@ -0,0 +1,100 @@
+"""
+Résumé glissant des conversations longues (compaction de l'historique)
+
+Quand l'historique non résumé dépasse CONTEXT_SUMMARY_TRIGGER_TOKENS, les
+anciens tours sont repliés dans un résumé stocké sur l'en-tête de la
+conversation (rolling_summary, jusqu'à la séquence rolling_summary_seq).
+Le contexte envoyé à Bedrock devient alors : résumé + tours récents.
+
+Le résumé est généré après le tour (file write-behind), jamais sur le
+chemin de la réponse. Il est mis à jour de façon incrémentale : le modèle
+reçoit le résumé précédent et uniquement les messages à y replier.
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+from bedrock_request import ANTHROPIC_VERSION, MODEL_ID
+from context_builder import count_message_tokens
+from serialization import dumps, loads
+
+SUMMARY_ENABLED = os.environ.get('CONTEXT_SUMMARY_ENABLED', 'false').lower() == 'true'
+# Tokens d'historique non résumé au-delà desquels les anciens tours sont repliés
+SUMMARY_TRIGGER_TOKENS = int(os.environ.get('CONTEXT_SUMMARY_TRIGGER_TOKENS', '20000'))
+# Derniers messages toujours envoyés tels quels
+SUMMARY_KEEP_MESSAGES = int(os.environ.get('CONTEXT_SUMMARY_KEEP_MESSAGES', '8'))
+SUMMARY_MAX_TOKENS = int(os.environ.get('CONTEXT_SUMMARY_MAX_TOKENS', '1500'))
+SUMMARY_MODEL_ID = os.environ.get('CONTEXT_SUMMARY_MODEL_ID') or MODEL_ID
+
+SUMMARY_SYSTEM_PROMPT = (
+    "Tu tiens à jour le résumé d'une conversation entre un utilisateur et un assistant. "
+    "Intègre les nouveaux échanges au résumé existant sans perdre les informations utiles : "
+    "faits, décisions, préférences exprimées, questions restées ouvertes, noms et chiffres cités. "
+    "Réponds uniquement par le résumé mis à jour, en prose concise, dans la langue de la conversation."
+)
+
+ROLE_LABELS = {'user': 'Utilisateur', 'assistant': 'Assistant'}
+
+
+def messages_to_fold(history: List[Dict[str, Any]],
+                     pending: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """
+    Messages de l'historique à replier dans le résumé, ou [] si le seuil
+    n'est pas atteint. history : messages stockés non encore résumés ;
+    pending : messages du tour en cours (comptés, gardés tels quels).
+    Les messages repliés se terminent par une réponse de l'assistant : les
+    tours récents commencent donc toujours par un message utilisateur.
+    """
+    pending = pending or []
+    if sum(count_message_tokens(msg) for msg in history + pending) <= SUMMARY_TRIGGER_TOKENS:
+        return []
+
+    folded = history[:max(len(history) + len(pending) - SUMMARY_KEEP_MESSAGES, 0)]
+    while folded and folded[-1].get('role') != 'assistant':
+        folded.pop()
+    return folded
+
+
+def format_transcript(messages: List[Dict[str, Any]]) -> str:
+    return '\n\n'.join(
+        f"{ROLE_LABELS.get(msg['role'], msg['role'])} : {msg['content']}" for msg in messages
+    )
+
+
+def build_summary_request(previous_summary: str, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Body InvokeModel : résumé précédent + messages à y intégrer"""
+    parts = []
+    if previous_summary:
+        parts.append(f"Résumé actuel :\n{previous_summary}")
+    parts.append(f"Nouveaux échanges à intégrer :\n{format_transcript(messages)}")
+    return {
+        'anthropic_version': ANTHROPIC_VERSION,
+        'max_tokens': SUMMARY_MAX_TOKENS,
+        'system': SUMMARY_SYSTEM_PROMPT,
+        'messages': [{'role': 'user', 'content': '\n\n'.join(parts)}]
+    }
+
+
+def generate_summary(bedrock_client, previous_summary: str, messages: List[Dict[str, Any]]) -> str:
+    """Nouveau résumé (appel Bedrock non streamé) ; les erreurs sont propagées"""
+    response = bedrock_client.invoke_model(
+        modelId=SUMMARY_MODEL_ID,
+        contentType='application/json',
+        body=dumps(build_summary_request(previous_summary, messages))
+    )
+    response_body = loads(response['body'].read())
+    text = ''.join(block.get('text', '') for block in response_body.get('content', [])).strip()
+    if not text:
+        raise ValueError("Résumé vide")
+    return text
+
+
+def update_summary(store, bedrock_client, user_id: str, conversation_id: str,
+                   summary: Optional[Dict[str, Any]], messages: List[Dict[str, Any]]) -> bool:
+    """
+    Tâche write-behind : replier messages dans le résumé et l'enregistrer.
+    Retourne False si un autre tour a déjà avancé le résumé entre-temps.
+    """
+    previous_text = summary['text'] if summary else ''
+    previous_seq = summary['seq'] if summary else None
+    text = generate_summary(bedrock_client, previous_text, messages)
+    return store.put_summary(user_id, conversation_id, text, int(messages[-1]['seq']), previous_seq)
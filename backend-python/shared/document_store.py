@@ -0,0 +1,275 @@
+"""
+Documents d'une conversation : stockés une fois (texte extrait), référencés par ID
+
+Les documents vivent dans la table d'historique, sous la même partition
+utilisateur, avec une clé de tri dérivée de la conversation :
+- {conversation_id}#doc#{document_id}          en-tête (nom, type, taille)
+- {conversation_id}#doc#{document_id}#{part}   texte extrait, découpé en parts
+  (un item DynamoDB est limité à 400 KB), compressé au-delà d'un seuil
+- {conversation_id}#doc#{document_id}#idx#{part}  index de recherche (retrieval),
+  découpé de la même façon, écrit après coup
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from message_codec import pack_text, unpack_text
+
+DOC_SEPARATOR = '#doc#'
+INDEX_SUFFIX = '#idx'
+
+# Caractères par part (UTF-8 : jusqu'à 4 octets par caractère, marge pour les attributs)
+PART_MAX_CHARS = 80_000
+
+DOCUMENT_TTL_DAYS = 90
+
+
+def _key(name: str):
+    # Import différé : boto3 n'est chargé qu'au premier accès à la table
+    from boto3.dynamodb.conditions import Key
+    return Key(name)
+
+
+def document_id(data: Optional[bytes] = None, digest: Optional[str] = None) -> str:
+    """
+    ID d'un document : hash de son contenu (un même fichier n'est stocké qu'une fois).
+    digest : SHA-256 hexadécimal déjà calculé (fichier reçu en flux).
+    """
+    return (digest or hashlib.sha256(data).hexdigest())[:32]
+
+
+def document_prefix(conversation_id: str) -> str:
+    return f"{conversation_id}{DOC_SEPARATOR}"
+
+
+def is_document_key(sort_key: str) -> bool:
+    return DOC_SEPARATOR in sort_key
+
+
+def _document_metadata(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': doc['id'],
+        'name': doc['name'],
+        'type': doc['type'],
+        'textLength': int(doc.get('textLength', len(doc.get('text', '')))),
+        'createdAt': int(doc.get('createdAt', 0))
+    }
+
+
+class DynamoDBDocumentStore:
+    """Documents d'une conversation dans la table d'historique"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def put_document(self, user_id: str, conversation_id: str, doc_id: str,
+                     name: str, file_type: str, text: str) -> Dict[str, Any]:
+        """Stocker un document (les parts d'abord, l'en-tête en dernier)"""
+        prefix = f"{document_prefix(conversation_id)}{doc_id}"
+        parts = [text[i:i + PART_MAX_CHARS] for i in range(0, len(text), PART_MAX_CHARS)] or ['']
+        ttl = int(time.time()) + DOCUMENT_TTL_DAYS * 24 * 60 * 60
+        created_at = int(time.time() * 1000)
+
+        with self.table.batch_writer() as batch:
+            for index, part in enumerate(parts):
+                batch.put_item(Item=pack_text({
+                    'user_id': user_id,
+                    'conversation_id': f"{prefix}#{index:04d}",
+                    'ttl': ttl
+                }, 'text', part))
+
+        self.table.put_item(Item={
+            'user_id': user_id,
+            'conversation_id': prefix,
+            'doc_id': doc_id,
+            'name': name,
+            'file_type': file_type,
+            'text_length': len(text),
+            'part_count': len(parts),
+            'created_at': created_at,
+            'ttl': ttl
+        })
+
+        return {
+            'id': doc_id,
+            'name': name,
+            'type': file_type,
+            'textLength': len(text),
+            'createdAt': created_at
+        }
+
+    def put_index(self, user_id: str, conversation_id: str, doc_id: str, payload: str):
+        """Stocker l'index de recherche d'un document (parts, puis leur nombre dans l'en-tête)"""
+        prefix = f"{document_prefix(conversation_id)}{doc_id}{INDEX_SUFFIX}"
+        parts = [payload[i:i + PART_MAX_CHARS] for i in range(0, len(payload), PART_MAX_CHARS)] or ['']
+        ttl = int(time.time()) + DOCUMENT_TTL_DAYS * 24 * 60 * 60
+
+        with self.table.batch_writer() as batch:
+            for index, part in enumerate(parts):
+                batch.put_item(Item=pack_text({
+                    'user_id': user_id,
+                    'conversation_id': f"{prefix}#{index:04d}",
+                    'ttl': ttl
+                }, 'text', part))
+
+        # Document supprimé entre-temps : l'en-tête n'est pas recréé
+        try:
+            self.table.update_item(
+                Key={'user_id': user_id, 'conversation_id': f"{document_prefix(conversation_id)}{doc_id}"},
+                UpdateExpression='SET index_part_count = :count',
+                ConditionExpression='attribute_exists(doc_id)',
+                ExpressionAttributeValues={':count': len(parts)}
+            )
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            pass
+
+    def _query_prefix(self, user_id: str, prefix: str) -> List[Dict[str, Any]]:
+        """Tous les items dont la clé de tri commence par prefix (pagination incluse)"""
+        items = []
+        kwargs = {
+            'KeyConditionExpression': _key('user_id').eq(user_id) & _key('conversation_id').begins_with(prefix)
+        }
+        while True:
+            response = self.table.query(**kwargs)
+            items.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return items
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def list_documents(self, user_id: str, conversation_id: str) -> List[Dict[str, Any]]:
+        """Métadonnées des documents de la conversation (sans le texte)"""
+        documents = []
+        for item in self._query_prefix(user_id, document_prefix(conversation_id)):
+            if 'doc_id' not in item:
+                continue
+            documents.append({
+                'id': item['doc_id'],
+                'name': item.get('name', ''),
+                'type': item.get('file_type', ''),
+                'textLength': int(item.get('text_length', 0)),
+                'createdAt': int(item.get('created_at', 0))
+            })
+        documents.sort(key=lambda doc: (doc['createdAt'], doc['name']))
+        return documents
+
+    def load_documents(self, user_id: str, conversation_id: str,
+                       doc_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Documents de la conversation avec leur texte.
+        doc_ids limite aux documents référencés (tous par défaut).
+        """
+        headers = {}
+        parts: Dict[str, Dict[int, str]] = {}
+        index_parts: Dict[str, Dict[int, str]] = {}
+        for item in self._query_prefix(user_id, document_prefix(conversation_id)):
+            if 'doc_id' in item:
+                headers[item['doc_id']] = item
+            else:
+                doc_key, part_index = item['conversation_id'].rsplit('#', 1)
+                doc_key = doc_key[len(document_prefix(conversation_id)):]
+                target = parts
+                if doc_key.endswith(INDEX_SUFFIX):
+                    doc_key, target = doc_key[:-len(INDEX_SUFFIX)], index_parts
+                target.setdefault(doc_key, {})[int(part_index)] = unpack_text(item, 'text')
+
+        wanted = set(doc_ids) if doc_ids else None
+        documents = []
+        for doc_key, header in headers.items():
+            if wanted is not None and doc_key not in wanted:
+                continue
+            doc_parts = parts.get(doc_key, {})
+            part_count = int(header.get('part_count', len(doc_parts)))
+            if len(doc_parts) < part_count:
+                # Écriture interrompue : document incomplet ignoré
+                continue
+            doc = {
+                'id': doc_key,
+                'name': header.get('name', ''),
+                'type': header.get('file_type', ''),
+                'text': ''.join(doc_parts[i] for i in range(part_count)),
+                'textLength': int(header.get('text_length', 0)),
+                'createdAt': int(header.get('created_at', 0))
+            }
+            doc_index_parts = index_parts.get(doc_key, {})
+            index_part_count = int(header.get('index_part_count', 0))
+            if index_part_count and all(i in doc_index_parts for i in range(index_part_count)):
+                doc['index'] = ''.join(doc_index_parts[i] for i in range(index_part_count))
+            documents.append(doc)
+        documents.sort(key=lambda doc: (doc['createdAt'], doc['name']))
+        return documents
+
+    def delete_documents(self, user_id: str, conversation_id: str):
+        """Supprimer tous les documents de la conversation"""
+        items = self._query_prefix(user_id, document_prefix(conversation_id))
+        with self.table.batch_writer() as batch:
+            for item in items:
+                batch.delete_item(Key={
+                    'user_id': user_id,
+                    'conversation_id': item['conversation_id']
+                })
+
+
+class InMemoryDocumentStore:
+    """Équivalent en mémoire (tests, développement local)"""
+
+    def __init__(self):
+        self._documents: Dict[tuple, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def put_document(self, user_id: str, conversation_id: str, doc_id: str,
+                     name: str, file_type: str, text: str) -> Dict[str, Any]:
+        doc = {
+            'id': doc_id,
+            'name': name,
+            'type': file_type,
+            'text': text,
+            'textLength': len(text),
+            'createdAt': int(time.time() * 1000)
+        }
+        with self._lock:
+            self._documents.setdefault((user_id, conversation_id), {})[doc_id] = doc
+        return _document_metadata(doc)
+
+    def put_index(self, user_id: str, conversation_id: str, doc_id: str, payload: str):
+        with self._lock:
+            doc = self._documents.get((user_id, conversation_id), {}).get(doc_id)
+            if doc is not None:
+                doc['index'] = payload
+
+    def list_documents(self, user_id: str, conversation_id: str) -> List[Dict[str, Any]]:
+        return [_document_metadata(doc) for doc in self.load_documents(user_id, conversation_id)]
+
+    def load_documents(self, user_id: str, conversation_id: str,
+                       doc_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            documents = list(self._documents.get((user_id, conversation_id), {}).values())
+        if doc_ids:
+            documents = [doc for doc in documents if doc['id'] in set(doc_ids)]
+        return sorted(documents, key=lambda doc: (doc['createdAt'], doc['name']))
+
+    def delete_documents(self, user_id: str, conversation_id: str):
+        with self._lock:
+            self._documents.pop((user_id, conversation_id), None)
+
+
+_memory_store = None
+
+
+def build_document_store(table):
+    """Store configuré par DOCUMENT_STORE_BACKEND ('dynamodb' par défaut, 'memory')"""
+    global _memory_store
+    if os.environ.get('DOCUMENT_STORE_BACKEND', 'dynamodb').lower() == 'memory':
+        if _memory_store is None:
+            _memory_store = InMemoryDocumentStore()
+        return _memory_store
+    return DynamoDBDocumentStore(table)
+
+
+def format_documents_context(documents: List[Dict[str, Any]]) -> str:
+    """Texte du message de contexte fichiers"""
+    return '\n'.join(
+        f"<fichier nom='{doc['name']}'>\n{doc['text']}\n</fichier>"
+        for doc in documents
+    )
@@ -0,0 +1,67 @@
+"""
+Extraction du texte des fichiers joints, commune aux deux backends
+
+Un registre de formats (PDF, DOCX, XLSX, PPTX, texte) choisit l'extracteur
+d'après les octets magiques, le type MIME puis l'extension, applique les
+limites du format et retourne un ExtractionResult (texte, pages, troncature,
+durées). Un format se déclare avec register_format (et register_sniffer).
+"""
+from .docx_stream import extract_docx
+from .office import extract_pptx, extract_xlsx
+from .pdf import budget_chars, count_pages, extract_pdf_text, should_parallelize
+from .registry import (
+    EXTRACTOR_VERSION, Format, FormatLimits, cache_variant, declared_format, detect_format, extract,
+    format_limits, get_format, register_format, register_sniffer, sniff_ooxml, sniff_pdf
+)
+from .result import ExtractionResult
+from .text import extract_text
+
+register_sniffer(sniff_pdf)
+register_sniffer(sniff_ooxml)
+
+register_format(Format(
+    name='pdf',
+    label='PDF',
+    extract=extract_pdf_text,
+    mime_types=('application/pdf',),
+    extensions=('pdf',),
+    applies_limit=True,
+    max_chars=budget_chars(),
+    empty_error="Aucun texte trouvé dans le PDF",
+))
+register_format(Format(
+    name='docx',
+    label='Word',
+    extract=extract_docx,
+    mime_types=('application/vnd.openxmlformats-officedocument.wordprocessingml.document',),
+    extensions=('docx',),
+    applies_limit=True,
+    empty_error="Aucun texte trouvé dans le document Word",
+))
+register_format(Format(
+    name='xlsx',
+    label='Excel',
+    extract=extract_xlsx,
+    mime_types=('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',),
+    extensions=('xlsx',),
+    # Une feuille chargée occupe des dizaines de fois sa taille compressée
+    max_bytes=20 * 1024 * 1024,
+))
+register_format(Format(
+    name='pptx',
+    label='PowerPoint',
+    extract=extract_pptx,
+    mime_types=('application/vnd.openxmlformats-officedocument.presentationml.presentation',),
+    extensions=('pptx',),
+))
+register_format(Format(
+    name='text',
+    label='texte',
+    extract=extract_text,
+    mime_types=('application/json', 'application/xml', 'application/javascript', 'application/x-yaml'),
+    mime_prefixes=('text/',),
+    extensions=(
+        'txt', 'csv', 'tsv', 'json', 'md', 'log', 'xml', 'html', 'css', 'yaml', 'yml', 'toml', 'ini',
+        'js', 'jsx', 'ts', 'tsx', 'py', 'java', 'c', 'h', 'cpp', 'hpp', 'go', 'rs', 'rb', 'php', 'sh', 'sql',
+    ),
+))
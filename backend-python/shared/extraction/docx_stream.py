@@ -0,0 +1,173 @@
+"""
+Format DOCX : lecture en flux du XML, sans le modèle objet de python-docx
+
+word/document.xml est parsé au fil de l'eau (iterparse) directement depuis
+l'archive : paragraphes et cellules de tableaux dans l'ordre du document,
+chaque élément traité est libéré (mémoire constante quelle que soit la
+taille). Les en-têtes / pieds de page et les notes suivent le corps.
+"""
+import re
+import zipfile
+from typing import BinaryIO, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse
+
+from .registry import Data, open_stream
+from .result import ExtractionResult
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+# Contenu de repli (mc:Fallback) : doublon du contenu principal (zones de texte)
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+# Sous-arbres ignorés : le repli, et les propriétés de paragraphe (w:pPr), dont
+# les taquets de tabulation (w:tabs/w:tab) ne sont pas des tabulations du texte
+SKIPPED_TAGS = (MC_FALLBACK, W + 'pPr')
+
+BODY_PART = 'word/document.xml'
+HEADER_FOOTER_PART = re.compile(r'^word/(header|footer)\d*\.xml$')
+NOTES_PARTS = ('word/footnotes.xml', 'word/endnotes.xml')
+
+HEADERS_TITLE = "=== En-têtes et pieds de page ==="
+NOTES_TITLE = "=== Notes ==="
+CELL_SEPARATOR = '\t'
+
+
+def iter_blocks(stream: BinaryIO) -> Iterator[str]:
+    """
+    Blocs de texte d'une partie WordprocessingML, dans l'ordre : un bloc par
+    paragraphe hors tableau, une ligne (cellules séparées par des tabulations)
+    par rangée de tableau
+    """
+    paragraphs: List[List[str]] = []
+    # Tableaux ouverts (imbriqués) : [rangée en cours, cellule en cours]
+    tables: List[list] = []
+    skip_depth = 0
+    depth = 0
+    container = None
+    container_depth = -1
+
+    for event, elem in iterparse(stream, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            depth += 1
+            if tag in SKIPPED_TAGS:
+                skip_depth += 1
+            elif skip_depth:
+                continue
+            elif tag == W + 'p':
+                paragraphs.append([])
+            elif tag == W + 'tbl':
+                tables.append([None, None])
+            elif tag == W + 'tr':
+                tables[-1][0] = []
+            elif tag == W + 'tc':
+                tables[-1][1] = []
+            elif container is None and tag in (W + 'body', W + 'hdr', W + 'ftr', W + 'footnotes', W + 'endnotes'):
+                container, container_depth = elem, depth
+            continue
+
+        depth -= 1
+        if tag in SKIPPED_TAGS:
+            skip_depth -= 1
+            elem.clear()
+            continue
+        if skip_depth:
+            continue
+
+        if tag == W + 't':
+            if paragraphs:
+                paragraphs[-1].append(elem.text or '')
+        elif tag == W + 'tab':
+            if paragraphs:
+                paragraphs[-1].append('\t')
+        elif tag in (W + 'br', W + 'cr'):
+            if paragraphs:
+                paragraphs[-1].append('\n')
+        elif tag == W + 'p':
+            text = ''.join(paragraphs.pop())
+            if tables and tables[-1][1] is not None:
+                tables[-1][1].append(text)
+            elif text.strip():
+                yield text
+            elem.clear()
+        elif tag == W + 'tc':
+            row, cell = tables[-1]
+            row.append(' '.join(text for text in cell if text.strip()))
+            tables[-1][1] = None
+        elif tag == W + 'tr':
+            row = tables[-1][0]
+            tables[-1][0] = None
+            if any(cell.strip() for cell in row):
+                line = CELL_SEPARATOR.join(row)
+                # Tableau imbriqué : la rangée appartient à la cellule parente
+                if len(tables) > 1 and tables[-2][1] is not None:
+                    tables[-2][1].append(line)
+                else:
+                    yield line
+        elif tag == W + 'tbl':
+            tables.pop()
+            elem.clear()
+
+        # Enfant direct du conteneur terminé : le détacher (mémoire constante)
+        if container is not None and depth == container_depth:
+            container.clear()
+
+
+def _part_blocks(archive: zipfile.ZipFile, name: str) -> Iterator[str]:
+    with archive.open(name) as stream:
+        yield from iter_blocks(stream)
+
+
+def iter_document_blocks(archive: zipfile.ZipFile) -> Iterator[str]:
+    """Corps, puis en-têtes / pieds de page (sans doublons), puis notes"""
+    yield from _part_blocks(archive, BODY_PART)
+
+    names = archive.namelist()
+    # En-têtes avant pieds de page
+    header_parts = sorted(
+        (name for name in names if HEADER_FOOTER_PART.match(name)),
+        key=lambda name: (HEADER_FOOTER_PART.match(name).group(1) == 'footer', name),
+    )
+    seen = set()
+    title_sent = False
+    for name in header_parts:
+        for block in _part_blocks(archive, name):
+            # Même en-tête répété par section : une seule fois
+            if block in seen:
+                continue
+            seen.add(block)
+            if not title_sent:
+                yield HEADERS_TITLE
+                title_sent = True
+            yield block
+
+    title_sent = False
+    for name in NOTES_PARTS:
+        if name not in names:
+            continue
+        for block in _part_blocks(archive, name):
+            if not title_sent:
+                yield NOTES_TITLE
+                title_sent = True
+            yield block
+
+
+def extract_docx(data: Data, max_chars: Optional[int] = None, **options) -> ExtractionResult:
+    """Texte du document jusqu'à max_chars (0 ou None : tout le document)"""
+    parts = []
+    used = 0
+    truncated = False
+    with zipfile.ZipFile(open_stream(data)) as archive:
+        blocks = iter_document_blocks(archive)
+        try:
+            for block in blocks:
+                cost = len(block) + (1 if parts else 0)
+                if max_chars and used + cost > max_chars:
+                    remaining = max_chars - used - (1 if parts else 0)
+                    if remaining > 0:
+                        parts.append(block[:remaining])
+                    truncated = True
+                    break
+                parts.append(block)
+                used += cost
+        finally:
+            blocks.close()
+    return ExtractionResult(text='\n'.join(parts), truncated=truncated)
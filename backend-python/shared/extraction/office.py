@@ -0,0 +1,35 @@
+"""
+Formats Office Open XML : XLSX, PPTX (DOCX : docx_stream)
+"""
+from .registry import Data, open_stream
+
+
+def extract_xlsx(data: Data) -> str:
+    from openpyxl import load_workbook
+    # read_only : les lignes sont lues au fil de l'eau
+    workbook = load_workbook(open_stream(data), data_only=True, read_only=True)
+    try:
+        text_parts = []
+        for sheet in workbook.worksheets:
+            # Dimensions déclarées parfois fausses : lire jusqu'à la dernière ligne
+            sheet.reset_dimensions()
+            text_parts.append(f"\n=== Feuille: {sheet.title} ===\n")
+            for row in sheet.iter_rows(values_only=True):
+                row_text = '\t'.join(str(cell) if cell is not None else '' for cell in row)
+                if row_text.strip():
+                    text_parts.append(row_text)
+        return '\n'.join(text_parts)
+    finally:
+        workbook.close()
+
+
+def extract_pptx(data: Data) -> str:
+    from pptx import Presentation
+    presentation = Presentation(open_stream(data))
+    text_parts = []
+    for index, slide in enumerate(presentation.slides, 1):
+        text_parts.append(f"\n=== Slide {index} ===\n")
+        for shape in slide.shapes:
+            if hasattr(shape, 'text'):
+                text_parts.append(shape.text)
+    return '\n'.join(text_parts)
@@ -0,0 +1,247 @@
+"""
+Format PDF : texte page par page, avec arrêt au budget
+
+Les pages sont parsées une à une et l'extraction s'arrête dès que le
+budget (caractères ou tokens estimés) est atteint : la mémoire et la
+latence sont bornées par le budget et non par la taille du fichier.
+
+Au-delà de PDF_PARALLEL_MIN_PAGES pages, les plages de pages sont
+réparties sur un pool de processus qui lisent le même fichier mappé en
+mémoire (mmap), puis réassemblées dans l'ordre. Repli sur l'extraction
+série si le multiprocessing n'est pas disponible (Lambda n'a pas de
+/dev/shm).
+"""
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
+
+from context_builder import CHARS_PER_TOKEN
+
+from .registry import DEFAULT_MAX_CHARS, open_stream
+from .result import ExtractionResult
+
+# Budget par défaut : celui des autres formats (budget du prompt, ou limite
+# des documents stockés quand la recherche est active)
+PDF_MAX_CHARS = int(os.environ.get('PDF_MAX_CHARS', str(DEFAULT_MAX_CHARS)))
+# Budget en tokens estimés (0 : pas de limite en tokens)
+PDF_MAX_TOKENS = int(os.environ.get('PDF_MAX_TOKENS', '0'))
+
+PAGE_SEPARATOR = '\n'
+
+# Extraction parallèle : seuil (pages), nombre de processus, taille des plages
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', '64'))
+PDF_PARALLEL_WORKERS = int(os.environ.get('PDF_PARALLEL_WORKERS', str(os.cpu_count() or 1)))
+PDF_PARALLEL_CHUNK_PAGES = int(os.environ.get('PDF_PARALLEL_CHUNK_PAGES', '8'))
+
+# Octets, mmap (fichier reçu sur disque), chemin ou fichier ouvert
+PdfSource = Union[bytes, mmap.mmap, str, BinaryIO]
+
+
+def budget_chars(max_chars: Optional[int] = None, max_tokens: Optional[int] = None) -> int:
+    """Budget effectif en caractères (0 : pas de limite)"""
+    chars = PDF_MAX_CHARS if max_chars is None else max_chars
+    tokens = PDF_MAX_TOKENS if max_tokens is None else max_tokens
+    limits = [limit for limit in (chars, int(tokens * CHARS_PER_TOKEN)) if limit > 0]
+    return min(limits) if limits else 0
+
+
+def open_pdf(source: PdfSource):
+    """PdfReader sur des octets, un mmap, un chemin ou un fichier (les pages sont lues à la demande)"""
+    from PyPDF2 import PdfReader
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        source = open_stream(source)
+    return PdfReader(source)
+
+
+def iter_page_texts(reader, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Texte de chaque page, parsée au moment où elle est demandée"""
+    pages = reader.pages
+    stop = len(pages) if stop is None else min(stop, len(pages))
+    for index in range(start, stop):
+        yield pages[index].extract_text() or ''
+
+
+def count_pages(source: PdfSource) -> int:
+    """Nombre de pages (lecture de l'arbre des pages seulement)"""
+    return len(open_pdf(source).pages)
+
+
+def should_parallelize(pages_total: int, executor: Optional[Executor] = None) -> bool:
+    """Extraction parallèle utile : gros document, plusieurs processus, hors d'un worker"""
+    if executor is None and PDF_PARALLEL_WORKERS < 2:
+        return False
+    if executor is not None and not isinstance(executor, ProcessPoolExecutor):
+        return False
+    # Dans un worker (pool d'extraction) : pas de pool imbriqué
+    return pages_total >= PDF_PARALLEL_MIN_PAGES and multiprocessing.parent_process() is None
+
+
+def extract_pdf_text(source: PdfSource, max_chars: Optional[int] = None,
+                     max_tokens: Optional[int] = None, parallel: Optional[bool] = None,
+                     executor: Optional[Executor] = None) -> ExtractionResult:
+    """
+    Texte des premières pages jusqu'au budget (PDF_MAX_CHARS / PDF_MAX_TOKENS
+    par défaut, 0 pour tout extraire). La page qui dépasse est coupée et les
+    suivantes ne sont pas parsées.
+
+    parallel : None = automatique (should_parallelize), executor : pool de
+    processus des plages de pages (get_pdf_executor() par défaut).
+    """
+    reader = open_pdf(source)
+    pages_total = len(reader.pages)
+    budget = budget_chars(max_chars, max_tokens)
+
+    if parallel is None:
+        parallel = should_parallelize(pages_total, executor)
+    if parallel:
+        try:
+            with _shared_file(source) as file_ref:
+                return _collect(_iter_page_texts_parallel(file_ref, pages_total, executor), pages_total, budget)
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            print(f"Extraction PDF parallèle indisponible ({e}), repli sur l'extraction série")
+            if executor is None:
+                reset_pdf_executor()
+
+    return _collect(iter_page_texts(reader), pages_total, budget)
+
+
+def _collect(page_texts: Iterable[str], pages_total: int, budget: int) -> ExtractionResult:
+    """Assembler les pages dans l'ordre jusqu'au budget (arrête l'itérateur)"""
+    parts = []
+    used = 0
+    truncated = False
+    page_texts = iter(page_texts)
+    try:
+        for text in page_texts:
+            cost = len(text) + (len(PAGE_SEPARATOR) if parts else 0)
+            if budget and used + cost > budget:
+                remaining = budget - used - (len(PAGE_SEPARATOR) if parts else 0)
+                if remaining > 0:
+                    parts.append(text[:remaining])
+                truncated = True
+                break
+            parts.append(text)
+            used += cost
+    finally:
+        # Générateur parallèle : annule les plages encore en attente
+        close = getattr(page_texts, 'close', None)
+        if close:
+            close()
+
+    return ExtractionResult(
+        text=PAGE_SEPARATOR.join(parts),
+        format='pdf',
+        pages_total=pages_total,
+        pages_included=len(parts),
+        truncated=truncated
+    )
+
+
+# --- Extraction parallèle -------------------------------------------------
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """Pool de processus des plages de pages, créé au premier usage"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PDF_PARALLEL_WORKERS)
+        return _executor
+
+
+def reset_pdf_executor():
+    """Abandonner le pool (worker tué, arrêt) : il sera recréé au prochain usage"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+class _shared_file:
+    """Chemin d'un fichier lisible par les workers (copie temporaire si besoin)"""
+
+    def __init__(self, source: PdfSource):
+        self.source = source
+        self.temporary = None
+
+    def __enter__(self) -> Tuple[str, int, int]:
+        if isinstance(self.source, str):
+            path = self.source
+        else:
+            fd, path = tempfile.mkstemp(suffix='.pdf')
+            self.temporary = path
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(self.source, (bytes, bytearray, memoryview, mmap.mmap)):
+                    f.write(self.source)
+                else:
+                    self.source.seek(0)
+                    shutil.copyfileobj(self.source, f)
+        stat = os.stat(path)
+        # Taille et date identifient la version du fichier dans le cache des workers
+        return path, stat.st_size, stat.st_mtime_ns
+
+    def __exit__(self, *exc):
+        if self.temporary:
+            os.unlink(self.temporary)
+
+
+def _iter_page_texts_parallel(file_ref: Tuple[str, int, int], pages_total: int,
+                              executor: Optional[Executor] = None) -> Iterator[str]:
+    """
+    Texte des pages dans l'ordre, extrait par plages dans le pool.
+    Fenêtre glissante de plages en cours : arrêter l'itération (budget
+    atteint) évite de parser le reste du document.
+    """
+    executor = executor or get_pdf_executor()
+    chunk = max(1, PDF_PARALLEL_CHUNK_PAGES)
+    ranges = iter([(start, min(start + chunk, pages_total)) for start in range(0, pages_total, chunk)])
+    window = 2 * max(1, getattr(executor, '_max_workers', PDF_PARALLEL_WORKERS))
+
+    pending = deque()
+    try:
+        for start, stop in ranges:
+            pending.append(executor.submit(_extract_page_range, file_ref, start, stop))
+            if len(pending) >= window:
+                break
+        while pending:
+            texts = pending.popleft().result()
+            next_range = next(ranges, None)
+            if next_range:
+                pending.append(executor.submit(_extract_page_range, file_ref, *next_range))
+            yield from texts
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+# Lecteurs ouverts dans un worker : le fichier n'est mappé et son
+# xref lu qu'une fois par worker, quelle que soit la plage demandée
+_worker_readers: "OrderedDict[Tuple[str, int, int], tuple]" = OrderedDict()
+WORKER_READERS_MAX = 2
+
+
+def _extract_page_range(file_ref: Tuple[str, int, int], start: int, stop: int) -> List[str]:
+    """Exécuté dans un worker : texte des pages [start, stop)"""
+    entry = _worker_readers.get(file_ref)
+    if entry is None:
+        with open(file_ref[0], 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        entry = (mapped, open_pdf(mapped))
+        _worker_readers[file_ref] = entry
+        while len(_worker_readers) > WORKER_READERS_MAX:
+            _, (old_mapped, _) = _worker_readers.popitem(last=False)
+            old_mapped.close()
+    else:
+        _worker_readers.move_to_end(file_ref)
+    return list(iter_page_texts(entry[1], start, stop))
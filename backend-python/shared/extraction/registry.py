@@ -0,0 +1,277 @@
+"""
+Registre des formats : détection (octets magiques, type MIME, extension),
+limites par format et extraction
+"""
+import io
+import mmap
+import os
+import time
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+
+from context_builder import CHARS_PER_TOKEN, MAX_INPUT_TOKENS
+from retrieval import RETRIEVAL_ENABLED
+
+from .result import ExtractionResult
+
+# Version des extracteurs : à incrémenter quand leur sortie change (invalide le cache)
+EXTRACTOR_VERSION = 'ext-4'
+
+DEFAULT_MAX_BYTES = int(os.environ.get('EXTRACTION_MAX_BYTES', str(50 * 1024 * 1024)))
+# Sans recherche, le document entier va dans le prompt : au-delà du budget
+# d'entrée du contexte, le texte serait tronqué de toute façon
+PROMPT_MAX_CHARS = int(MAX_INPUT_TOKENS * CHARS_PER_TOKEN)
+# Avec la recherche, le document est stocké et indexé en entier (seuls les
+# passages retenus entrent dans le prompt) : limite propre, 0 = pas de limite
+STORED_MAX_CHARS = int(os.environ.get('EXTRACTION_STORED_MAX_CHARS', '10000000'))
+DEFAULT_MAX_CHARS = int(os.environ.get(
+    'EXTRACTION_MAX_CHARS', str(STORED_MAX_CHARS if RETRIEVAL_ENABLED else PROMPT_MAX_CHARS)
+))
+
+# Contenu d'un fichier : octets, ou mmap d'un fichier reçu sur disque (sans copie en mémoire)
+Data = Union[bytes, mmap.mmap]
+
+# Octets lus pour la détection d'un fichier texte
+SNIFF_BYTES = 8192
+
+# Signatures binaires jamais traitées comme du texte (ZIP, OLE, PNG, JPEG, GIF)
+BINARY_SIGNATURES = (b'PK\x03\x04', b'\xd0\xcf\x11\xe0', b'\x89PNG', b'\xff\xd8\xff', b'GIF8')
+
+
+@dataclass(frozen=True)
+class Format:
+    """Format de fichier pris en charge"""
+    name: str
+    label: str
+    # extract(data) -> str, ou extract(data, max_chars=..., **options) -> ExtractionResult
+    # pour un format qui applique lui-même la limite (arrêt anticipé)
+    extract: Callable
+    mime_types: Tuple[str, ...] = ()
+    mime_prefixes: Tuple[str, ...] = ()
+    extensions: Tuple[str, ...] = ()
+    applies_limit: bool = False
+    max_bytes: Optional[int] = None
+    max_chars: Optional[int] = None
+    # Erreur si aucun texte n'est trouvé (None : texte vide accepté)
+    empty_error: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class FormatLimits:
+    max_bytes: int
+    max_chars: int
+
+
+_formats: Dict[str, Format] = {}
+_sniffers: List[Callable[[bytes], Optional[str]]] = []
+
+
+def register_format(fmt: Format):
+    _formats[fmt.name] = fmt
+
+
+def register_sniffer(sniffer: Callable[[bytes], Optional[str]]):
+    """sniffer(data) -> nom du format reconnu d'après le contenu, ou None"""
+    _sniffers.append(sniffer)
+
+
+def get_format(name: str) -> Optional[Format]:
+    return _formats.get(name)
+
+
+def format_limits(fmt: Format) -> FormatLimits:
+    """Limites du format : EXTRACTION_{FORMAT}_MAX_BYTES / _MAX_CHARS, sinon défauts"""
+    prefix = f"EXTRACTION_{fmt.name.upper()}"
+    max_bytes = os.environ.get(f"{prefix}_MAX_BYTES")
+    max_chars = os.environ.get(f"{prefix}_MAX_CHARS")
+    return FormatLimits(
+        max_bytes=int(max_bytes) if max_bytes is not None else (fmt.max_bytes or DEFAULT_MAX_BYTES),
+        max_chars=int(max_chars) if max_chars is not None else (
+            fmt.max_chars if fmt.max_chars is not None else DEFAULT_MAX_CHARS
+        ),
+    )
+
+
+class MappedStream(io.RawIOBase):
+    """
+    Fichier binaire en lecture seule sur un mmap, avec sa propre position
+    (io.BytesIO copierait le contenu ; mmap n'a pas seekable() avant 3.13)
+    """
+
+    def __init__(self, mapped: mmap.mmap):
+        self._mapped = mapped
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._mapped)}[whence]
+        if base + offset < 0:
+            raise ValueError(f"Position négative: {base + offset}")
+        self._position = base + offset
+        return self._position
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        end = len(self._mapped) if size is None or size < 0 else self._position + size
+        data = self._mapped[self._position:end]
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def open_stream(data: Data) -> BinaryIO:
+    """Fichier binaire sur le contenu, sans copie (BytesIO partage le buffer de bytes)"""
+    if isinstance(data, mmap.mmap):
+        return MappedStream(data)
+    return io.BytesIO(data)
+
+
+def file_extension(file_name: str) -> str:
+    return file_name.rsplit('.', 1)[-1].lower() if '.' in file_name else ''
+
+
+def declared_format(mime_type: str = '', file_name: str = '') -> Optional[Format]:
+    """Format d'après le type MIME puis l'extension, sans regarder le contenu"""
+    mime_type = (mime_type or '').split(';')[0].strip().lower()
+    extension = file_extension(file_name or '')
+    for fmt in _formats.values():
+        if mime_type in fmt.mime_types:
+            return fmt
+    for fmt in _formats.values():
+        if extension and extension in fmt.extensions:
+            return fmt
+    for fmt in _formats.values():
+        if mime_type and fmt.mime_prefixes and mime_type.startswith(fmt.mime_prefixes):
+            return fmt
+    return None
+
+
+def detect_format(data: Data, mime_type: str = '', file_name: str = '') -> Optional[Format]:
+    """
+    Format du fichier : le contenu (octets magiques) l'emporte sur le type
+    déclaré, puis type MIME, extension et enfin contenu texte
+    """
+    for sniffer in _sniffers:
+        name = sniffer(data)
+        if name in _formats:
+            return _formats[name]
+
+    fmt = declared_format(mime_type, file_name)
+    if fmt is not None:
+        return fmt
+
+    # Type inconnu (application/octet-stream...) : texte si le début se décode
+    head = data[:SNIFF_BYTES]
+    if head and b'\0' not in head and not head.startswith(BINARY_SIGNATURES) and 'text' in _formats:
+        try:
+            head.decode('utf-8')
+            return _formats['text']
+        except UnicodeDecodeError as e:
+            # Caractère multi-octets coupé en fin d'échantillon
+            if e.start >= len(head) - 3:
+                return _formats['text']
+    return None
+
+
+def cache_variant(data: Data, mime_type: str = '', file_name: str = '') -> str:
+    """Variante de clé de cache : format détecté et limite appliquée"""
+    fmt = detect_format(data, mime_type, file_name)
+    if fmt is None:
+        return f"unsupported|{mime_type}|{file_extension(file_name or '')}"
+    return f"{fmt.name}|{format_limits(fmt).max_chars}"
+
+
+def extract(data: Data, mime_type: str = '', file_name: str = '', **options) -> ExtractionResult:
+    """
+    Extraire le texte d'un fichier (ne lève pas d'exception : voir result.error).
+    options : transmises aux formats qui appliquent eux-mêmes la limite
+    (PDF : parallel, executor).
+    """
+    start = time.perf_counter()
+    fmt = detect_format(data, mime_type, file_name)
+    detected = time.perf_counter()
+
+    if fmt is None:
+        result = ExtractionResult(
+            error=f"Type de fichier non supporté: {mime_type} (.{file_extension(file_name or '')})"
+        )
+    else:
+        result = _extract_format(fmt, data, options)
+        if result.error and result.error != fmt.empty_error and fmt.name != 'text':
+            # Texte déclaré reconnu à tort comme binaire (ex. un .txt qui commence
+            # par « %PDF- ») : le type déclaré l'emporte si le parsing échoue
+            # (un vrai document sans texte, un PDF scanné, reste une erreur)
+            declared = declared_format(mime_type, file_name)
+            if declared is not None and declared.name == 'text':
+                fallback = _extract_format(declared, data, options)
+                if not fallback.error:
+                    result = fallback
+
+    result.timings['detect'] = round((detected - start) * 1000, 1)
+    result.timings['extract'] = round((time.perf_counter() - detected) * 1000, 1)
+    return result
+
+
+def _extract_format(fmt: Format, data: Data, options: dict) -> ExtractionResult:
+    limits = format_limits(fmt)
+    if limits.max_bytes and len(data) > limits.max_bytes:
+        return ExtractionResult(
+            format=fmt.name,
+            error=f"Fichier {fmt.label} trop volumineux: {len(data)} octets (max {limits.max_bytes})"
+        )
+
+    try:
+        if fmt.applies_limit:
+            result = fmt.extract(data, max_chars=limits.max_chars, **options)
+        else:
+            text = fmt.extract(data)
+            truncated = bool(limits.max_chars) and len(text) > limits.max_chars
+            result = ExtractionResult(text=text[:limits.max_chars] if truncated else text, truncated=truncated)
+    except Exception as e:
+        return ExtractionResult(format=fmt.name, error=f"Erreur extraction {fmt.label}: {str(e)}")
+
+    result.format = fmt.name
+    if fmt.empty_error and not result.text.strip():
+        result.error = fmt.empty_error
+    return result
+
+
+def sniff_pdf(data: Data) -> Optional[str]:
+    # En-tête en début de fichier, éventuellement après des blancs (pas
+    # n'importe où dans le premier Ko : un fichier texte qui cite « %PDF- »)
+    return 'pdf' if bytes(data[:1024]).lstrip(b' \t\r\n\f\0').startswith(b'%PDF-') else None
+
+
+# Documents Office Open XML : archives ZIP distinguées par leur partie principale
+OOXML_PARTS = {
+    'word/document.xml': 'docx',
+    'xl/workbook.xml': 'xlsx',
+    'ppt/presentation.xml': 'pptx',
+}
+
+
+def sniff_ooxml(data: Data) -> Optional[str]:
+    if data[:4] != b'PK\x03\x04':
+        return None
+    try:
+        # Lecture du répertoire central seulement
+        with zipfile.ZipFile(open_stream(data)) as archive:
+            names = set(archive.namelist())
+    except zipfile.BadZipFile:
+        return None
+    for part, name in OOXML_PARTS.items():
+        if part in names:
+            return name
+    return None
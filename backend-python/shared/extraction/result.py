@@ -0,0 +1,55 @@
+"""
+Résultat d'une extraction de texte, commun à tous les formats
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class ExtractionResult:
+    """Texte extrait, pages incluses, troncature et durée des étapes"""
+    text: str = ''
+    format: Optional[str] = None
+    # Formats paginés (PDF) : pages du document / pages incluses dans la limite
+    pages_total: Optional[int] = None
+    pages_included: Optional[int] = None
+    # Texte coupé à la limite de caractères du format
+    truncated: bool = False
+    error: Optional[str] = None
+    # Durée des étapes en millisecondes (detect, extract)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def pages_skipped(self) -> int:
+        if self.pages_total is None or self.pages_included is None:
+            return 0
+        return self.pages_total - self.pages_included
+
+    def note(self) -> str:
+        """Mention du contenu non inclus (vide si tout le document est inclus)"""
+        if self.pages_skipped:
+            return (f"[... {self.pages_skipped} page(s) sur {self.pages_total} non incluse(s) : "
+                    f"limite de taille atteinte ...]")
+        if self.truncated:
+            return "[... contenu tronqué : limite de taille atteinte ...]"
+        return ''
+
+    def text_with_note(self) -> str:
+        note = self.note()
+        return self.text + ('\n' + note if note else '')
+
+    def summary(self) -> str:
+        """Ligne de log"""
+        parts = [f"{self.format or 'inconnu'}", f"{len(self.text)} caractères"]
+        if self.pages_total is not None:
+            parts.append(f"{self.pages_included}/{self.pages_total} pages")
+        if self.truncated:
+            parts.append("tronqué")
+        if self.error:
+            parts.append(f"erreur: {self.error}")
+        parts.append(' '.join(f"{name}={ms}ms" for name, ms in self.timings.items()))
+        return ', '.join(parts)
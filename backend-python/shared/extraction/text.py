@@ -0,0 +1,17 @@
+"""
+Fichiers texte (code, CSV, JSON, Markdown...)
+"""
+from .registry import Data
+
+# Essayés dans l'ordre : latin-1 décode tout octet, il est donc en dernier
+TEXT_ENCODINGS = ('utf-8-sig', 'cp1252', 'latin-1')
+
+
+def extract_text(data: Data) -> str:
+    for encoding in TEXT_ENCODINGS:
+        try:
+            # str() décode tout objet buffer (mmap compris) sans copie intermédiaire
+            return str(data, encoding)
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("Impossible de décoder le fichier texte")
@@ -0,0 +1,222 @@
+"""
+Cache du texte extrait des documents, indexé par le hash de leur contenu
+
+Deux niveaux :
+- LRU en mémoire (par processus), borné en octets
+- niveau persistant optionnel : DynamoDB, S3 ou répertoire local (tests / dev)
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+# Configuration
+CACHE_MAX_BYTES = int(os.environ.get('EXTRACTION_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+CACHE_BACKEND = os.environ.get('EXTRACTION_CACHE_BACKEND', '').lower()  # '', dynamodb, s3, local
+CACHE_TABLE = os.environ.get('EXTRACTION_CACHE_TABLE', '')
+CACHE_BUCKET = os.environ.get('EXTRACTION_CACHE_BUCKET', '')
+CACHE_PREFIX = os.environ.get('EXTRACTION_CACHE_PREFIX', 'extraction-cache/')
+CACHE_DIR = os.environ.get('EXTRACTION_CACHE_DIR', '/tmp/extraction-cache')
+CACHE_TTL_DAYS = int(os.environ.get('EXTRACTION_CACHE_TTL_DAYS', '30'))
+
+# Limite d'un item DynamoDB (400 KB) avec marge pour les attributs
+DYNAMODB_MAX_TEXT_BYTES = 350 * 1024
+
+
+def cache_key(data: Optional[bytes], version: str, variant: str = '', digest: Optional[str] = None) -> str:
+    """
+    Clé de cache : hash du contenu décodé + version de l'extracteur.
+    variant distingue les extractions d'un même contenu déclaré sous des types différents.
+    digest : SHA-256 hexadécimal déjà calculé (fichier reçu en flux).
+    """
+    digest = digest or hashlib.sha256(data).hexdigest()
+    if variant:
+        # Utilisable tel quel comme nom de fichier / clé S3
+        variant = re.sub(r'[^A-Za-z0-9._-]', '_', variant)
+        return f"{digest}:{version}:{variant}"
+    return f"{digest}:{version}"
+
+
+class LRUTextCache:
+    """Cache LRU en mémoire, borné par la taille totale des textes (thread-safe)"""
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            self._items.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, text: str):
+        size = len(text.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._items[key] = (text, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self._size -= evicted_size
+
+
+class DynamoDBTextStore:
+    """Niveau persistant DynamoDB (clé de partition : cache_key)"""
+
+    def __init__(self, table_name: str):
+        from aws_clients import get_dynamodb_table
+        self.table = get_dynamodb_table(table_name)
+
+    def get(self, key: str) -> Optional[str]:
+        item = self.table.get_item(Key={'cache_key': key}).get('Item')
+        return item.get('text') if item else None
+
+    def put(self, key: str, text: str):
+        if len(text.encode('utf-8')) > DYNAMODB_MAX_TEXT_BYTES:
+            return
+        self.table.put_item(Item={
+            'cache_key': key,
+            'text': text,
+            'ttl': int(time.time()) + CACHE_TTL_DAYS * 24 * 60 * 60
+        })
+
+
+class S3TextStore:
+    """Niveau persistant S3 (un objet texte par clé)"""
+
+    def __init__(self, bucket: str, prefix: str = CACHE_PREFIX, s3_client=None):
+        if s3_client is None:
+            from aws_clients import get_s3_client
+            s3_client = get_s3_client()
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key.replace(':', '/')}.txt"
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return response['Body'].read().decode('utf-8')
+
+    def put(self, key: str, text: str):
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Body=text.encode('utf-8'),
+            ContentType='text/plain; charset=utf-8'
+        )
+
+
+class LocalDirTextStore:
+    """Niveau persistant local (répertoire), pour les tests et le développement"""
+
+    def __init__(self, directory: str = CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key.replace(':', '_') + '.json')
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)['text']
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, text: str):
+        # Écriture atomique : un lecteur concurrent ne voit jamais un fichier partiel
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'text': text}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+
+
+class ExtractionCache:
+    """Cache deux niveaux : mémoire puis persistant (optionnel)"""
+
+    def __init__(self, memory: Optional[LRUTextCache] = None, store=None):
+        self.memory = memory or LRUTextCache()
+        self.store = store
+
+    def get(self, key: str) -> Optional[str]:
+        text = self.memory.get(key)
+        if text is not None or self.store is None:
+            return text
+
+        try:
+            text = self.store.get(key)
+        except Exception as e:
+            print(f"Extraction cache read error: {e}")
+            return None
+        if text is not None:
+            self.memory.put(key, text)
+        return text
+
+    def put(self, key: str, text: str):
+        self.memory.put(key, text)
+        if self.store is None:
+            return
+        try:
+            self.store.put(key, text)
+        except Exception as e:
+            print(f"Extraction cache write error: {e}")
+
+    def get_or_extract(
+        self,
+        key: str,
+        extract: Callable[[], Tuple[str, Optional[str]]]
+    ) -> Tuple[str, Optional[str]]:
+        """
+        Retourner le texte en cache ou l'extraire.
+        extract() renvoie (texte, erreur) ; seules les extractions réussies sont mises en cache.
+        """
+        text = self.get(key)
+        if text is not None:
+            return text, None
+
+        text, error = extract()
+        if not error:
+            self.put(key, text)
+        return text, error
+
+
+def build_store():
+    """Niveau persistant configuré par EXTRACTION_CACHE_BACKEND"""
+    if CACHE_BACKEND == 'dynamodb' and CACHE_TABLE:
+        return DynamoDBTextStore(CACHE_TABLE)
+    if CACHE_BACKEND == 's3' and CACHE_BUCKET:
+        return S3TextStore(CACHE_BUCKET)
+    if CACHE_BACKEND == 'local':
+        return LocalDirTextStore(CACHE_DIR)
+    return None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    """Cache partagé du processus, créé au premier usage"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache(LRUTextCache(CACHE_MAX_BYTES), build_store())
+        return _cache
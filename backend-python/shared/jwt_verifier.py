@@ -0,0 +1,266 @@
+"""
+Vérification des JWT Cognito (signature RS256, expiration, émetteur, audience)
+
+La signature est vérifiée en Python pur (RSASSA-PKCS1-v1_5 / SHA-256 : une
+exponentiation modulaire avec l'exposant public), sans dépendance
+cryptographique à embarquer dans le package.
+
+Coût par requête :
+- les clés publiques (JWKS) du User Pool sont téléchargées une fois (au
+  démarrage dans la version LWA) puis gardées en mémoire ; un kid inconnu
+  (rotation des clés) déclenche un rechargement, au plus une fois par
+  JWKS_MIN_REFRESH_SECONDS, y compris quand le téléchargement échoue ;
+- un jeton déjà vérifié est mémorisé (LRU borné) jusqu'à son expiration :
+  les requêtes suivantes d'une même session ne refont ni le parsing ni la
+  vérification de signature.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from serialization import loads
+
+USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID', '')
+# Client de l'application : audience des jetons d'identité, client_id des jetons d'accès
+CLIENT_ID = os.environ.get('COGNITO_CLIENT_ID', '')
+# false : payload décodé sans vérification (développement local uniquement)
+VERIFICATION_ENABLED = os.environ.get('JWT_VERIFICATION_ENABLED', 'true').lower() == 'true'
+
+TOKEN_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE', '1024'))
+JWKS_TIMEOUT_SECONDS = float(os.environ.get('JWKS_TIMEOUT_SECONDS', '3'))
+JWKS_MIN_REFRESH_SECONDS = float(os.environ.get('JWKS_MIN_REFRESH_SECONDS', '60'))
+# Tolérance d'horloge sur exp / iat
+LEEWAY_SECONDS = 30
+
+ACCEPTED_TOKEN_USES = ('id', 'access')
+
+# Préfixe DER du DigestInfo SHA-256 (RFC 8017, section 9.2)
+SHA256_DIGEST_INFO = bytes.fromhex('3031300d060960864801650304020105000420')
+
+
+class InvalidToken(Exception):
+    """Jeton refusé (format, signature, expiration, émetteur ou audience)"""
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+
+def _b64int(segment: str) -> int:
+    return int.from_bytes(_b64decode(segment), 'big')
+
+
+def cognito_issuer(user_pool_id: str) -> str:
+    """Émetteur des jetons d'un User Pool (la région préfixe l'ID : eu-west-3_xxx)"""
+    region = user_pool_id.split('_', 1)[0]
+    return f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+
+
+def fetch_jwks(url: str) -> Dict[str, Any]:
+    """Télécharger un JWKS (import différé : urllib n'est chargé qu'au premier appel)"""
+    from urllib.request import urlopen
+    with urlopen(url, timeout=JWKS_TIMEOUT_SECONDS) as response:
+        return loads(response.read())
+
+
+def verify_rs256(signing_input: bytes, signature: bytes, n: int, e: int) -> bool:
+    """Signature RSASSA-PKCS1-v1_5 avec SHA-256"""
+    size = (n.bit_length() + 7) // 8
+    if len(signature) != size:
+        return False
+    s = int.from_bytes(signature, 'big')
+    if s >= n:
+        return False
+    encoded = pow(s, e, n).to_bytes(size, 'big')
+    digest_info = SHA256_DIGEST_INFO + hashlib.sha256(signing_input).digest()
+    padding = size - len(digest_info) - 3
+    if padding < 8:
+        return False
+    expected = b'\x00\x01' + b'\xff' * padding + b'\x00' + digest_info
+    return hmac.compare_digest(encoded, expected)
+
+
+class JwksCache:
+    """Clés publiques RSA par kid, rechargées quand un kid inconnu est présenté"""
+
+    def __init__(self, fetch: Callable[[], Dict[str, Any]],
+                 min_refresh_seconds: float = JWKS_MIN_REFRESH_SECONDS, clock=time.monotonic):
+        self._fetch = fetch
+        self.min_refresh_seconds = min_refresh_seconds
+        self._clock = clock
+        self._keys: Dict[str, Tuple[int, int]] = {}
+        self._fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.stats = {'fetches': 0, 'errors': 0}
+
+    def get(self, kid: str) -> Optional[Tuple[int, int]]:
+        """(n, e) de la clé, ou None si elle reste inconnue après rechargement"""
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is None and self._may_refresh():
+                self._refresh()
+                key = self._keys.get(kid)
+        return key
+
+    def _may_refresh(self) -> bool:
+        # Un kid inventé ne doit pas provoquer un téléchargement par requête
+        return self._fetched_at is None or self._clock() - self._fetched_at >= self.min_refresh_seconds
+
+    def refresh(self) -> bool:
+        """Recharger les clés (préchargement au démarrage) ; False si le téléchargement échoue"""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> bool:
+        # Échec compté comme un rechargement : pendant une panne du endpoint JWKS,
+        # un téléchargement au plus par min_refresh_seconds (les clés connues restent valables)
+        self._fetched_at = self._clock()
+        self.stats['fetches'] += 1
+        try:
+            jwks = self._fetch()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"JWKS indisponible: {e}")
+            return False
+        self._keys = {
+            jwk['kid']: (_b64int(jwk['n']), _b64int(jwk['e']))
+            for jwk in jwks.get('keys', [])
+            if jwk.get('kty') == 'RSA' and jwk.get('kid') and jwk.get('use', 'sig') == 'sig'
+        }
+        return True
+
+
+class JwtVerifier:
+    """Vérification des jetons d'un émetteur, avec mémorisation des jetons valides"""
+
+    def __init__(self, issuer: str, client_id: str = '', jwks: Optional[JwksCache] = None,
+                 cache_size: int = TOKEN_CACHE_SIZE, clock=time.time):
+        self.issuer = issuer
+        self.client_id = client_id
+        self.jwks = jwks or JwksCache(lambda: fetch_jwks(f"{issuer}/.well-known/jwks.json"))
+        self.cache_size = cache_size
+        self._clock = clock
+        self._verified: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'rejected': 0}
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Claims du jeton ; lève InvalidToken s'il est refusé"""
+        now = self._clock()
+        with self._lock:
+            claims = self._verified.get(token)
+            if claims is not None:
+                if claims['exp'] + LEEWAY_SECONDS > now:
+                    self._verified.move_to_end(token)
+                    self.stats['hits'] += 1
+                    return claims
+                del self._verified[token]
+            self.stats['misses'] += 1
+
+        try:
+            claims = self._verify_uncached(token, now)
+        except InvalidToken:
+            self.stats['rejected'] += 1
+            raise
+
+        with self._lock:
+            self._verified[token] = claims
+            if len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return claims
+
+    def _verify_uncached(self, token: str, now: float) -> Dict[str, Any]:
+        parts = token.split('.')
+        if len(parts) != 3:
+            raise InvalidToken("Format de jeton invalide")
+        try:
+            header = loads(_b64decode(parts[0]))
+            claims = loads(_b64decode(parts[1]))
+            signature = _b64decode(parts[2])
+        except ValueError as e:
+            raise InvalidToken(f"Jeton illisible: {e}")
+        if not isinstance(header, dict) or not isinstance(claims, dict):
+            raise InvalidToken("Jeton illisible")
+
+        if header.get('alg') != 'RS256':
+            raise InvalidToken(f"Algorithme refusé: {header.get('alg')}")
+        key = self.jwks.get(header.get('kid', ''))
+        if key is None:
+            raise InvalidToken(f"Clé inconnue: {header.get('kid')}")
+        if not verify_rs256(f"{parts[0]}.{parts[1]}".encode('ascii'), signature, *key):
+            raise InvalidToken("Signature invalide")
+
+        if not isinstance(claims.get('exp'), (int, float)) or claims['exp'] + LEEWAY_SECONDS <= now:
+            raise InvalidToken("Jeton expiré")
+        if claims.get('iss') != self.issuer:
+            raise InvalidToken(f"Émetteur refusé: {claims.get('iss')}")
+        token_use = claims.get('token_use')
+        if token_use not in ACCEPTED_TOKEN_USES:
+            raise InvalidToken(f"Type de jeton refusé: {token_use}")
+        if self.client_id:
+            audience = claims.get('aud') if token_use == 'id' else claims.get('client_id')
+            if audience != self.client_id:
+                raise InvalidToken(f"Audience refusée: {audience}")
+        if not claims.get('sub'):
+            raise InvalidToken("Claim sub manquant")
+        return claims
+
+
+_verifier: Optional[JwtVerifier] = None
+_verifier_lock = threading.Lock()
+
+
+def get_jwt_verifier() -> JwtVerifier:
+    """Vérificateur du User Pool configuré (COGNITO_USER_POOL_ID), partagé par le processus"""
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                if not USER_POOL_ID:
+                    raise InvalidToken("COGNITO_USER_POOL_ID non configuré")
+                _verifier = JwtVerifier(cognito_issuer(USER_POOL_ID), CLIENT_ID)
+    return _verifier
+
+
+def set_jwt_verifier(verifier: Optional[JwtVerifier]):
+    """Remplacer le vérificateur partagé (clés locales en développement, benchmarks)"""
+    global _verifier
+    _verifier = verifier
+
+
+def prefetch_jwks() -> bool:
+    """
+    Télécharger les clés du User Pool avant la première requête (démarrage) :
+    le premier jeton n'attend pas le JWKS. Sans effet si la vérification est
+    désactivée ou le User Pool non configuré.
+    """
+    if not VERIFICATION_ENABLED or not USER_POOL_ID:
+        return False
+    return get_jwt_verifier().jwks.refresh()
+
+
+def user_id_from_token(token: str) -> str:
+    """
+    sub d'un jeton vérifié ; lève InvalidToken s'il est refusé.
+    JWT_VERIFICATION_ENABLED=false : payload lu sans vérification (local uniquement).
+    """
+    if not VERIFICATION_ENABLED:
+        parts = token.split('.')
+        if len(parts) != 3:
+            raise InvalidToken("Format de jeton invalide")
+        try:
+            claims = loads(_b64decode(parts[1]))
+        except ValueError as e:
+            raise InvalidToken(f"Jeton illisible: {e}")
+        if not isinstance(claims, dict) or not claims.get('sub'):
+            raise InvalidToken("Claim sub manquant")
+        return claims['sub']
+    return get_jwt_verifier().verify(token)['sub']
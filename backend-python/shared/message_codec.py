@@ -0,0 +1,58 @@
+"""
+Compression des textes stockés en DynamoDB (messages, parts de documents)
+
+Au-delà d'un seuil, le texte est compressé (zlib) dans un attribut binaire
+du même nom, accompagné de {attribut}_codec qui indique le format.
+Sans {attribut}_codec, l'attribut est une chaîne brute (items existants).
+"""
+import os
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+CODEC_ZLIB_V1 = 'zlib-1'
+
+# En dessous du seuil, le gain ne compense pas l'attribut binaire (facturation par Ko)
+COMPRESS_MIN_BYTES = int(os.environ.get('MESSAGE_COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_LEVEL = int(os.environ.get('MESSAGE_COMPRESS_LEVEL', '6'))
+# Gain minimal exigé (ratio compressé / brut)
+COMPRESS_MAX_RATIO = 0.9
+
+
+def encode_text(text: str, min_bytes: Optional[int] = None) -> Tuple[Any, Optional[str]]:
+    """Retourne (valeur à stocker, codec) ; codec None pour une chaîne brute"""
+    raw = text.encode('utf-8')
+    threshold = COMPRESS_MIN_BYTES if min_bytes is None else min_bytes
+    if len(raw) < threshold:
+        return text, None
+
+    compressed = zlib.compress(raw, COMPRESS_LEVEL)
+    if len(compressed) > len(raw) * COMPRESS_MAX_RATIO:
+        return text, None
+    return compressed, CODEC_ZLIB_V1
+
+
+def decode_text(value: Any, codec: Optional[str]) -> str:
+    """Texte d'un attribut, quel que soit son format"""
+    if not codec:
+        return value
+    if codec == CODEC_ZLIB_V1:
+        # boto3 retourne les attributs binaires sous forme de Binary
+        data = getattr(value, 'value', value)
+        return zlib.decompress(bytes(data)).decode('utf-8')
+    raise ValueError(f"Codec inconnu: {codec}")
+
+
+def pack_text(item: Dict[str, Any], field: str, text: str) -> Dict[str, Any]:
+    """Écrire item[field] (compressé si utile) et son codec"""
+    value, codec = encode_text(text)
+    item[field] = value
+    if codec:
+        item[f"{field}_codec"] = codec
+    return item
+
+
+def unpack_text(item: Dict[str, Any], field: str, default: str = '') -> str:
+    """Lire item[field] (ancien ou nouveau format)"""
+    if field not in item:
+        return default
+    return decode_text(item[field], item.get(f"{field}_codec"))
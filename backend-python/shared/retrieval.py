@@ -0,0 +1,333 @@
+"""
+Recherche lexicale (BM25) dans les documents d'une conversation
+
+Au lieu d'envoyer le texte entier de chaque document à chaque tour, un
+document volumineux est découpé en passages qui se chevauchent, indexés
+une fois (index persisté avec le document), et seuls les passages les plus
+pertinents pour le message courant entrent dans le contexte. Les petits
+documents restent envoyés en entier.
+
+Un index par document (offsets des passages + listes de postings) : les
+index d'une conversation se combinent à la requête (IDF global), ajouter
+un document ne reconstruit pas les autres.
+"""
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from serialization import dumps_str, loads
+
+RETRIEVAL_ENABLED = os.environ.get('RETRIEVAL_ENABLED', 'true').lower() == 'true'
+# Taille des passages et chevauchement (caractères)
+CHUNK_CHARS = int(os.environ.get('RETRIEVAL_CHUNK_CHARS', '1500'))
+CHUNK_OVERLAP = int(os.environ.get('RETRIEVAL_CHUNK_OVERLAP', '200'))
+# Passages retenus par tour, tous documents confondus
+TOP_K = int(os.environ.get('RETRIEVAL_TOP_K', '8'))
+# En dessous de cette taille, le document est envoyé en entier
+FULL_TEXT_CHARS = int(os.environ.get('RETRIEVAL_FULL_TEXT_CHARS', '20000'))
+# Index désérialisés gardés en mémoire (conteneur chaud)
+INDEX_CACHE_SIZE = int(os.environ.get('RETRIEVAL_INDEX_CACHE_SIZE', '32'))
+
+# Paramètres BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Version du format d'index : un index d'une autre version (ou d'autres paramètres) est reconstruit
+INDEX_VERSION = 'bm25-1'
+
+EXCERPT_SEPARATOR = '\n[...]\n'
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Mots vides français et anglais (ni indexés ni cherchés)
+STOPWORDS = frozenset('''
+au aux avec ce ces cette dans de des du elle en et eux il ils je la le les leur leurs lui ma mais me meme mes
+moi mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre
+vous est sont ete etre avoir ont ai as a y ni si plus tout tous toute toutes comme sans sous entre aussi donc
+the of and to in is are was were be been for on with as at by an or it its this that these those from not
+'''.split())
+
+
+@lru_cache(maxsize=1)
+def accent_table() -> Dict[int, str]:
+    """
+    Lettres latines accentuées -> lettre de base (plus rapide que normalize
+    par caractère), construite au premier usage (démarrage à froid)
+    """
+    table = {}
+    for code in range(0xC0, 0x250):
+        decomposed = unicodedata.normalize('NFKD', chr(code))
+        base = ''.join(char for char in decomposed if not unicodedata.combining(char))
+        if base and base != chr(code):
+            table[code] = base
+    return table
+
+
+def tokenize(text: str) -> List[str]:
+    """Termes d'un texte : minuscules, sans accents, sans mots vides, pluriel en -s retiré"""
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower().translate(accent_table())):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s'):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+def chunk_text(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[Tuple[int, int]]:
+    """
+    Passages (début, fin) de size caractères au plus, qui se chevauchent de
+    overlap caractères. Coupure de préférence en fin de ligne, sinon entre
+    deux mots, dans la seconde moitié du passage.
+    """
+    chunks = []
+    start = 0
+    length = len(text)
+    overlap = min(overlap, size // 2)
+    while start < length:
+        end = min(start + size, length)
+        if end < length:
+            cut = text.rfind('\n', start + size // 2, end)
+            if cut == -1:
+                cut = text.rfind(' ', start + size // 2, end)
+            if cut != -1:
+                end = cut + 1
+        chunks.append((start, end))
+        if end >= length:
+            break
+        next_start = end - overlap
+        # Début du passage suivant aligné sur un mot
+        space = text.find(' ', next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return chunks
+
+
+@dataclass
+class DocumentIndex:
+    """Index BM25 d'un document : offsets et longueur (en termes) des passages, postings"""
+    chunks: List[Tuple[int, int]]
+    lengths: List[int]
+    # terme -> [passage, fréquence, passage, fréquence, ...]
+    postings: Dict[str, List[int]]
+    params: str = field(default='')
+
+    def dumps(self) -> str:
+        return dumps_str({
+            'version': INDEX_VERSION,
+            'params': self.params,
+            'chunks': [value for chunk in self.chunks for value in chunk],
+            'lengths': self.lengths,
+            'postings': self.postings,
+        })
+
+    @classmethod
+    def loads(cls, payload: str) -> Optional['DocumentIndex']:
+        """Index persisté, ou None s'il est illisible ou d'un autre format"""
+        try:
+            data = loads(payload)
+        except (TypeError, ValueError):
+            return None
+        if data.get('version') != INDEX_VERSION or data.get('params') != index_params():
+            return None
+        flat = data['chunks']
+        return cls(
+            chunks=[(flat[i], flat[i + 1]) for i in range(0, len(flat), 2)],
+            lengths=data['lengths'],
+            postings=data['postings'],
+            params=data['params'],
+        )
+
+
+def index_params() -> str:
+    return f"{CHUNK_CHARS}:{CHUNK_OVERLAP}"
+
+
+def build_index(text: str) -> DocumentIndex:
+    chunks = chunk_text(text)
+    lengths = []
+    postings: Dict[str, List[int]] = {}
+    for position, (start, end) in enumerate(chunks):
+        frequencies: Dict[str, int] = {}
+        terms = tokenize(text[start:end])
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+        for term, frequency in frequencies.items():
+            postings.setdefault(term, []).extend((position, frequency))
+        lengths.append(len(terms))
+    return DocumentIndex(chunks=chunks, lengths=lengths, postings=postings, params=index_params())
+
+
+class _IndexCache:
+    """Index désérialisés, par ID de document (= hash du contenu), bornés en nombre"""
+
+    def __init__(self, max_items: int = INDEX_CACHE_SIZE):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, DocumentIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[DocumentIndex]:
+        with self._lock:
+            index = self._items.get(key)
+            if index is not None:
+                self._items.move_to_end(key)
+            return index
+
+    def put(self, key: str, index: DocumentIndex):
+        with self._lock:
+            self._items[key] = index
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+
+_index_cache = _IndexCache()
+
+
+def _payload_prefix() -> str:
+    # dumps() écrit la version et les paramètres en tête : vérification sans parser
+    return f'{{"version":"{INDEX_VERSION}","params":"{index_params()}"'
+
+
+def document_index(doc: Dict[str, Any]) -> Tuple[DocumentIndex, bool]:
+    """
+    Index d'un document : cache mémoire, index persisté (doc['index']) ou
+    construit. Retourne (index, à persister).
+    """
+    persisted = (doc.get('index') or '').startswith(_payload_prefix())
+    key = f"{doc['id']}:{INDEX_VERSION}:{index_params()}" if doc.get('id') else None
+    index = _index_cache.get(key) if key else None
+    if index is None and persisted:
+        index = DocumentIndex.loads(doc['index'])
+        persisted = index is not None
+    if index is None:
+        index = build_index(doc['text'])
+    if key:
+        _index_cache.put(key, index)
+    return index, key is not None and not persisted
+
+
+def rank_chunks(indexes: List[DocumentIndex], query: str, top_k: int) -> List[Tuple[float, int, int]]:
+    """Passages les plus pertinents : (score, index du document, passage), scores BM25 décroissants"""
+    terms = set(tokenize(query))
+    total_chunks = sum(len(index.chunks) for index in indexes)
+    if not terms or not total_chunks:
+        return []
+    average_length = sum(sum(index.lengths) for index in indexes) / total_chunks or 1.0
+
+    scores: Dict[Tuple[int, int], float] = {}
+    for term in terms:
+        frequency = sum(len(index.postings.get(term, ())) // 2 for index in indexes)
+        if not frequency:
+            continue
+        idf = math.log(1 + (total_chunks - frequency + 0.5) / (frequency + 0.5))
+        for doc_position, index in enumerate(indexes):
+            posting = index.postings.get(term)
+            if not posting:
+                continue
+            for i in range(0, len(posting), 2):
+                chunk, tf = posting[i], posting[i + 1]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * index.lengths[chunk] / average_length)
+                key = (doc_position, chunk)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+    ranked = sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+    return [(score, doc_position, chunk) for (doc_position, chunk), score in ranked]
+
+
+def format_excerpts(text: str, index: DocumentIndex, chunk_positions: List[int]) -> str:
+    """Passages retenus dans l'ordre du document, chevauchements fusionnés"""
+    ranges = sorted(index.chunks[position] for position in chunk_positions)
+    merged: List[List[int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    parts = [text[start:end].strip() for start, end in merged]
+    excerpt = EXCERPT_SEPARATOR.join(parts)
+    if merged[0][0] > 0:
+        excerpt = EXCERPT_SEPARATOR.lstrip('\n') + excerpt
+    if merged[-1][1] < len(text):
+        excerpt += EXCERPT_SEPARATOR.rstrip('\n')
+    header = f"[Extraits pertinents : {len(chunk_positions)} passage(s) sur {len(index.chunks)}]\n"
+    return header + excerpt
+
+
+@dataclass
+class RetrievalResult:
+    """Documents du contexte d'un tour et index à persister"""
+    documents: List[Dict[str, Any]]
+    # ID de document -> index sérialisé (construit pendant ce tour)
+    new_indexes: Dict[str, str] = field(default_factory=dict)
+    stats: Dict[str, int] = field(default_factory=dict)
+
+    def full_documents(self) -> List[Dict[str, Any]]:
+        """Documents envoyés en entier : identiques d'un tour à l'autre (préfixe en cache)"""
+        return [doc for doc in self.documents if not doc.get('excerpt')]
+
+    def excerpt_documents(self) -> List[Dict[str, Any]]:
+        """Passages retenus pour ce message : changent à chaque tour, hors du préfixe en cache"""
+        return [doc for doc in self.documents if doc.get('excerpt')]
+
+
+def select_context(documents: List[Dict[str, Any]], query: str,
+                   top_k: int = TOP_K, full_text_chars: int = FULL_TEXT_CHARS) -> RetrievalResult:
+    """
+    Documents à envoyer pour ce tour : texte entier des petits documents,
+    passages les plus pertinents (BM25) pour les autres. Sans terme utile
+    dans la question (« résume »), les premiers passages de chaque document.
+    """
+    large = [doc for doc in documents if len(doc.get('text', '')) > full_text_chars]
+    if not RETRIEVAL_ENABLED or not large:
+        return RetrievalResult(documents=documents)
+
+    indexes = []
+    new_indexes = {}
+    for doc in large:
+        index, is_new = document_index(doc)
+        indexes.append(index)
+        if is_new:
+            new_indexes[doc['id']] = index.dumps()
+
+    selected: Dict[int, List[int]] = {}
+    for _, doc_position, chunk in rank_chunks(indexes, query, top_k):
+        selected.setdefault(doc_position, []).append(chunk)
+    if not selected:
+        # Début de chaque document, à tour de rôle
+        first_chunks = sorted(
+            (chunk, doc_position)
+            for doc_position, index in enumerate(indexes)
+            for chunk in range(min(top_k, len(index.chunks)))
+        )
+        for chunk, doc_position in first_chunks[:top_k]:
+            selected.setdefault(doc_position, []).append(chunk)
+
+    excerpts = {}
+    for doc_position, doc in enumerate(large):
+        if doc_position in selected:
+            text = format_excerpts(doc['text'], indexes[doc_position], selected[doc_position])
+        else:
+            text = "[Aucun passage pertinent pour cette question]"
+        excerpts[id(doc)] = text
+
+    context_documents = [
+        dict(doc, text=excerpts[id(doc)], excerpt=True) if id(doc) in excerpts else doc
+        for doc in documents
+    ]
+    stats = {
+        'documents': len(documents),
+        'searched': len(large),
+        'chunks': sum(len(index.chunks) for index in indexes),
+        'selected': sum(len(chunks) for chunks in selected.values()),
+        'chars_before': sum(len(doc.get('text', '')) for doc in documents),
+        'chars_after': sum(len(doc.get('text', '')) for doc in context_documents),
+        'indexed': len(new_indexes),
+    }
+    return RetrievalResult(documents=context_documents, new_indexes=new_indexes, stats=stats)
@@ -0,0 +1,76 @@
+"""
+Sérialisation JSON des chemins chauds (événements NDJSON, réponses, Bedrock)
+
+Travaille directement en bytes : les événements sont écrits sur le socket
+et les chunks Bedrock arrivent en bytes, sans passer par une chaîne
+intermédiaire (.encode / .decode en plus).
+
+Codec : orjson s'il est installé (extension native, sortie UTF-8 directe),
+sinon la bibliothèque standard avec des encodeurs préconstruits (pas de
+JSONEncoder recréé à chaque appel). Même sortie dans les deux cas :
+compacte, UTF-8 sans échappement \\uXXXX des caractères accentués.
+SERIALIZATION_BACKEND=json force la bibliothèque standard.
+"""
+import json
+import os
+from functools import lru_cache
+from typing import Any, Callable, Optional, Union
+
+try:
+    if os.environ.get('SERIALIZATION_BACKEND', 'auto').lower() == 'json':
+        raise ImportError
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson else 'json'
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+_DECODER = json.JSONDecoder()
+
+
+@lru_cache(maxsize=8)
+def _encoder_with_default(default: Callable[[Any], Any]) -> json.JSONEncoder:
+    return json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=default)
+
+
+if orjson:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+        """JSON compact en UTF-8 ; default convertit les types non sérialisables (ex. str, Decimal)"""
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS)
+
+    def dumps_str(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> str:
+        """JSON compact en str (body API Gateway, logs)"""
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS).decode('utf-8')
+
+    def ndjson_line(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+        """Ligne NDJSON (JSON + '\\n') en bytes"""
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        """Décoder du JSON en bytes (ou str)"""
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+        """JSON compact en UTF-8 ; default convertit les types non sérialisables (ex. str, Decimal)"""
+        encoder = _ENCODER if default is None else _encoder_with_default(default)
+        return encoder.encode(obj).encode('utf-8')
+
+    def dumps_str(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> str:
+        """JSON compact en str (body API Gateway, logs)"""
+        encoder = _ENCODER if default is None else _encoder_with_default(default)
+        return encoder.encode(obj)
+
+    def ndjson_line(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+        """Ligne NDJSON (JSON + '\\n') en bytes"""
+        encoder = _ENCODER if default is None else _encoder_with_default(default)
+        return (encoder.encode(obj) + '\n').encode('utf-8')
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        """Décoder du JSON en bytes (ou str)"""
+        if not isinstance(data, str):
+            # json.loads détecterait l'encodage à chaque appel : c'est toujours de l'UTF-8 ici
+            data = str(data, 'utf-8')
+        return _DECODER.decode(data)
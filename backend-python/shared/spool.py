@@ -0,0 +1,106 @@
+"""
+Réception d'un fichier en flux vers un fichier temporaire
+
+Le corps d'une requête est écrit sur disque au fil de la réception (jamais
+entier en mémoire) et haché au passage, puis relu via un mmap : ni chaîne
+base64, ni bytes, ni BytesIO du fichier complet. Un worker d'extraction
+reçoit le chemin et mappe lui-même le fichier (pas de copie du contenu
+vers le processus).
+"""
+import asyncio
+import hashlib
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import AsyncIterable, Iterator, Optional, Union
+
+SPOOL_DIR = os.environ.get('UPLOAD_SPOOL_DIR') or tempfile.gettempdir()
+# Écritures disque groupées, hors de la boucle d'événements
+SPOOL_WRITE_BYTES = int(os.environ.get('UPLOAD_SPOOL_WRITE_BYTES', str(1024 * 1024)))
+
+
+class UploadTooLarge(Exception):
+    """Corps plus gros que la limite (réception interrompue)"""
+
+    def __init__(self, size: int, max_bytes: int):
+        super().__init__(f"Fichier trop volumineux: plus de {max_bytes} octets")
+        self.size = size
+        self.max_bytes = max_bytes
+
+
+@contextmanager
+def mapped_file(path: str) -> Iterator[Union[bytes, mmap.mmap]]:
+    """Contenu d'un fichier en lecture seule via mmap (b'' si vide : mmap refuse une taille nulle)"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+class SpooledFile:
+    """Fichier reçu, conservé sur disque le temps du traitement (supprimé par close)"""
+
+    def __init__(self, path: str, size: int = 0, sha256: str = ''):
+        self.path = path
+        self.size = size
+        # Hash hexadécimal du contenu (ID de document, clé du cache d'extraction)
+        self.sha256 = sha256
+
+    def mapped(self):
+        return mapped_file(self.path)
+
+    def close(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> 'SpooledFile':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def spool_stream(chunks: AsyncIterable[bytes], max_bytes: Optional[int] = None,
+                       suffix: str = '') -> SpooledFile:
+    """
+    Écrire un flux de morceaux (request.stream()) dans un fichier temporaire,
+    en calculant son SHA-256 au passage (le fichier n'est pas relu pour le hash).
+    Lève UploadTooLarge dès que max_bytes est dépassé (fichier supprimé).
+    """
+    fd, path = tempfile.mkstemp(prefix='upload-', suffix=suffix, dir=SPOOL_DIR)
+    spooled = SpooledFile(path)
+    digest = hashlib.sha256()
+
+    def write(f, batch):
+        for chunk in batch:
+            digest.update(chunk)
+        f.writelines(batch)
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pending = []
+            pending_bytes = 0
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                spooled.size += len(chunk)
+                if max_bytes and spooled.size > max_bytes:
+                    raise UploadTooLarge(spooled.size, max_bytes)
+                pending.append(chunk)
+                pending_bytes += len(chunk)
+                if pending_bytes >= SPOOL_WRITE_BYTES:
+                    await asyncio.to_thread(write, f, pending)
+                    pending = []
+                    pending_bytes = 0
+            if pending:
+                await asyncio.to_thread(write, f, pending)
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.sha256 = digest.hexdigest()
+    return spooled
@@ -0,0 +1,55 @@
+"""
+Durée des étapes d'une requête de chat (historique, documents, Bedrock...)
+
+Exposées dans l'événement NDJSON de fin et dans les logs pour mesurer
+le gain de la parallélisation.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict
+
+
+class StageTimer:
+    """Chronomètre par étape, utilisable depuis plusieurs threads"""
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self._start = clock()
+        self._stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self._stages[name] = seconds
+
+    def mark(self, name: str):
+        """Enregistrer le temps écoulé depuis le début de la requête"""
+        self.record(name, self._clock() - self._start)
+
+    @contextmanager
+    def stage(self, name: str):
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.record(name, self._clock() - start)
+
+    def timed(self, name: str, fn: Callable) -> Callable:
+        """fn chronométrée (pour un pool de threads)"""
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    async def measure(self, name: str, awaitable: Awaitable):
+        """Attendre awaitable en chronométrant l'étape"""
+        with self.stage(name):
+            return await awaitable
+
+    def as_dict(self) -> Dict[str, float]:
+        """Durées en millisecondes, avec le total écoulé"""
+        with self._lock:
+            timings = {name: round(seconds * 1000, 1) for name, seconds in self._stages.items()}
+        timings['total'] = round((self._clock() - self._start) * 1000, 1)
+        return timings
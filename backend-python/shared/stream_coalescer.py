@@ -0,0 +1,67 @@
+"""
+Regroupement des deltas de texte Bedrock avant envoi au client (NDJSON)
+"""
+import os
+import time
+from typing import List, Optional
+
+# Seuils configurables par déploiement (0 octet = un chunk par delta)
+COALESCE_MAX_BYTES = int(os.environ.get('STREAM_COALESCE_BYTES', '512'))
+COALESCE_INTERVAL_MS = int(os.environ.get('STREAM_COALESCE_MS', '20'))
+
+
+class ChunkCoalescer:
+    """
+    Accumule les deltas et les libère quand le buffer atteint max_bytes
+    ou quand le plus ancien delta en attente a plus de interval_ms.
+    Le premier delta du stream est libéré immédiatement (time-to-first-token).
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, interval_ms: Optional[int] = None,
+                 clock=time.monotonic):
+        self.max_bytes = COALESCE_MAX_BYTES if max_bytes is None else max_bytes
+        self.interval = (COALESCE_INTERVAL_MS if interval_ms is None else interval_ms) / 1000.0
+        self._clock = clock
+        self._parts: List[str] = []
+        self._size = 0
+        self._since: Optional[float] = None
+        self._first = True
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._parts)
+
+    def add(self, text: str) -> Optional[str]:
+        """Ajouter un delta ; retourne le texte à envoyer si un seuil est atteint"""
+        if not text:
+            return None
+
+        if not self._parts:
+            self._since = self._clock()
+        self._parts.append(text)
+        self._size += len(text.encode('utf-8'))
+
+        if self._first or self._size >= self.max_bytes or self.due():
+            self._first = False
+            return self.flush()
+        return None
+
+    def due(self) -> bool:
+        """Le délai maximal d'attente du buffer est-il écoulé ?"""
+        return self._since is not None and self._clock() - self._since >= self.interval
+
+    def time_until_due(self) -> Optional[float]:
+        """Secondes avant la prochaine libération forcée (None si buffer vide)"""
+        if self._since is None:
+            return None
+        return max(self.interval - (self._clock() - self._since), 0.0)
+
+    def flush(self) -> Optional[str]:
+        """Vider le buffer"""
+        if not self._parts:
+            return None
+        text = ''.join(self._parts)
+        self._parts = []
+        self._size = 0
+        self._since = None
+        return text
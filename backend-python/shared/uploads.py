@@ -0,0 +1,212 @@
+"""
+Upload direct vers S3 (URL présignée) et extraction asynchrone déclenchée par S3
+
+Disposition des objets pour un upload :
+- uploads/{user_id}/{upload_id}/source/{nom}   fichier envoyé par le client
+- uploads/{user_id}/{upload_id}/status.json    statut (pending, ready, error)
+- uploads/{user_id}/{upload_id}/extracted.txt  texte extrait (statut ready)
+"""
+import io
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from serialization import dumps, loads
+
+UPLOAD_BUCKET = os.environ.get('UPLOAD_BUCKET', '')
+UPLOAD_BACKEND = os.environ.get('UPLOAD_BACKEND', 's3').lower()  # s3, local
+UPLOAD_PREFIX = 'uploads/'
+PRESIGN_EXPIRES_SECONDS = int(os.environ.get('UPLOAD_PRESIGN_EXPIRES', '900'))
+MAX_UPLOAD_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', str(50 * 1024 * 1024)))
+
+STATUS_PENDING = 'pending'
+STATUS_READY = 'ready'
+STATUS_ERROR = 'error'
+
+
+class UploadNotReady(Exception):
+    """Extraction non terminée (ou upload inconnu) : le client doit repasser plus tard"""
+
+    def __init__(self, upload_id: str, status: str):
+        super().__init__(f"Upload {upload_id} not ready (status: {status})")
+        self.upload_id = upload_id
+        self.status = status
+
+
+def uploads_enabled() -> bool:
+    """
+    Upload direct configuré (bucket provisionné avec sa notification vers le
+    File Processor) : sans bucket, aucune extraction ne serait déclenchée.
+    """
+    return bool(UPLOAD_BUCKET)
+
+
+def upload_base_key(user_id: str, upload_id: str) -> str:
+    return f"{UPLOAD_PREFIX}{user_id}/{upload_id}/"
+
+
+def source_key(user_id: str, upload_id: str, file_name: str) -> str:
+    return f"{upload_base_key(user_id, upload_id)}source/{file_name}"
+
+
+def parse_source_key(key: str) -> Optional[Dict[str, str]]:
+    """
+    Décomposer la clé d'un fichier source ; None pour les autres objets
+    (status.json, extracted.txt), ce qui évite que le trigger S3 ne boucle
+    sur ses propres écritures.
+    """
+    if not key.startswith(UPLOAD_PREFIX):
+        return None
+    parts = key[len(UPLOAD_PREFIX):].split('/', 3)
+    if len(parts) != 4 or parts[2] != 'source' or not parts[3]:
+        return None
+    return {'user_id': parts[0], 'upload_id': parts[1], 'file_name': parts[3]}
+
+
+def create_presigned_upload(s3, bucket: str, user_id: str, file_name: str, file_type: str) -> Dict[str, Any]:
+    """
+    Préparer un upload : statut pending + POST présigné (taille bornée,
+    Content-Type imposé). Le client envoie le fichier directement à S3.
+    """
+    upload_id = str(uuid.uuid4())
+    key = source_key(user_id, upload_id, file_name)
+
+    write_status(s3, bucket, user_id, upload_id, {
+        'status': STATUS_PENDING,
+        'fileName': file_name,
+        'fileType': file_type
+    })
+
+    presigned = s3.generate_presigned_post(
+        Bucket=bucket,
+        Key=key,
+        Fields={'Content-Type': file_type},
+        Conditions=[
+            {'Content-Type': file_type},
+            ['content-length-range', 1, MAX_UPLOAD_BYTES]
+        ],
+        ExpiresIn=PRESIGN_EXPIRES_SECONDS
+    )
+
+    return {
+        'uploadId': upload_id,
+        'key': key,
+        'uploadUrl': presigned['url'],
+        'fields': presigned['fields'],
+        'expiresIn': PRESIGN_EXPIRES_SECONDS,
+        'maxBytes': MAX_UPLOAD_BYTES
+    }
+
+
+def write_status(s3, bucket: str, user_id: str, upload_id: str, status: Dict[str, Any]):
+    status = dict(status, uploadId=upload_id, updatedAt=int(time.time() * 1000))
+    s3.put_object(
+        Bucket=bucket,
+        Key=f"{upload_base_key(user_id, upload_id)}status.json",
+        Body=dumps(status),
+        ContentType='application/json'
+    )
+
+
+def read_status(s3, bucket: str, user_id: str, upload_id: str) -> Optional[Dict[str, Any]]:
+    """Statut d'un upload (None si inconnu pour cet utilisateur)"""
+    try:
+        response = s3.get_object(Bucket=bucket, Key=f"{upload_base_key(user_id, upload_id)}status.json")
+    except s3.exceptions.NoSuchKey:
+        return None
+    return loads(response['Body'].read())
+
+
+def write_extracted_text(s3, bucket: str, user_id: str, upload_id: str, text: str):
+    s3.put_object(
+        Bucket=bucket,
+        Key=f"{upload_base_key(user_id, upload_id)}extracted.txt",
+        Body=text.encode('utf-8'),
+        ContentType='text/plain; charset=utf-8'
+    )
+
+
+def read_source(s3, bucket: str, key: str) -> Dict[str, Any]:
+    """Contenu et type d'un fichier source"""
+    response = s3.get_object(Bucket=bucket, Key=key)
+    return {
+        'content': response['Body'].read(),
+        'content_type': response.get('ContentType', 'application/octet-stream')
+    }
+
+
+def load_ready_upload(s3, bucket: str, user_id: str, upload_id: str) -> Dict[str, Any]:
+    """
+    Document prêt pour le contexte du chat : {id, name, type, text}.
+    Lève UploadNotReady tant que l'extraction n'est pas terminée.
+    """
+    status = read_status(s3, bucket, user_id, upload_id)
+    if not status:
+        raise UploadNotReady(upload_id, 'unknown')
+    if status['status'] != STATUS_READY:
+        raise UploadNotReady(upload_id, status['status'])
+
+    response = s3.get_object(Bucket=bucket, Key=f"{upload_base_key(user_id, upload_id)}extracted.txt")
+    return {
+        'id': status['documentId'],
+        'name': status['fileName'],
+        'type': status['fileType'],
+        'text': response['Body'].read().decode('utf-8')
+    }
+
+
+class LocalS3Client:
+    """
+    Équivalent local minimal du client S3 (tests, développement) :
+    objets en mémoire, mêmes signatures que boto3 pour les appels utilisés ici.
+    """
+
+    class exceptions:
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self):
+        self._objects: Dict[tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, ContentType: str = 'binary/octet-stream', **kwargs):
+        if isinstance(Body, str):
+            Body = Body.encode('utf-8')
+        elif not isinstance(Body, bytes):
+            Body = Body.read()
+        with self._lock:
+            self._objects[(Bucket, Key)] = {'data': Body, 'ContentType': ContentType}
+        return {}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs):
+        with self._lock:
+            obj = self._objects.get((Bucket, Key))
+        if obj is None:
+            raise self.exceptions.NoSuchKey(Key)
+        return {
+            'Body': io.BytesIO(obj['data']),
+            'ContentType': obj['ContentType'],
+            'ContentLength': len(obj['data'])
+        }
+
+    def generate_presigned_post(self, Bucket: str, Key: str, Fields=None, Conditions=None, ExpiresIn: int = 3600):
+        return {
+            'url': f"http://localhost/{Bucket}",
+            'fields': dict(Fields or {}, key=Key)
+        }
+
+
+_local_s3 = None
+
+
+def get_upload_s3_client():
+    """Client S3 des uploads (UPLOAD_BACKEND=local : équivalent en mémoire)"""
+    global _local_s3
+    if UPLOAD_BACKEND == 'local':
+        if _local_s3 is None:
+            _local_s3 = LocalS3Client()
+        return _local_s3
+    from aws_clients import get_s3_client
+    return get_s3_client()
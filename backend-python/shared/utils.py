@@ -8,6 +8,8 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
+from serialization import dumps_str, loads
+
 # Configuration du logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -36,7 +38,7 @@ def create_response(status_code: int, body: Dict[str, Any],
     return {
         'statusCode': status_code,
         'headers': default_headers,
-        'body': json.dumps(body, ensure_ascii=False, default=str)
+        'body': dumps_str(body, default=str)
     }
 
 def extract_user_id(event: Dict[str, Any]) -> Optional[str]:
@@ -50,26 +52,14 @@ def extract_user_id(event: Dict[str, Any]) -> Optional[str]:
         if user_id:
             return user_id
         
-        # Sinon, décoder le JWT du header Authorization (Lambda Function URL)
+        # Sinon, vérifier le JWT du header Authorization (Lambda Function URL :
+        # aucun authorizer en amont)
         headers = event.get('headers', {})
         auth_header = headers.get('authorization') or headers.get('Authorization')
         
         if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            # Décoder le JWT (sans vérification de signature pour l'instant)
-            # Le payload est la partie centrale du JWT (header.payload.signature)
-            parts = token.split('.')
-            if len(parts) == 3:
-                # Ajouter le padding nécessaire pour base64
-                payload = parts[1]
-                padding = 4 - (len(payload) % 4)
-                if padding != 4:
-                    payload += '=' * padding
-                
-                import base64
-                decoded = base64.urlsafe_b64decode(payload)
-                claims = json.loads(decoded)
-                return claims.get('sub')
+            from jwt_verifier import user_id_from_token
+            return user_id_from_token(auth_header.split(' ')[1])
         
         return None
     except Exception as e:
@@ -87,7 +77,7 @@ def generate_id() -> str:
 def validate_json_body(event: Dict[str, Any], required_fields: List[str]) -> tuple[Dict[str, Any], Optional[str]]:
     """Valider le body JSON et les champs requis"""
     try:
-        body = json.loads(event.get('body', '{}'))
+        body = loads(event.get('body', '{}'))
         
         missing_fields = [field for field in required_fields if field not in body]
         if missing_fields:
@@ -0,0 +1,144 @@
+"""
+Écritures différées (write-behind) : persistance hors du chemin de la réponse
+
+Les tâches sont exécutées par un thread de fond, avec retries (backoff
+exponentiel). Chaque tâche porte une clé d'idempotence : une tâche déjà
+en attente avec la même clé n'est pas ajoutée une seconde fois.
+
+Dans Lambda, l'environnement est gelé entre deux invocations : flush()
+doit être appelé après l'envoi de la réponse, avant l'invocation suivante.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+MAX_ATTEMPTS = int(os.environ.get('WRITE_BEHIND_MAX_ATTEMPTS', '5'))
+BASE_DELAY_SECONDS = float(os.environ.get('WRITE_BEHIND_BASE_DELAY_MS', '100')) / 1000.0
+MAX_DELAY_SECONDS = 5.0
+FLUSH_TIMEOUT_SECONDS = float(os.environ.get('WRITE_BEHIND_FLUSH_TIMEOUT', '10'))
+
+
+class WriteBehindQueue:
+    """File de tâches d'écriture exécutées par un thread de fond"""
+
+    def __init__(self, max_attempts: int = MAX_ATTEMPTS, base_delay: float = BASE_DELAY_SECONDS,
+                 on_failure: Optional[Callable[[str, Exception, Dict[str, Any]], None]] = None,
+                 sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.on_failure = on_failure
+        self._sleep = sleep
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'submitted': 0, 'completed': 0, 'retried': 0, 'failed': 0, 'duplicates': 0}
+
+    def submit(self, key: str, fn: Callable, *args, context: Optional[Dict[str, Any]] = None, **kwargs) -> bool:
+        """
+        Ajouter une tâche (non bloquant). Retourne False si une tâche
+        de même clé est déjà en attente.
+        """
+        with self._lock:
+            if key in self._pending:
+                self.stats['duplicates'] += 1
+                return False
+            self._pending.add(key)
+            self.stats['submitted'] += 1
+            self._ensure_worker()
+        self._queue.put((key, fn, args, kwargs, context or {}))
+        return True
+
+    def pending(self, prefix: Optional[str] = None) -> int:
+        """Nombre de tâches en attente (dont la clé commence par prefix si précisé)"""
+        with self._lock:
+            if prefix:
+                return sum(1 for key in self._pending if key.startswith(prefix))
+            return len(self._pending)
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT_SECONDS, prefix: Optional[str] = None) -> bool:
+        """
+        Attendre la fin des tâches en attente (False si le délai est dépassé).
+        prefix limite l'attente aux clés qui commencent par ce préfixe
+        (ex. les tours d'une conversation : les autres tâches continuent).
+        """
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while any(key.startswith(prefix) for key in self._pending) if prefix else self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def _ensure_worker(self):
+        # Appelé sous self._lock
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            key, fn, args, kwargs, context = self._queue.get()
+            try:
+                self._execute(key, fn, args, kwargs, context)
+            finally:
+                with self._idle:
+                    self._pending.discard(key)
+                    self._idle.notify_all()
+
+    def _execute(self, key: str, fn: Callable, args, kwargs, context: Dict[str, Any]):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                fn(*args, **kwargs)
+                self.stats['completed'] += 1
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    self.stats['failed'] += 1
+                    print(f"Write-behind: échec définitif de {key} après {attempt} tentatives: {e} "
+                          f"(contexte: {json.dumps(context, default=str)})")
+                    traceback.print_exc()
+                    if self.on_failure:
+                        self.on_failure(key, e, context)
+                    return
+                self.stats['retried'] += 1
+                delay = min(self.base_delay * 2 ** (attempt - 1), MAX_DELAY_SECONDS)
+                print(f"Write-behind: tentative {attempt} de {key} échouée ({e}), nouvel essai dans {delay:.2f}s")
+                self._sleep(delay)
+
+
+# Un thread par file, tâches exécutées dans l'ordre : les tâches lentes (appel
+# Bedrock du résumé glissant) et les index de recherche (écritures par lots)
+# ont chacune leur file, pour ne pas retarder les tours derrière elles
+SLOW_QUEUE = 'slow'
+INDEX_QUEUE = 'index'
+
+_queues: Dict[str, WriteBehindQueue] = {}
+_queue_lock = threading.Lock()
+
+
+def get_write_behind_queue(name: str = 'default') -> WriteBehindQueue:
+    """File partagée du processus (vidée à la sortie de l'interpréteur)"""
+    with _queue_lock:
+        if name not in _queues:
+            _queues[name] = WriteBehindQueue()
+            atexit.register(_queues[name].flush)
+        return _queues[name]
+
+
+def flush_write_behind_queues(timeout: float = FLUSH_TIMEOUT_SECONDS) -> bool:
+    """Vider toutes les files (fin d'invocation Lambda, arrêt) ; False si le délai est dépassé"""
+    deadline = time.monotonic() + timeout
+    with _queue_lock:
+        queues = list(_queues.values())
+    done = True
+    for queue in queues:
+        done = queue.flush(max(deadline - time.monotonic(), 0)) and done
+    return done
@@ -0,0 +1,60 @@
+"""
+Configuration pytest : modules partagés importables comme dans les Lambda
+(shared/ ajouté au path), AWS simulé par moto
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(BACKEND_DIR, 'shared'))
+
+# Identifiants factices : aucun appel ne doit sortir vers AWS
+os.environ.setdefault('AWS_DEFAULT_REGION', 'eu-west-3')
+os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+os.environ.pop('AWS_PROFILE', None)
+
+
+@pytest.fixture
+def aws():
+    """Services AWS simulés (moto), registre de clients vidé avant et après le test"""
+    moto = pytest.importorskip('moto')
+    import aws_clients
+
+    aws_clients._registry = aws_clients.ClientRegistry()
+    with moto.mock_aws():
+        yield
+    aws_clients._registry = aws_clients.ClientRegistry()
+
+
+@pytest.fixture
+def history_table(aws):
+    """Table d'historique, même schéma que infrastructure/modules/dynamodb"""
+    from aws_clients import get_dynamodb_resource
+
+    return get_dynamodb_resource().create_table(
+        TableName='chat-history',
+        BillingMode='PAY_PER_REQUEST',
+        KeySchema=[
+            {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+            {'AttributeName': 'conversation_id', 'KeyType': 'RANGE'}
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'user_id', 'AttributeType': 'S'},
+            {'AttributeName': 'conversation_id', 'AttributeType': 'S'},
+            {'AttributeName': 'timestamp', 'AttributeType': 'N'}
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'timestamp-index',
+            'KeySchema': [
+                {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {
+                'ProjectionType': 'INCLUDE',
+                'NonKeyAttributes': ['message_count', 'preview']
+            }
+        }]
+    )
@@ -0,0 +1,135 @@
+"""Historique des conversations sur DynamoDB (moto)"""
+import pytest
+
+from conversation_store import ConversationStore, is_valid_conversation_id, message_key, next_sequence, turn_key
+
+
+def turn(question, answer):
+    return [
+        {'role': 'user', 'content': question, 'timestamp': 1000},
+        {'role': 'assistant', 'content': answer, 'timestamp': 2000, 'tokens': 12}
+    ]
+
+
+@pytest.fixture
+def store(history_table):
+    return ConversationStore(history_table)
+
+
+def test_append_and_load_messages(store):
+    assert store.append_messages('u1', 'c1', turn('Bonjour', 'Salut')) == 2
+    assert store.append_messages('u1', 'c1', turn('Et ensuite ?', 'Voilà'), base_seq=2) == 4
+
+    messages = store.load_messages('u1', 'c1')
+    assert [msg['content'] for msg in messages] == ['Bonjour', 'Salut', 'Et ensuite ?', 'Voilà']
+    assert [msg['seq'] for msg in messages] == [0, 1, 2, 3]
+    assert messages[1]['tokens'] == 12
+    assert next_sequence(messages) == 4
+
+    header = store.get_header('u1', 'c1')
+    assert header['message_count'] == 4 and header['preview'] == 'Bonjour'
+
+
+def test_load_last_messages(store):
+    for i in range(3):
+        store.append_messages('u1', 'c1', turn(f'q{i}', f'r{i}'), base_seq=2 * i)
+    assert [msg['content'] for msg in store.load_messages('u1', 'c1', limit=3)] == ['r1', 'q2', 'r2']
+    assert store.load_messages('u1', 'c1', limit=0) == []
+
+
+def test_long_content_roundtrip(store):
+    long_answer = 'réponse détaillée ' * 2000
+    store.append_messages('u1', 'c1', turn('q', long_answer))
+    assert store.load_messages('u1', 'c1')[1]['content'] == long_answer
+
+
+def test_retried_turn_reuses_its_sequences(store):
+    store.append_messages('u1', 'c1', turn('q0', 'r0'), turn_id='t0')
+    store.append_messages('u1', 'c1', turn('q1', 'r1'), base_seq=2, turn_id='t1')
+    # Retry du dernier tour (écriture déjà appliquée)
+    assert store.append_messages('u1', 'c1', turn('q1', 'r1'), base_seq=2, turn_id='t1') == 4
+    assert [msg['content'] for msg in store.load_messages('u1', 'c1')] == ['q0', 'r0', 'q1', 'r1']
+
+
+def test_turn_retried_after_later_turns_is_not_duplicated(store):
+    # Premier tour en échec côté client (timeout) mais écrit, tour suivant écrit, puis retry du premier
+    store.append_messages('u1', 'c1', turn('q0', 'r0'), turn_id='t0')
+    store.append_messages('u1', 'c1', turn('q1', 'r1'), base_seq=2, turn_id='t1')
+    store.append_messages('u1', 'c1', turn('q0', 'r0'), turn_id='t0')
+
+    messages = store.load_messages('u1', 'c1')
+    assert [msg['content'] for msg in messages] == ['q0', 'r0', 'q1', 'r1']
+    assert store.get_header('u1', 'c1')['message_count'] == 4
+
+
+def test_reservation_lost_leaves_a_gap_not_a_duplicate(store, history_table):
+    store.append_messages('u1', 'c1', turn('q0', 'r0'), turn_id='t0')
+    history_table.delete_item(Key={'user_id': 'u1', 'conversation_id': turn_key('c1', 't0')})
+    for seq in (0, 1):
+        history_table.delete_item(Key={'user_id': 'u1', 'conversation_id': message_key('c1', seq)})
+
+    store.append_messages('u1', 'c1', turn('q0', 'r0'), turn_id='t0')
+    assert [(msg['seq'], msg['content']) for msg in store.load_messages('u1', 'c1')] == [(2, 'q0'), (3, 'r0')]
+
+
+@pytest.mark.parametrize('conversation_id, valid', [
+    ('5f0e4c1e-8d55-4a36-9a43-2a4d6e1b7c90', True),
+    ('c1', True),
+    ('c1#0000000000', False),
+    ('c1#doc#x', False),
+    ('', False),
+    ('a' * 65, False),
+    ('../c1', False),
+    (None, False),
+])
+def test_conversation_id_validation(conversation_id, valid):
+    assert is_valid_conversation_id(conversation_id) is valid
+
+
+def test_load_context_skips_summarized_messages(store):
+    store.append_messages('u1', 'c1', turn('q0', 'r0') + turn('q1', 'r1'))
+    assert store.put_summary('u1', 'c1', 'Résumé des deux premiers messages', seq=1)
+    # Résumé concurrent basé sur une version périmée : abandonné
+    assert not store.put_summary('u1', 'c1', 'autre', seq=2)
+
+    messages, summary = store.load_context('u1', 'c1')
+    assert summary == {'text': 'Résumé des deux premiers messages', 'seq': 1}
+    assert [msg['content'] for msg in messages] == ['q1', 'r1']
+    assert next_sequence([], summary) == 2
+
+
+def test_list_conversations_pages_newest_first(store, monkeypatch):
+    import conversation_store
+
+    for i, conversation_id in enumerate(['c1', 'c2', 'c3']):
+        monkeypatch.setattr(conversation_store.time, 'time', lambda i=i: 1_700_000_000 + i)
+        store.append_messages('u1', conversation_id, turn(f'question {conversation_id}', 'r'))
+    store.append_messages('u2', 'other', turn('q', 'r'))
+
+    first, cursor = store.list_conversations('u1', limit=2)
+    assert [item['conversationId'] for item in first] == ['c3', 'c2']
+    assert first[0]['preview'] == 'question c3' and first[0]['messageCount'] == 2
+    assert cursor
+
+    rest, cursor = store.list_conversations('u1', limit=2, cursor=cursor)
+    assert [item['conversationId'] for item in rest] == ['c1']
+    assert cursor is None
+
+
+def test_cursor_of_another_user_is_rejected(store):
+    for conversation_id in ['c1', 'c2']:
+        store.append_messages('u1', conversation_id, turn('q', 'r'))
+    _, cursor = store.list_conversations('u1', limit=1)
+    with pytest.raises(ValueError):
+        store.list_conversations('u2', cursor=cursor)
+
+
+def test_delete_conversation_removes_header_and_messages(store, history_table):
+    store.append_messages('u1', 'c1', turn('q', 'r'), turn_id='t0')
+    store.append_messages('u1', 'c10', turn('autre', 'conversation'))
+    store.delete_conversation('u1', 'c1')
+
+    assert store.get_header('u1', 'c1') is None
+    assert history_table.get_item(Key={'user_id': 'u1', 'conversation_id': turn_key('c1', 't0')}).get('Item') is None
+    assert history_table.get_item(Key={'user_id': 'u1', 'conversation_id': message_key('c1', 0)}).get('Item') is None
+    assert [msg['content'] for msg in store.load_messages('u1', 'c10')] == ['autre', 'conversation']
@@ -0,0 +1,122 @@
+"""Cache du texte extrait : LRU en octets, niveaux persistants, get_or_extract"""
+import pytest
+
+from extraction_cache import (
+    DYNAMODB_MAX_TEXT_BYTES, DynamoDBTextStore, ExtractionCache, LocalDirTextStore,
+    LRUTextCache, S3TextStore, cache_key
+)
+
+
+def test_cache_key_variant_is_path_safe():
+    key = cache_key(b'abc', 'ext-4', variant='application/pdf')
+    digest, version, variant = key.split(':')
+    assert len(digest) == 64 and version == 'ext-4'
+    assert variant == 'application_pdf'
+    assert cache_key(b'abc', 'ext-4') != key
+    assert cache_key(None, 'ext-4', digest=digest) == f"{digest}:ext-4"
+
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    cache = LRUTextCache(max_bytes=10)
+    cache.put('a', 'aaaa')
+    cache.put('b', 'bbbb')
+    assert cache.get('a') == 'aaaa'  # 'b' devient le moins récent
+    cache.put('c', 'cccc')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'aaaa' and cache.get('c') == 'cccc'
+
+
+def test_lru_counts_utf8_bytes_and_skips_oversized():
+    cache = LRUTextCache(max_bytes=8)
+    cache.put('accents', 'éééé')  # 8 octets
+    assert cache.get('accents') == 'éééé'
+    cache.put('big', 'x' * 9)
+    assert cache.get('big') is None
+    assert cache.get('accents') == 'éééé'
+
+
+def test_lru_replacing_a_key_updates_size():
+    cache = LRUTextCache(max_bytes=10)
+    cache.put('a', 'x' * 8)
+    cache.put('a', 'y')
+    cache.put('b', 'z' * 9)
+    assert cache.get('a') == 'y' and cache.get('b') == 'z' * 9
+
+
+def _roundtrip(store):
+    key = cache_key(b'document', 'ext-4', variant='text/plain')
+    assert store.get(key) is None
+    store.put(key, 'texte extrait é')
+    assert store.get(key) == 'texte extrait é'
+
+
+def test_local_dir_store(tmp_path):
+    _roundtrip(LocalDirTextStore(str(tmp_path / 'cache')))
+    assert not [name for name in (tmp_path / 'cache').iterdir() if name.suffix == '.tmp']
+
+
+def test_s3_store(aws):
+    from aws_clients import get_s3_client
+
+    s3 = get_s3_client()
+    s3.create_bucket(Bucket='cache', CreateBucketConfiguration={'LocationConstraint': 'eu-west-3'})
+    _roundtrip(S3TextStore('cache', prefix='extraction-cache/', s3_client=s3))
+    keys = [obj['Key'] for obj in s3.list_objects_v2(Bucket='cache')['Contents']]
+    assert len(keys) == 1 and keys[0].startswith('extraction-cache/') and ':' not in keys[0]
+
+
+def test_dynamodb_store_skips_items_over_limit(aws):
+    from aws_clients import get_dynamodb_resource
+
+    get_dynamodb_resource().create_table(
+        TableName='extraction-cache',
+        BillingMode='PAY_PER_REQUEST',
+        KeySchema=[{'AttributeName': 'cache_key', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'cache_key', 'AttributeType': 'S'}]
+    )
+    store = DynamoDBTextStore('extraction-cache')
+    _roundtrip(store)
+    store.put('big', 'x' * (DYNAMODB_MAX_TEXT_BYTES + 1))
+    assert store.get('big') is None
+
+
+class FailingStore:
+    def get(self, key):
+        raise RuntimeError('indisponible')
+
+    def put(self, key, text):
+        raise RuntimeError('indisponible')
+
+
+def test_store_hit_is_promoted_to_memory(tmp_path):
+    store = LocalDirTextStore(str(tmp_path))
+    store.put('k', 'texte')
+    cache = ExtractionCache(LRUTextCache(1024), store)
+    assert cache.get('k') == 'texte'
+    assert cache.memory.get('k') == 'texte'
+
+
+def test_store_errors_are_not_fatal():
+    cache = ExtractionCache(LRUTextCache(1024), FailingStore())
+    assert cache.get('k') is None
+    cache.put('k', 'texte')
+    assert cache.get('k') == 'texte'
+
+
+@pytest.mark.parametrize('store_factory', [lambda tmp_path: None, lambda tmp_path: LocalDirTextStore(str(tmp_path))])
+def test_get_or_extract_caches_successes_only(tmp_path, store_factory):
+    cache = ExtractionCache(LRUTextCache(1024), store_factory(tmp_path))
+    calls = []
+
+    def failing():
+        calls.append('failing')
+        return '', 'fichier illisible'
+
+    def extract():
+        calls.append('extract')
+        return 'texte', None
+
+    assert cache.get_or_extract('k', failing) == ('', 'fichier illisible')
+    assert cache.get_or_extract('k', extract) == ('texte', None)
+    assert cache.get_or_extract('k', extract) == ('texte', None)
+    assert calls == ['failing', 'extract']
@@ -0,0 +1,140 @@
+"""Vérification des JWT : signature, claims, JWKS (rechargement limité, pannes)"""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from bench_jwt_verification import CLIENT_ID, E, ISSUER, b64, claims_for, generate_key, sign_token
+from jwt_verifier import InvalidToken, JwksCache, JwtVerifier
+
+N, D = generate_key(1024, seed=1)
+OTHER_N, OTHER_D = generate_key(1024, seed=2)
+
+
+def jwk(n, kid='k1'):
+    return {'kty': 'RSA', 'kid': kid, 'use': 'sig', 'alg': 'RS256',
+            'n': b64(n.to_bytes((n.bit_length() + 7) // 8, 'big')), 'e': b64(E.to_bytes(3, 'big'))}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Jwks:
+    """Endpoint JWKS simulé : clés servies, appels comptés, panne possible"""
+
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.calls = 0
+        self.down = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.down:
+            raise TimeoutError('timed out')
+        return {'keys': self.keys}
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def endpoint():
+    return Jwks(jwk(N))
+
+
+@pytest.fixture
+def verifier(endpoint, clock):
+    return JwtVerifier(ISSUER, CLIENT_ID, JwksCache(endpoint, min_refresh_seconds=60, clock=clock))
+
+
+def test_valid_token_is_verified_once(verifier, endpoint):
+    token = sign_token(claims_for(1), N, D)
+    assert verifier.verify(token)['sub'] == 'user-1'
+    assert verifier.verify(token)['sub'] == 'user-1'
+    assert verifier.stats['hits'] == 1 and endpoint.calls == 1
+
+
+def test_tampered_payload_is_rejected(verifier):
+    header, _, signature = sign_token(claims_for(1), N, D).split('.')
+    forged = b64(b'{"sub":"admin","iss":"%s","aud":"%s","token_use":"id","exp":9999999999}'
+                 % (ISSUER.encode(), CLIENT_ID.encode()))
+    with pytest.raises(InvalidToken, match='Signature'):
+        verifier.verify(f"{header}.{forged}.{signature}")
+
+
+def test_token_signed_with_another_key_is_rejected(verifier):
+    with pytest.raises(InvalidToken, match='Signature'):
+        verifier.verify(sign_token(claims_for(1), OTHER_N, OTHER_D))
+
+
+@pytest.mark.parametrize('overrides, message', [
+    ({'exp': 1}, 'expiré'),
+    ({'iss': 'https://cognito-idp.eu-west-3.amazonaws.com/other'}, 'Émetteur'),
+    ({'aud': 'other-client'}, 'Audience'),
+    ({'token_use': 'refresh'}, 'Type de jeton'),
+    ({'sub': ''}, 'sub'),
+])
+def test_invalid_claims_are_rejected(verifier, overrides, message):
+    with pytest.raises(InvalidToken, match=message):
+        verifier.verify(sign_token(claims_for(1, **overrides), N, D))
+
+
+def test_access_token_audience_is_client_id(verifier):
+    claims = claims_for(1, token_use='access', client_id=CLIENT_ID)
+    del claims['aud']
+    assert verifier.verify(sign_token(claims, N, D))['sub'] == 'user-1'
+
+
+def test_algorithm_none_is_rejected(verifier):
+    header = b64(b'{"alg":"none","kid":"k1"}')
+    token = f"{header}.{sign_token(claims_for(1), N, D).split('.')[1]}."
+    with pytest.raises(InvalidToken, match='Algorithme'):
+        verifier.verify(token)
+
+
+def test_unknown_kid_refresh_is_throttled(verifier, endpoint, clock):
+    verifier.verify(sign_token(claims_for(1), N, D))
+    token = sign_token(claims_for(2), N, D, kid='rotated')
+    for _ in range(3):
+        with pytest.raises(InvalidToken, match='Clé inconnue'):
+            verifier.verify(token)
+    # Clés téléchargées à l'instant : pas de nouveau téléchargement pour un kid inventé
+    assert endpoint.calls == 1
+
+    # Rotation des clés publiée : rechargée après le délai minimal
+    endpoint.keys.append(jwk(N, kid='rotated'))
+    clock.now += 60
+    assert verifier.verify(token)['sub'] == 'user-2'
+    assert endpoint.calls == 2
+
+
+def test_failed_fetch_is_throttled_too(verifier, endpoint, clock):
+    endpoint.down = True
+    token = sign_token(claims_for(1), N, D)
+    for _ in range(3):
+        with pytest.raises(InvalidToken, match='Clé inconnue'):
+            verifier.verify(token)
+    assert endpoint.calls == 1
+    assert verifier.jwks.stats['errors'] == 1
+
+    endpoint.down = False
+    clock.now += 60
+    assert verifier.verify(token)['sub'] == 'user-1'
+    assert endpoint.calls == 2
+
+
+def test_failed_refresh_keeps_known_keys(verifier, endpoint, clock):
+    assert verifier.jwks.refresh()
+    endpoint.down = True
+    clock.now += 60
+    assert not verifier.jwks.refresh()
+    assert verifier.verify(sign_token(claims_for(1), N, D))['sub'] == 'user-1'
@@ -0,0 +1,64 @@
+"""Recherche BM25 : découpage, termes, index persisté, sélection des passages"""
+from retrieval import (
+    DocumentIndex, build_index, chunk_text, document_index, select_context, tokenize
+)
+
+
+def make_manual(chapters=40):
+    """Un chapitre (~2000 caractères) par module, chacun avec un terme unique"""
+    sections = []
+    for i in range(chapters):
+        filler = ' '.join(f'paragraphe générique numéro {j} du manuel.' for j in range(45))
+        sections.append(f"Chapitre {i}\nLe module zeta{i} configure la sauvegarde. {filler}\n")
+    return ''.join(sections)
+
+
+def test_tokenize_strips_accents_stopwords_and_plural():
+    assert tokenize("Les Élèves et les données, des modules") == ['eleve', 'donnee', 'module']
+
+
+def test_chunks_cover_text_with_overlap():
+    text = ' '.join(f'mot{i}' for i in range(2000))
+    chunks = chunk_text(text, size=500, overlap=100)
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(text)
+    for (_, previous_end), (start, end) in zip(chunks, chunks[1:]):
+        assert start < previous_end  # chevauchement
+        assert end - start <= 500
+        assert text[start - 1] == ' '  # passage aligné sur un mot
+
+
+def test_index_roundtrip_and_version_check():
+    index = build_index(make_manual(5))
+    restored = DocumentIndex.loads(index.dumps())
+    assert restored.chunks == index.chunks
+    assert restored.postings == index.postings
+    assert DocumentIndex.loads(index.dumps().replace('bm25-1', 'bm25-0')) is None
+    assert DocumentIndex.loads('not json') is None
+
+
+def test_persisted_index_is_reused():
+    text = make_manual(5)
+    index, is_new = document_index({'id': 'persisted-doc', 'text': text, 'index': build_index(text).dumps()})
+    assert not is_new and index.chunks == build_index(text).chunks
+    _, is_new = document_index({'id': 'fresh-doc', 'text': text})
+    assert is_new
+
+
+def test_select_context_finds_the_right_chapter():
+    manual = {'id': 'manual', 'name': 'manuel.pdf', 'text': make_manual()}
+    note = {'id': 'note', 'name': 'note.txt', 'text': 'Petite note envoyée en entier.'}
+
+    result = select_context([note, manual], 'Comment configurer le module zeta27 ?', top_k=2)
+
+    assert result.full_documents() == [note]
+    [excerpt] = result.excerpt_documents()
+    assert excerpt['name'] == 'manuel.pdf'
+    assert 'zeta27' in excerpt['text']
+    assert len(excerpt['text']) < len(manual['text']) // 5
+    assert set(result.new_indexes) == {'manual'}
+
+
+def test_select_context_without_useful_terms_keeps_first_chunks():
+    manual = {'id': 'manual-2', 'text': make_manual()}
+    [excerpt] = select_context([manual], 'résume', top_k=1).excerpt_documents()
+    assert 'zeta0 ' in excerpt['text']
@@ -0,0 +1,94 @@
+"""Upload direct : POST présigné, extraction déclenchée par S3, document prêt pour le chat"""
+import importlib.util
+import os
+
+import pytest
+
+from uploads import (
+    STATUS_ERROR, STATUS_PENDING, STATUS_READY, LocalS3Client, UploadNotReady,
+    create_presigned_upload, load_ready_upload, read_status
+)
+
+BUCKET = 'uploads-bucket'
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def s3():
+    """Équivalent local du bucket, partagé par le chat et le file processor"""
+    return LocalS3Client()
+
+
+@pytest.fixture
+def file_processor(s3, monkeypatch):
+    path = os.path.join(BACKEND_DIR, 'file_processor', 'lambda_function.py')
+    spec = importlib.util.spec_from_file_location('file_processor_lambda', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, 'get_upload_s3_client', lambda: s3)
+    return module
+
+
+def s3_event(key):
+    """Notification s3:ObjectCreated (clé encodée comme dans les vrais événements)"""
+    return {'Records': [{
+        'eventSource': 'aws:s3',
+        's3': {'bucket': {'name': BUCKET}, 'object': {'key': key.replace(' ', '+')}}
+    }]}
+
+
+def upload(s3, upload, body: bytes):
+    """Ce que fait le navigateur avec le POST présigné"""
+    s3.put_object(Bucket=BUCKET, Key=upload['fields']['key'], Body=body,
+                  ContentType=upload['fields']['Content-Type'])
+
+
+def test_presign_put_extract_then_load(s3, file_processor):
+    presigned = create_presigned_upload(s3, BUCKET, 'u1', 'notes.txt', 'text/plain')
+    upload_id = presigned['uploadId']
+    assert presigned['fields']['key'] == presigned['key'] == f"uploads/u1/{upload_id}/source/notes.txt"
+    assert read_status(s3, BUCKET, 'u1', upload_id)['status'] == STATUS_PENDING
+    with pytest.raises(UploadNotReady) as pending:
+        load_ready_upload(s3, BUCKET, 'u1', upload_id)
+    assert pending.value.status == STATUS_PENDING
+
+    upload(s3, presigned, 'Compte rendu : livraison prévue en mars.'.encode('utf-8'))
+    result = file_processor.lambda_handler(s3_event(presigned['key']), None)
+    assert result == {'results': [{'key': presigned['key'], 'status': STATUS_READY}]}
+
+    status = read_status(s3, BUCKET, 'u1', upload_id)
+    assert status['status'] == STATUS_READY and status['fileName'] == 'notes.txt'
+    document = load_ready_upload(s3, BUCKET, 'u1', upload_id)
+    assert document['name'] == 'notes.txt' and document['type'] == 'text/plain'
+    assert 'livraison prévue en mars' in document['text']
+    assert document['id'] == status['documentId']
+
+
+def test_pipeline_writes_do_not_retrigger_extraction(s3, file_processor):
+    presigned = create_presigned_upload(s3, BUCKET, 'u1', 'notes.txt', 'text/plain')
+    base = presigned['key'].rsplit('source/', 1)[0]
+    for key in (f"{base}status.json", f"{base}extracted.txt", 'other/file.txt'):
+        assert file_processor.lambda_handler(s3_event(key), None) == {'results': [{'key': key, 'skipped': True}]}
+
+
+def test_unreadable_file_sets_error_status(s3, file_processor):
+    presigned = create_presigned_upload(s3, BUCKET, 'u1', 'rapport.pdf', 'application/pdf')
+    upload(s3, presigned, b'not a pdf')
+    result = file_processor.lambda_handler(s3_event(presigned['key']), None)
+    assert result['results'][0]['status'] == STATUS_ERROR
+
+    status = read_status(s3, BUCKET, 'u1', presigned['uploadId'])
+    assert status['status'] == STATUS_ERROR and status['error']
+    with pytest.raises(UploadNotReady) as error:
+        load_ready_upload(s3, BUCKET, 'u1', presigned['uploadId'])
+    assert error.value.status == STATUS_ERROR
+
+
+def test_upload_of_another_user_is_unknown(s3, file_processor):
+    presigned = create_presigned_upload(s3, BUCKET, 'u1', 'notes.txt', 'text/plain')
+    upload(s3, presigned, b'secret')
+    file_processor.lambda_handler(s3_event(presigned['key']), None)
+    assert read_status(s3, BUCKET, 'u2', presigned['uploadId']) is None
+    with pytest.raises(UploadNotReady) as unknown:
+        load_ready_upload(s3, BUCKET, 'u2', presigned['uploadId'])
+    assert unknown.value.status == 'unknown'
@@ -0,0 +1,75 @@
+"""File write-behind : retries, déduplication, attente par préfixe"""
+import threading
+
+from write_behind import WriteBehindQueue
+
+
+def make_queue(**kwargs):
+    delays = []
+    queue = WriteBehindQueue(base_delay=0.1, sleep=delays.append, **kwargs)
+    return queue, delays
+
+
+def test_retries_with_exponential_backoff():
+    queue, delays = make_queue(max_attempts=4)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError('throttled')
+
+    assert queue.submit('turn:1', flaky)
+    assert queue.flush(timeout=5)
+    assert len(attempts) == 3
+    assert delays == [0.1, 0.2]
+    assert queue.stats['completed'] == 1 and queue.stats['retried'] == 2
+
+
+def test_gives_up_and_reports_failure():
+    failures = []
+    queue, delays = make_queue(max_attempts=2, on_failure=lambda key, e, context: failures.append((key, context)))
+
+    def broken():
+        raise RuntimeError('down')
+
+    queue.submit('turn:1', broken, context={'conversation': 'c1'})
+    assert queue.flush(timeout=5)
+    assert failures == [('turn:1', {'conversation': 'c1'})]
+    assert queue.stats['failed'] == 1 and len(delays) == 1
+
+
+def test_pending_key_is_not_submitted_twice():
+    queue, _ = make_queue()
+    release = threading.Event()
+    calls = []
+
+    def blocked(name):
+        release.wait(5)
+        calls.append(name)
+
+    assert queue.submit('turn:1', blocked, 'first')
+    assert not queue.submit('turn:1', blocked, 'second')
+    release.set()
+    assert queue.flush(timeout=5)
+    assert calls == ['first']
+    assert queue.stats['duplicates'] == 1
+    # Tâche terminée : la clé peut être soumise à nouveau
+    assert queue.submit('turn:1', calls.append, 'third')
+    assert queue.flush(timeout=5)
+
+
+def test_flush_by_prefix_and_timeout():
+    queue, _ = make_queue()
+    release = threading.Event()
+    queue.submit('turn:a:1', lambda: None)
+    queue.flush(timeout=5)
+    queue.submit('turn:b:1', release.wait, 5)
+
+    assert queue.pending('turn:a:') == 0
+    assert queue.flush(timeout=0.5, prefix='turn:a:')
+    assert queue.pending('turn:b:') == 1
+    assert not queue.flush(timeout=0.05, prefix='turn:b:')
+    release.set()
+    assert queue.flush(timeout=5)
+    assert queue.pending() == 0
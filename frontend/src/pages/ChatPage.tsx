@@ -25,6 +25,8 @@ export function ChatPage() {
   const [conversationId, setConversationId] = useState<string>();
   const [oldConversationId, setOldConversationId] = useState<string | null>(null); // Pour fork
   const [conversationsList, setConversationsList] = useState<ConversationListItem[]>([]);
+  const [conversationsCursor, setConversationsCursor] = useState<string | null>(null); // Page suivante de la liste
+  const [isLoadingMoreConversations, setIsLoadingMoreConversations] = useState(false);
   const [showHistoryDropdown, setShowHistoryDropdown] = useState(false);
 
   // Charger l'historique au démarrage
@@ -36,6 +38,7 @@ export function ChatPage() {
         // Récupérer la liste de toutes les conversations de l'utilisateur
         const convList = await chatService.listConversations();
         setConversationsList(convList.conversations || []);
+        setConversationsCursor(convList.nextCursor ?? null);
         
         if (convList.conversations && convList.conversations.length > 0) {
           // Charger la conversation la plus récente (première de la liste car triée par timestamp décroissant)
@@ -77,6 +80,24 @@ export function ChatPage() {
     }
   }, [conversationId]);
 
+  // Charger la page suivante de l'historique (la liste est paginée par le backend)
+  const loadMoreConversations = async () => {
+    if (!conversationsCursor || isLoadingMoreConversations) return;
+    try {
+      setIsLoadingMoreConversations(true);
+      const convList = await chatService.listConversations(conversationsCursor);
+      setConversationsList(prev => {
+        const known = new Set(prev.map(conv => conv.conversationId));
+        return [...prev, ...(convList.conversations || []).filter(conv => !known.has(conv.conversationId))];
+      });
+      setConversationsCursor(convList.nextCursor ?? null);
+    } catch (error) {
+      console.error('Error loading more conversations:', error);
+    } finally {
+      setIsLoadingMoreConversations(false);
+    }
+  };
+
   const handleSendMessage = async () => {
     if (!inputMessage.trim() && files.length === 0) return;
 
@@ -94,6 +115,7 @@ export function ChatPage() {
         // Recharger la liste des conversations
         const convList = await chatService.listConversations();
         setConversationsList(convList.conversations || []);
+        setConversationsCursor(convList.nextCursor ?? null);
       } catch (error) {
         console.error('Error forking conversation:', error);
       }
@@ -271,6 +293,15 @@ export function ChatPage() {
                       </div>
                     </button>
                   ))}
+                  {conversationsCursor && (
+                    <button
+                      onClick={loadMoreConversations}
+                      disabled={isLoadingMoreConversations}
+                      className="w-full px-4 py-2 text-sm text-blue-600 hover:bg-gray-50 disabled:text-gray-400"
+                    >
+                      {isLoadingMoreConversations ? 'Chargement...' : 'Charger plus'}
+                    </button>
+                  )}
                 </div>
               )}
             </div>
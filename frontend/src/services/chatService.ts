@@ -37,6 +37,7 @@ export interface ConversationListItem {
 export interface ConversationListResponse {
   conversations: ConversationListItem[];
   count: number;
+  nextCursor?: string | null;
 }
 
 class ChatService {
@@ -146,11 +147,12 @@ class ChatService {
     }
   }
 
-  async listConversations(): Promise<ConversationListResponse> {
+  async listConversations(cursor?: string): Promise<ConversationListResponse> {
     try {
       const headers = await this.getAuthHeaders();
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
       
-      const response = await fetch(`${this.streamUrl}/conversations`, {
+      const response = await fetch(`${this.streamUrl}/conversations${query}`, {
         method: 'GET',
         headers,
       });
@@ -110,6 +110,7 @@ module "lambda" {
   api_gateway_id         = module.api_gateway.api_gateway_id
   api_gateway_execution_arn = module.api_gateway.api_gateway_execution_arn
   cognito_user_pool_id   = module.cognito.user_pool_id
+  cognito_user_pool_client_id = module.cognito.user_pool_client_id
   
   tags = local.common_tags
 }
@@ -20,11 +20,14 @@ resource "aws_dynamodb_table" "chat_history" {
     type = "N"
   }
 
+  # Liste des conversations : seuls les en-têtes ont un attribut timestamp,
+  # l'index ne projette que les attributs de résumé
   global_secondary_index {
-    name            = "timestamp-index"
-    hash_key        = "user_id"
-    range_key       = "timestamp"
-    projection_type = "ALL"
+    name               = "timestamp-index"
+    hash_key           = "user_id"
+    range_key          = "timestamp"
+    projection_type    = "INCLUDE"
+    non_key_attributes = ["message_count", "preview"]
   }
 
   ttl {
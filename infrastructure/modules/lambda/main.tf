@@ -68,7 +68,8 @@ resource "aws_iam_role_policy" "dynamodb_policy" {
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "dynamodb:Query",
-          "dynamodb:Scan"
+          "dynamodb:Scan",
+          "dynamodb:BatchWriteItem"
         ]
         Resource = "arn:aws:dynamodb:*:*:table/${var.project_name}-${var.environment}-*"
       }
@@ -76,6 +77,76 @@ resource "aws_iam_role_policy" "dynamodb_policy" {
   })
 }
 
+# Politique IAM pour le bucket des uploads (POST présigné signé par le rôle, statut, texte extrait)
+resource "aws_iam_role_policy" "uploads_policy" {
+  name = "${var.project_name}-${var.environment}-lambda-uploads-policy"
+  role = aws_iam_role.lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:PutObject"
+        ]
+        Resource = "${aws_s3_bucket.uploads.arn}/uploads/*"
+      }
+    ]
+  })
+}
+
+# Bucket S3 des uploads directs (fichier source, statut, texte extrait)
+resource "aws_s3_bucket" "uploads" {
+  bucket = "${var.project_name}-${var.environment}-uploads"
+
+  tags = var.tags
+}
+
+resource "aws_s3_bucket_public_access_block" "uploads" {
+  bucket = aws_s3_bucket.uploads.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+# Le navigateur envoie le fichier directement au bucket (POST présigné)
+resource "aws_s3_bucket_cors_configuration" "uploads" {
+  bucket = aws_s3_bucket.uploads.id
+
+  cors_rule {
+    allowed_methods = ["POST"]
+    allowed_origins = ["*"]
+    allowed_headers = ["*"]
+    max_age_seconds = 3000
+  }
+}
+
+# Les uploads ne servent qu'au tour qui les référence : expiration automatique
+resource "aws_s3_bucket_lifecycle_configuration" "uploads" {
+  bucket = aws_s3_bucket.uploads.id
+
+  rule {
+    id     = "expire_uploads"
+    status = "Enabled"
+
+    filter {
+      prefix = "uploads/"
+    }
+
+    expiration {
+      days = var.upload_expiration_days
+    }
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
+}
+
 # Lambda Layer pour les dépendances communes Python
 resource "aws_lambda_layer_version" "dependencies" {
   filename         = "../backend-python/layers/dependencies.zip"
@@ -117,10 +188,14 @@ resource "aws_lambda_function" "chat_handler" {
     variables = {
       ENVIRONMENT = var.environment
       COGNITO_USER_POOL_ID = var.cognito_user_pool_id
+      COGNITO_CLIENT_ID = var.cognito_user_pool_client_id
       DYNAMODB_TABLE = "${var.project_name}-${var.environment}-chat-history"
       PORT = "8080"
       AWS_LAMBDA_EXEC_WRAPPER = "/opt/bootstrap"
       AWS_LWA_INVOKE_MODE = "response_stream"
+      STREAM_COALESCE_BYTES = tostring(var.stream_coalesce_bytes)
+      STREAM_COALESCE_MS = tostring(var.stream_coalesce_ms)
+      UPLOAD_BUCKET = aws_s3_bucket.uploads.id
     }
   }
 
@@ -151,4 +226,60 @@ resource "aws_lambda_permission" "chat_handler_api_gateway" {
   function_name = aws_lambda_function.chat_handler.function_name
   principal     = "apigateway.amazonaws.com"
   source_arn    = "${var.api_gateway_execution_arn}/*/*"
+}
+
+# CloudWatch Log Group pour la Lambda file-processor avec rétention de 30 jours
+resource "aws_cloudwatch_log_group" "file_processor_logs" {
+  name              = "/aws/lambda/${var.project_name}-${var.environment}-file-processor"
+  retention_in_days = 30
+
+  tags = var.tags
+}
+
+# Fonction Lambda d'extraction des fichiers déposés dans le bucket des uploads (déclenchée par S3)
+resource "aws_lambda_function" "file_processor" {
+  filename         = "../backend-python/dist/file-processor.zip"
+  function_name    = "${var.project_name}-${var.environment}-file-processor"
+  role            = aws_iam_role.lambda_role.arn
+  handler         = "file_processor/lambda_function.lambda_handler"
+  source_code_hash = filebase64sha256("../backend-python/dist/file-processor.zip")
+  runtime         = "python3.11"
+  timeout         = var.file_processor_timeout
+  memory_size      = var.file_processor_memory_size
+
+  layers = [aws_lambda_layer_version.dependencies.arn]
+
+  environment {
+    variables = {
+      ENVIRONMENT = var.environment
+      UPLOAD_BUCKET = aws_s3_bucket.uploads.id
+    }
+  }
+
+  depends_on = [aws_cloudwatch_log_group.file_processor_logs]
+
+  tags = var.tags
+}
+
+# Permission pour S3 d'invoquer le file processor
+resource "aws_lambda_permission" "file_processor_s3" {
+  statement_id  = "AllowExecutionFromS3"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.file_processor.function_name
+  principal     = "s3.amazonaws.com"
+  source_arn    = aws_s3_bucket.uploads.arn
+}
+
+# Extraction à la création d'un objet sous uploads/ (status.json et extracted.txt
+# sont ignorés par le handler : seules les clés .../source/... sont traitées)
+resource "aws_s3_bucket_notification" "uploads" {
+  bucket = aws_s3_bucket.uploads.id
+
+  lambda_function {
+    lambda_function_arn = aws_lambda_function.file_processor.arn
+    events              = ["s3:ObjectCreated:*"]
+    filter_prefix       = "uploads/"
+  }
+
+  depends_on = [aws_lambda_permission.file_processor_s3]
 }
\ No newline at end of file
@@ -21,4 +21,14 @@ output "lambda_role_arn" {
 output "chat_handler_function_url" {
   description = "URL de la fonction Lambda chat handler avec streaming"
   value       = aws_lambda_function_url.chat_handler_url.function_url
+}
+
+output "file_processor_function_name" {
+  description = "Nom de la fonction Lambda file processor (déclenchée par le bucket des uploads)"
+  value       = aws_lambda_function.file_processor.function_name
+}
+
+output "uploads_bucket_name" {
+  description = "Nom du bucket S3 des uploads directs"
+  value       = aws_s3_bucket.uploads.id
 }
\ No newline at end of file
@@ -23,6 +23,41 @@ variable "cognito_user_pool_id" {
   type        = string
 }
 
+variable "cognito_user_pool_client_id" {
+  description = "ID du client Cognito (audience vérifiée dans les JWT)"
+  type        = string
+}
+
+variable "stream_coalesce_bytes" {
+  description = "Taille (octets) à partir de laquelle les deltas Bedrock regroupés sont envoyés"
+  type        = number
+  default     = 512
+}
+
+variable "stream_coalesce_ms" {
+  description = "Délai maximal (ms) de regroupement des deltas Bedrock avant envoi"
+  type        = number
+  default     = 20
+}
+
+variable "file_processor_memory_size" {
+  description = "Mémoire (Mo) du file processor (extraction PDF en parallèle au-delà de 64 pages)"
+  type        = number
+  default     = 1024
+}
+
+variable "file_processor_timeout" {
+  description = "Délai maximal (s) d'extraction d'un fichier déposé"
+  type        = number
+  default     = 300
+}
+
+variable "upload_expiration_days" {
+  description = "Durée de conservation (jours) des fichiers déposés et de leur texte extrait"
+  type        = number
+  default     = 7
+}
+
 variable "tags" {
   description = "Tags à appliquer aux ressources"
   type        = map(string)
@@ -38,6 +38,11 @@ output "chat_stream_url" {
   value       = module.lambda.chat_handler_function_url
 }
 
+output "uploads_bucket" {
+  description = "Bucket S3 des uploads directs (extraction par le file processor)"
+  value       = module.lambda.uploads_bucket_name
+}
+
 output "chat_history_table" {
   description = "Nom de la table DynamoDB pour l'historique des chats"
   value       = module.dynamodb.chat_history_table_name